@@ -3,4 +3,7 @@ set -e
 python manage.py collectstatic --noinput
 python manage.py migrate
 python manage.py seed_admin || true
+if [ "${SERVER_MODE:-asgi}" = "asgi" ]; then
+  exec uvicorn asgi:application --host 0.0.0.0 --port 8000 --workers "${WEB_CONCURRENCY:-2}"
+fi
 exec python manage.py runserver 0.0.0.0:8000
@@ -5,3 +5,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+from authentication.uploads import max_batch_bytes, max_upload_bytes  # noqa: E402
+from core.body_limit import BodySizeLimitMiddleware  # noqa: E402
+
+# Oversized uploads are refused before Django spools their body to disk
+application = BodySizeLimitMiddleware(
+    application,
+    max_bytes=max_upload_bytes() + int(getattr(settings, "KB_UPLOAD_BODY_OVERHEAD", 1024 * 1024)),
+    path_limits={"/api/kb/files/batch-add/": max_batch_bytes()},
+)
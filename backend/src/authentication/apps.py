@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class AuthenticationConfig(AppConfig):
+    name = "authentication"
+
+    def ready(self):
+        from authentication import signals  # noqa: F401
@@ -5,12 +5,50 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import IntegrityError
 from django.utils.crypto import get_random_string
+from django.utils.translation import gettext_lazy as _
 from rest_framework import exceptions
 from rest_framework.authentication import get_authorization_header
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
 
+from authentication.services import user_cache
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication whose user lookup goes through the Redis user cache
+    (``services.user_cache``) instead of one ``UserProfile`` query per request.
+    The checks after the lookup are the ones of ``JWTAuthentication.get_user``."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        try:
+            user = user_cache.get_user(
+                user_id,
+                lambda: self.user_model.objects.get(**{jwt_api_settings.USER_ID_FIELD: user_id}),
+            )
+        except self.user_model.DoesNotExist as e:
+            raise exceptions.AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            ) from e
+
+        if jwt_api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if jwt_api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_api_settings.REVOKE_TOKEN_CLAIM) != user_cache.password_md5(
+                user
+            ):
+                raise exceptions.AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
 
 class DebugJWTAuthentication(JWTAuthentication):
     """JWT authentication that falls back to decoding without signature in DEBUG mode
@@ -113,7 +151,7 @@ class DebugJWTAuthentication(JWTAuthentication):
         return (user, None)
 
 
-class FlexibleJWTAuthentication(JWTAuthentication):
+class FlexibleJWTAuthentication(CachedJWTAuthentication):
     """After validating token signature, attempt to resolve user by multiple claims.
 
     This class does NOT skip token verification — it only augments the lookup strategy
@@ -122,7 +160,7 @@ class FlexibleJWTAuthentication(JWTAuthentication):
     """
 
     def get_user(self, validated_token):
-        # Try the standard lookup first
+        # Try the standard (cached) lookup first
         try:
             return super().get_user(validated_token)
         except Exception:
@@ -0,0 +1,68 @@
+import json
+
+import psycopg2
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.services import kb_ann, n8n_db
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria/atualiza os índices ANN (pgvector HNSW ou IVFFlat) das coleções dos KBs no "
+        "Postgres do n8n (e o índice textual da busca híbrida) e, opcionalmente, mede o "
+        "recall contra a busca exata."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("hash_ids", nargs="*", help="KBs a indexar (padrão: todos)")
+        parser.add_argument("--method", choices=kb_ann.METHODS, default=kb_ann.default_method())
+        parser.add_argument(
+            "--storage",
+            choices=kb_ann.STORAGES,
+            help="Armazenamento do índice (padrão: o do KB ou KB_ANN_STORAGE). Para mudar "
+            "o de um KB de vez, use kb_vector_storage.",
+        )
+        parser.add_argument(
+            "--force", action="store_true", help="Reconstrói mesmo se o índice estiver em dia."
+        )
+        parser.add_argument(
+            "--recall",
+            action="store_true",
+            help="Mede recall@k e latência do índice contra a busca exata.",
+        )
+        parser.add_argument("--k", type=int, default=10, help="k do recall (padrão 10).")
+        parser.add_argument(
+            "--samples", type=int, default=20, help="Consultas usadas no recall (padrão 20)."
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Só mostra o plano de cada coleção."
+        )
+
+    def handle(self, *args, **options):
+        if not n8n_db.is_configured():
+            raise CommandError("Configuração do Postgres do n8n ausente (N8N_POSTGRES_HOST).")
+        try:
+            if not options["dry_run"]:
+                action = kb_ann.ensure_lexical_index()
+                self.stdout.write(json.dumps({"index": kb_ann.LEXICAL_INDEX, "action": action}))
+            found = kb_ann.collections(options["hash_ids"] or None)
+            for collection in found:
+                if options["dry_run"]:
+                    report = {"hash_id": collection.hash_id, "rows": collection.rows}
+                    if collection.dims:
+                        report["plan"] = kb_ann.plan(
+                            collection.rows, collection.dims, options["method"], options["storage"]
+                        ).as_dict()
+                else:
+                    report = kb_ann.build(
+                        collection, options["method"], options["force"], options["storage"]
+                    )
+                if options["recall"]:
+                    report["recall"] = kb_ann.measure_recall(
+                        collection, options["k"], options["samples"]
+                    )
+                self.stdout.write(json.dumps(report, ensure_ascii=False))
+        except psycopg2.Error as e:
+            raise CommandError(f"Falha no Postgres do n8n: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(found)} coleções verificadas."))
@@ -0,0 +1,113 @@
+import json
+import random
+import re
+import statistics
+import time
+from collections import Counter
+
+import psycopg2
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.services import embeddings, kb_retrieval, n8n_db
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara recall@k e latência da busca vetorial com a busca híbrida (vetorial + "
+        "textual, RRF) em um KB (ex.: o criado por n8n/create_sample_kb.py). As consultas "
+        "saem de trechos sorteados do próprio KB: 'keyword' usa os termos mais raros do "
+        "trecho (como um código ou nome exato) e 'passage' uma frase dele; o acerto é "
+        "recuperar o trecho de origem."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("hash_ids", nargs="+", help="KBs (nomes das coleções PGVector)")
+        parser.add_argument("--queries", type=int, default=30, help="Trechos sorteados (30).")
+        parser.add_argument("--k", type=int, default=5, help="k do recall (padrão 5).")
+        parser.add_argument(
+            "--corpus",
+            type=int,
+            default=2000,
+            help="Trechos usados para estimar a raridade dos termos (padrão 2000).",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not n8n_db.is_configured():
+            raise CommandError("Configuração do Postgres do n8n ausente (N8N_POSTGRES_HOST).")
+        hash_ids, k = options["hash_ids"], options["k"]
+
+        try:
+            corpus = self._sample(hash_ids, max(options["corpus"], options["queries"]))
+        except psycopg2.Error as e:
+            raise CommandError(f"Falha ao consultar o Postgres do n8n: {e}")
+        if not corpus:
+            raise CommandError("Nenhum trecho encontrado nesses KBs.")
+
+        corpus.sort()  # the seed picks the same chunks when the KB is small enough
+        rng = random.Random(options["seed"])
+        frequency = Counter(word for _, text in corpus for word in set(self._words(text)))
+        cases = []
+        for chunk_id, text in rng.sample(corpus, min(options["queries"], len(corpus))):
+            words = self._words(text)
+            if len(words) < 4:
+                continue
+            rare = sorted(set(words), key=lambda w: (frequency[w], -len(w)))[:3]
+            start = rng.randrange(max(1, len(words) - 12))
+            cases.append((chunk_id, "keyword", " ".join(rare)))
+            cases.append((chunk_id, "passage", " ".join(words[start : start + 12])))
+        if not cases:
+            raise CommandError("Os trechos sorteados são curtos demais para gerar consultas.")
+
+        try:
+            # Up front (and cached): embedding time is the same for both modes
+            vectors = embeddings.embed([query for _, _, query in cases])
+        except embeddings.EmbeddingError as e:
+            raise CommandError(str(e))
+
+        runs = {
+            "vector": lambda query, vector: kb_retrieval.search(hash_ids, vector, k),
+            "hybrid": lambda query, vector: kb_retrieval.hybrid_search(hash_ids, query, vector, k),
+        }
+        results = {}
+        try:
+            for mode, run in runs.items():
+                run(cases[0][2], vectors[0])  # warm the pool and the caches
+                for (chunk_id, kind, query), vector in zip(cases, vectors):
+                    started = time.perf_counter()
+                    chunks = run(query, vector)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    stats = results.setdefault((kind, mode), {"hits": 0, "ms": []})
+                    stats["hits"] += any(chunk.id == chunk_id for chunk in chunks)
+                    stats["ms"].append(elapsed)
+        except psycopg2.Error as e:
+            raise CommandError(f"Falha ao consultar o Postgres do n8n: {e}")
+
+        for (kind, mode), stats in sorted(results.items()):
+            ms = sorted(stats["ms"])
+            report = {
+                "queries": kind,
+                "mode": mode,
+                "count": len(ms),
+                f"recall@{k}": round(stats["hits"] / len(ms), 3),
+                "mean_ms": round(statistics.fmean(ms), 2),
+                "p95_ms": round(ms[min(len(ms) - 1, int(len(ms) * 0.95))], 2),
+            }
+            self.stdout.write(json.dumps(report, ensure_ascii=False))
+
+    @staticmethod
+    def _words(text):
+        return [word.lower() for word in _WORD.findall(text or "")]
+
+    @staticmethod
+    def _sample(hash_ids, limit):
+        with n8n_db.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT v.id::text, v.text FROM n8n_vectors v"
+                " JOIN n8n_vector_collections c ON v.collection_id = c.uuid"
+                " WHERE c.name = ANY(%s) ORDER BY random() LIMIT %s",
+                [list(hash_ids), limit],
+            )
+            return [(chunk_id, text) for chunk_id, text in cur.fetchall() if text]
@@ -0,0 +1,59 @@
+import json
+
+import psycopg2
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.services import embeddings, kb_retrieval, n8n_db
+
+
+class Command(BaseCommand):
+    help = (
+        "Busca os trechos mais próximos de uma consulta nas coleções PGVector do Postgres "
+        "do n8n (sem verificar acesso), para testar a busca semântica direta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("hash_ids", nargs="+", help="KBs (nomes das coleções PGVector)")
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument("--query", help="Texto da consulta (gera o embedding)")
+        source.add_argument(
+            "--vector-file", help="Arquivo JSON com o vetor da consulta (lista de números)"
+        )
+        parser.add_argument("--top-k", type=int, default=kb_retrieval.default_top_k())
+        parser.add_argument(
+            "--hybrid",
+            action="store_true",
+            help="Combina a busca vetorial com a busca textual (RRF); exige --query",
+        )
+
+    def handle(self, *args, **options):
+        if not n8n_db.is_configured():
+            raise CommandError("Configuração do Postgres do n8n ausente (N8N_POSTGRES_HOST).")
+        if options["hybrid"] and not options["query"]:
+            raise CommandError("--hybrid exige --query.")
+
+        if options["vector_file"]:
+            try:
+                with open(options["vector_file"], encoding="utf-8") as fh:
+                    vector = [float(x) for x in json.load(fh)]
+            except (OSError, ValueError, TypeError) as e:
+                raise CommandError(f"Vetor inválido: {e}")
+        else:
+            try:
+                vector = embeddings.embed_one(options["query"])
+            except embeddings.EmbeddingError as e:
+                raise CommandError(str(e))
+
+        try:
+            if options["hybrid"]:
+                chunks = kb_retrieval.hybrid_search(
+                    options["hash_ids"], options["query"], vector, options["top_k"]
+                )
+            else:
+                chunks = kb_retrieval.search(options["hash_ids"], vector, options["top_k"])
+        except psycopg2.Error as e:
+            raise CommandError(f"Falha ao consultar o Postgres do n8n: {e}")
+
+        self.stdout.write(
+            json.dumps([chunk.as_dict() for chunk in chunks], ensure_ascii=False, indent=2)
+        )
@@ -0,0 +1,103 @@
+import json
+
+import psycopg2
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.models.kb import KBCatalog
+from authentication.services import kb_ann, n8n_db
+
+
+class Command(BaseCommand):
+    help = (
+        "Converte o armazenamento dos vetores dos KBs no índice ANN (vector, halfvec ou "
+        "bit, com re-ranqueamento em precisão total) e mostra o tamanho do índice e o "
+        "recall@k antes e depois. Os KBs são convertidos um a um, sem bloquear escritas; "
+        "os já convertidos são pulados, então a conversão pode ser feita em lotes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("hash_ids", nargs="*", help="KBs a converter (padrão: todos)")
+        parser.add_argument("--storage", choices=kb_ann.STORAGES, required=True)
+        parser.add_argument("--method", choices=kb_ann.METHODS, default=kb_ann.default_method())
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=0,
+            help="Converte no máximo N KBs nesta execução (padrão: todos).",
+        )
+        parser.add_argument("--k", type=int, default=10, help="k do recall (padrão 10).")
+        parser.add_argument(
+            "--samples", type=int, default=20, help="Consultas usadas no recall (padrão 20)."
+        )
+        parser.add_argument(
+            "--no-recall", action="store_true", help="Não mede o recall (só o tamanho)."
+        )
+
+    def handle(self, *args, **options):
+        if not n8n_db.is_configured():
+            raise CommandError("Configuração do Postgres do n8n ausente (N8N_POSTGRES_HOST).")
+        storage = options["storage"]
+        converted = pending = 0
+        try:
+            found = kb_ann.collections(options["hash_ids"] or None)
+            chosen = kb_ann.kb_storages(c.hash_id for c in found)
+            for collection in found:
+                current = self._index(collection)
+                if current:
+                    done = current.get("storage", "vector") == storage
+                else:  # too small for an index yet: built with the storage later
+                    done = chosen.get(collection.hash_id) == storage
+                if done:
+                    continue  # converted in an earlier run
+                if options["batch_size"] and converted >= options["batch_size"]:
+                    pending += 1
+                    continue
+                # Kept by the KB, so later rebuilds (worker) keep the storage
+                if not KBCatalog.objects.filter(external_id=collection.hash_id).update(
+                    vector_storage=storage
+                ):
+                    self.stdout.write(
+                        json.dumps(
+                            {
+                                "hash_id": collection.hash_id,
+                                "action": "skipped",
+                                "reason": "catalog",
+                            }
+                        )
+                    )
+                    continue
+                report = {"hash_id": collection.hash_id, "rows": collection.rows}
+                report["before"] = self._measure(collection, options)
+                build = kb_ann.build(collection, options["method"], storage=storage)
+                report.update(action=build["action"], reason=build.get("reason"))
+                report["after"] = self._measure(collection, options)
+                self.stdout.write(json.dumps(report, ensure_ascii=False))
+                converted += 1
+        except psycopg2.Error as e:
+            raise CommandError(f"Falha no Postgres do n8n: {e}")
+
+        message = f"{converted} KBs convertidos para {storage}."
+        if pending:
+            message += f" {pending} ainda pendentes (rode novamente)."
+        self.stdout.write(self.style.SUCCESS(message))
+
+    @staticmethod
+    def _index(collection):
+        with n8n_db.connection() as conn, conn.cursor() as cur:
+            return kb_ann.current_indexes(cur, [collection.uuid]).get(collection.uuid)
+
+    @staticmethod
+    def _measure(collection, options):
+        with n8n_db.connection() as conn, conn.cursor() as cur:
+            index = kb_ann.current_indexes(cur, [collection.uuid]).get(collection.uuid)
+            size = kb_ann.index_bytes(cur, collection.uuid) if index else None
+        result = {
+            "storage": index.get("storage", "vector") if index else None,
+            "index_bytes": size,
+        }
+        if index and not options["no_recall"]:
+            recall = kb_ann.measure_recall(collection, options["k"], options["samples"])
+            result.update(
+                {key: recall.get(key) for key in ("recall", "exact_ms", "ann_ms")}, k=options["k"]
+            )
+        return result
@@ -0,0 +1,64 @@
+import redis
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from authentication.services.token_store import RedisTokenStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o estado dos refresh tokens ainda válidos (emitidos e na blacklist) das "
+        "tabelas do simplejwt (OutstandingToken/BlacklistedToken) para o Redis, antes de "
+        "usar TOKEN_STORE=redis. Pode ser repetido; --purge apaga as linhas copiadas e as "
+        "expiradas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Tokens por pipeline (padrão 1000)."
+        )
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="Apaga das tabelas os tokens copiados e os já expirados.",
+        )
+
+    def handle(self, *args, **options):
+        store = RedisTokenStore()
+        batch_size = max(1, options["batch_size"])
+        now = timezone.now()
+        tokens = (
+            OutstandingToken.objects.filter(expires_at__gt=now)
+            .exclude(jti__isnull=True)
+            .order_by("id")
+            .values_list("id", "jti", "user_id", "expires_at", "blacklistedtoken__id")
+        )
+
+        copied, last_id = 0, 0
+        try:
+            while True:
+                batch = list(tokens.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                copied += store.load(
+                    (jti, user_id, expires_at.timestamp(), blacklisted is not None)
+                    for _, jti, user_id, expires_at, blacklisted in batch
+                )
+        except redis.RedisError as e:
+            raise CommandError(f"Falha ao gravar no Redis: {e}")
+
+        purged = 0
+        if options["purge"]:
+            # Cascades to BlacklistedToken
+            purged, _ = OutstandingToken.objects.filter(id__lte=last_id).delete()
+            expired, _ = OutstandingToken.objects.filter(expires_at__lte=now).delete()
+            purged += expired
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{copied} tokens copiados para o Redis"
+                + (f", {purged} linhas apagadas das tabelas." if options["purge"] else ".")
+            )
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from authentication.services import acl
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula a lista de acesso materializada (UserResourceAccess: projetos, KBs e "
+        "agentes alcançados por cada usuário) a partir dos projetos, KBLink e agentes dos "
+        "projetos. Necessário após alterações feitas sem signals (update(), SQL direto)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500, help="Usuários por lote (padrão 500)."
+        )
+
+    def handle(self, *args, **options):
+        stats = acl.rebuild(batch_size=max(1, options["batch_size"]))
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Lista de acesso recalculada: {users} usuários, {added} linhas criadas, "
+                "{removed} removidas.".format(**stats)
+            )
+        )
@@ -0,0 +1,147 @@
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import redis
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from authentication.services import kb_ann, kb_catalog, kb_ingestion
+from authentication.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Processa os jobs de ingestão de arquivos nos KBs (fila Redis KB_JOB_QUEUE)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=getattr(settings, "KB_WORKER_CONCURRENCY", 4),
+            help="Número de uploads enviados ao n8n em paralelo.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Segundos de espera bloqueante na fila antes de verificar jobs pendentes.",
+        )
+        parser.add_argument(
+            "--sweep-interval",
+            type=float,
+            default=15.0,
+            help="Intervalo (s) entre varreduras de jobs com retry vencido ou perdidos.",
+        )
+        parser.add_argument(
+            "--catalog-interval",
+            type=float,
+            default=kb_catalog.reconcile_interval(),
+            help="Intervalo (s) entre reconciliações do catálogo de KBs com o n8n (0 desativa).",
+        )
+        parser.add_argument(
+            "--ann-interval",
+            type=float,
+            default=kb_ann.maintain_interval(),
+            help=(
+                "Intervalo (s) entre verificações dos índices ANN dos KBs que receberam "
+                "arquivos (0 desativa)."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options["concurrency"])
+        poll_interval = options["poll_interval"]
+        sweep_interval = options["sweep_interval"]
+        catalog_interval = options["catalog_interval"]
+        ann_interval = options["ann_interval"] if kb_ann.enabled() else 0
+
+        stopping = threading.Event()
+        # One slot per worker thread: never pop more ids than can be run right away,
+        # so jobs left in Redis stay visible to other worker processes.
+        slots = threading.Semaphore(concurrency)
+
+        def stop(signum, frame):
+            self.stdout.write("Finalizando após os jobs em andamento...")
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        def work(job_id):
+            close_old_connections()
+            try:
+                kb_ingestion.run_job(job_id)
+            except Exception:
+                logger.exception("KB ingestion job %s crashed", job_id)
+            finally:
+                close_old_connections()
+                slots.release()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"KB worker ouvindo '{kb_ingestion.queue_name()}' (concurrency={concurrency})."
+            )
+        )
+
+        def maintain_indexes():
+            try:
+                kb_ann.maintain_pending()  # logs each build
+            except Exception:
+                logger.exception("KB ANN index maintenance failed")
+
+        last_sweep = 0.0
+        last_catalog = 0.0
+        last_ann = 0.0
+        ann_build = None
+        # Index builds can take minutes: their own thread, one at a time
+        with ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="kb-job"
+        ) as pool, ThreadPoolExecutor(max_workers=1, thread_name_prefix="kb-ann") as ann_pool:
+            while not stopping.is_set():
+                if (
+                    ann_interval > 0
+                    and time.monotonic() - last_ann >= ann_interval
+                    and (ann_build is None or ann_build.done())
+                ):
+                    ann_build = ann_pool.submit(maintain_indexes)
+                    last_ann = time.monotonic()
+
+                if time.monotonic() - last_sweep >= sweep_interval:
+                    close_old_connections()
+                    try:
+                        recovered, pushed = kb_ingestion.sweep()
+                        if recovered or pushed:
+                            logger.info("KB sweep: %s recovered, %s re-queued", recovered, pushed)
+                    except Exception:
+                        logger.exception("KB sweep failed")
+                    last_sweep = time.monotonic()
+
+                if catalog_interval > 0 and time.monotonic() - last_catalog >= catalog_interval:
+                    close_old_connections()
+                    try:
+                        logger.info("KB catalog reconciled: %s", kb_catalog.reconcile())
+                    except Exception:
+                        logger.exception("KB catalog reconcile failed")
+                    last_catalog = time.monotonic()
+
+                if not slots.acquire(timeout=poll_interval):
+                    continue
+                try:
+                    item = get_redis().brpop(kb_ingestion.queue_name(), timeout=poll_interval)
+                except redis.RedisError as e:
+                    slots.release()
+                    logger.warning("KB worker could not read the queue: %s", e)
+                    stopping.wait(poll_interval)
+                    continue
+
+                if item is None:
+                    slots.release()
+                    continue
+                pool.submit(work, item[1].decode())
+
+        self.stdout.write(self.style.SUCCESS("KB worker finalizado."))
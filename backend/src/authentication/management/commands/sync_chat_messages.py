@@ -0,0 +1,69 @@
+import logging
+import signal
+import threading
+
+import psycopg2
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from authentication.services import chat_mirror, n8n_db
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia as mensagens novas da memória de chat do n8n (n8n_chat_histories) para a "
+        "tabela local chat_messages, usada pela busca."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Repete a sincronização até ser interrompido (serviço chat_sync).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=chat_mirror.sync_interval(),
+            help="Intervalo (s) entre sincronizações com --loop.",
+        )
+
+    def handle(self, *args, **options):
+        if not n8n_db.is_configured():
+            raise CommandError("Acesso ao Postgres do n8n não configurado (N8N_POSTGRES_HOST).")
+        interval = max(0.5, options["interval"])
+        if not options["loop"]:
+            try:
+                stats = chat_mirror.sync()
+            except psycopg2.Error as e:
+                raise CommandError(f"Falha ao ler a memória de chat do n8n: {e}")
+            self.stdout.write(self.style.SUCCESS(self._describe(stats)))
+            return
+
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(self.style.SUCCESS(f"Sincronizando mensagens a cada {interval}s."))
+        while not stopping.is_set():
+            close_old_connections()
+            try:
+                stats = chat_mirror.sync()
+                if stats["copied"] or stats["backfilled"] or stats["linked"]:
+                    logger.info(self._describe(stats))
+            except Exception:
+                logger.exception("Chat memory sync failed")
+            stopping.wait(interval)
+
+    @staticmethod
+    def _describe(stats):
+        return (
+            "Mensagens sincronizadas: {copied} novas, {backfilled} recuperadas, "
+            "{linked} vinculadas a sessões (até o id {high_water_mark}).".format(**stats)
+        )
@@ -0,0 +1,23 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.services import kb_catalog, n8n_client, n8n_guard
+
+
+class Command(BaseCommand):
+    help = "Sincroniza o catálogo local de KBs (KBCatalog) com o n8n (kb/list-all)."
+
+    def handle(self, *args, **options):
+        if not n8n_client.is_configured():
+            raise CommandError("Configuração do N8N ausente (N8N_BASE_URL/N8N_KB_KEY).")
+        try:
+            stats = kb_catalog.reconcile()
+        except (requests.RequestException, ValueError, n8n_guard.UpstreamRejected) as e:
+            raise CommandError(f"Falha ao listar KBs no n8n: {e}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Catálogo de KBs sincronizado: {created} novas, {updated} atualizadas, "
+                "{deleted} removidas, {file_counts} contagens de arquivos.".format(**stats)
+            )
+        )
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:31
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import authentication.models.kb_ingestion_job
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0034_add_favorite_columns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KBIngestionJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(null=True)),
+                ("hash_id", models.CharField(db_index=True, max_length=128)),
+                (
+                    "file",
+                    models.FileField(
+                        blank=True,
+                        max_length=500,
+                        storage=authentication.models.kb_ingestion_job.kb_upload_storage,
+                        upload_to=authentication.models.kb_ingestion_job.kb_upload_to,
+                    ),
+                ),
+                ("file_name", models.CharField(max_length=255)),
+                (
+                    "content_type",
+                    models.CharField(default="application/octet-stream", max_length=128),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "QUEUED"),
+                            ("running", "RUNNING"),
+                            ("done", "DONE"),
+                            ("failed", "FAILED"),
+                        ],
+                        default="queued",
+                        max_length=16,
+                    ),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField(blank=True, null=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("error", models.TextField(blank=True, default="")),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="kb_ingestion_jobs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "kb_ingestion_jobs",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"],
+                        name="kb_ingestio_status_5700eb_idx",
+                    )
+                ],
+            },
+        ),
+    ]
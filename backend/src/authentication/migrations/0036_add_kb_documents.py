@@ -0,0 +1,60 @@
+# Generated by Django 5.2.3 on 2026-10-17 04:10
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0035_add_kb_ingestion_jobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KBDocument",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("external_id", models.CharField(max_length=128)),
+                ("content_hash", models.CharField(max_length=64)),
+                ("file_name", models.CharField(max_length=255)),
+                ("size", models.PositiveBigIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "kb_documents",
+            },
+        ),
+        migrations.AddField(
+            model_name="kbingestionjob",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name="kbingestionjob",
+            index=models.Index(
+                fields=["hash_id", "content_hash"],
+                name="kb_ingestio_hash_id_af3658_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="kbdocument",
+            index=models.Index(
+                fields=["external_id", "file_name"],
+                name="kb_document_externa_630249_idx",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="kbdocument",
+            unique_together={("external_id", "content_hash")},
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-17 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0036_add_kb_documents"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KBCatalog",
+            fields=[
+                (
+                    "external_id",
+                    models.CharField(max_length=128, primary_key=True, serialize=False),
+                ),
+                ("name", models.CharField(blank=True, max_length=255)),
+                ("description", models.TextField(blank=True, default="")),
+                ("file_count", models.PositiveIntegerField(blank=True, null=True)),
+                ("data", models.JSONField(blank=True, default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("synced_at", models.DateTimeField(blank=True, null=True)),
+                ("deleted_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "db_table": "kb_catalog",
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-17 10:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0037_add_kb_catalog"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChatMessage",
+            fields=[
+                (
+                    "source_id",
+                    models.BigIntegerField(primary_key=True, serialize=False),
+                ),
+                ("session_key", models.CharField(db_index=True, max_length=255)),
+                ("role", models.CharField(default="human", max_length=16)),
+                ("content", models.TextField(blank=True, default="")),
+                ("synced_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "session",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="messages",
+                        to="authentication.chatsession",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "chat_messages",
+                "ordering": ["source_id"],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-17 11:05
+
+from django.db import migrations
+
+TABLE = "chat_messages"
+INDEX = "chat_messages_content_ft"
+
+
+def add_fulltext(apps, schema_editor):
+    # FULLTEXT is MySQL-only; other backends search with a substring match
+    if schema_editor.connection.vendor != "mysql":
+        return
+    schema_editor.execute(f"CREATE FULLTEXT INDEX `{INDEX}` ON `{TABLE}` (`content`)")
+
+
+def drop_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    schema_editor.execute(f"DROP INDEX `{INDEX}` ON `{TABLE}`")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0038_add_chat_messages"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext, drop_fulltext),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0039_chat_messages_fulltext"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="kbcatalog",
+            name="version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="AnswerCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("namespace", models.CharField(max_length=64)),
+                ("question_hash", models.CharField(max_length=64)),
+                ("question", models.TextField()),
+                ("answer", models.TextField()),
+                ("embedding", models.BinaryField(blank=True, null=True)),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_hit_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "agent",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cached_answers",
+                        to="authentication.agents",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "chat_answer_cache",
+                "indexes": [
+                    models.Index(
+                        fields=["namespace", "created_at"],
+                        name="chat_answer_namespa_902074_idx",
+                    )
+                ],
+                "unique_together": {("namespace", "question_hash")},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0040_answer_cache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="kbcatalog",
+            name="vector_storage",
+            field=models.CharField(blank=True, default="", max_length=16),
+        ),
+    ]
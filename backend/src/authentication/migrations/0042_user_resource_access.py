@@ -0,0 +1,89 @@
+# Generated by Django 5.2.3 on 2026-10-17 16:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_access(apps, schema_editor):
+    # Same rows as services.acl.rebuild, from the historical models
+    UserResourceAccess = apps.get_model("authentication", "UserResourceAccess")
+    Projects = apps.get_model("authentication", "Projects")
+    KBLink = apps.get_model("authentication", "KBLink")
+    ProjectsAgentsThrough = apps.get_model("authentication", "ProjectsAgentsThrough")
+
+    rows = set()
+    for user_id, project_id in Projects.users.through.objects.values_list(
+        "userprofile_id", "projects_id"
+    ):
+        rows.add((user_id, "project", str(project_id)))
+    for user_id, hash_id in KBLink.objects.filter(project__users__isnull=False).values_list(
+        "project__users__id", "external_id"
+    ):
+        rows.add((user_id, "kb", hash_id))
+    for user_id, agent_id in ProjectsAgentsThrough.objects.filter(
+        project__users__isnull=False
+    ).values_list("project__users__id", "agent_id"):
+        rows.add((user_id, "agent", str(agent_id)))
+    UserResourceAccess.objects.bulk_create(
+        [
+            UserResourceAccess(user_id=user_id, resource_type=kind, resource_id=ref)
+            for user_id, kind, ref in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0041_kb_vector_storage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserResourceAccess",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "resource_type",
+                    models.CharField(
+                        choices=[
+                            ("project", "Projeto"),
+                            ("kb", "KB"),
+                            ("agent", "Agente"),
+                        ],
+                        max_length=16,
+                    ),
+                ),
+                ("resource_id", models.CharField(max_length=128)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resource_access",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "user_resource_access",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "resource_type", "resource_id"),
+                        name="uq_user_resource_access",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_access, migrations.RunPython.noop),
+    ]
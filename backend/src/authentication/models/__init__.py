@@ -1,11 +1,15 @@
+from .access import UserResourceAccess
 from .agents import Agents
+from .answer_cache import AnswerCacheEntry
 from .boards import Boards
 from .chat_sessions import ChatSession
+from .chat_messages import ChatMessage
 from .chat_favorites import ChatFavorite
 from .clients import Clients
 from .expertise_area import ExpertiseArea
 from .invite import Invite
-from .kb import KBLink
+from .kb import KBCatalog, KBDocument, KBLink
+from .kb_ingestion_job import KBIngestionJob
 from .projects import Projects, ProjectsAgentsThrough
 from .translation import Translation
 from .user_invites import UserInvites
@@ -0,0 +1,37 @@
+from django.db import models
+
+from authentication.models.user_profile import UserProfile
+
+
+class UserResourceAccess(models.Model):
+    """Materialised access list: one row per resource a user reaches through their
+    projects (the project itself, each linked KB, each project agent).
+
+    Derived from ``Projects.users``, ``KBLink`` and ``ProjectsAgentsThrough``: kept
+    current by ``authentication.signals`` (``services.acl.sync_users``) and rebuilt with
+    ``manage.py rebuild_acl``. Permission checks read a user's rows through the unique
+    index instead of joining those tables.
+    """
+
+    PROJECT = "project"
+    KB = "kb"
+    AGENT = "agent"
+    RESOURCE_TYPES = [(PROJECT, "Projeto"), (KB, "KB"), (AGENT, "Agente")]
+
+    user = models.ForeignKey(
+        UserProfile, on_delete=models.CASCADE, related_name="resource_access", db_index=False
+    )
+    resource_type = models.CharField(max_length=16, choices=RESOURCE_TYPES)
+    # Project/agent UUID (str) or KB external_id
+    resource_id = models.CharField(max_length=128)
+
+    class Meta:
+        db_table = "user_resource_access"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "resource_type", "resource_id"], name="uq_user_resource_access"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.resource_type}:{self.resource_id}"
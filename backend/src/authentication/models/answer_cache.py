@@ -0,0 +1,30 @@
+from django.db import models
+
+from authentication.models.agents import Agents
+
+
+class AnswerCacheEntry(models.Model):
+    """Answer of an agent to a standalone question, reused for the same (or a very
+    similar) question while the agent's KBs stay unchanged.
+
+    ``namespace`` hashes the agent id and the version of each KB linked to it
+    (``services.answer_cache.namespace``), so a KB change makes its entries unreachable.
+    """
+
+    agent = models.ForeignKey(Agents, on_delete=models.CASCADE, related_name="cached_answers")
+    namespace = models.CharField(max_length=64)
+    question_hash = models.CharField(max_length=64)  # SHA-256 of the normalised question
+    question = models.TextField()
+    answer = models.TextField()
+    embedding = models.BinaryField(null=True, blank=True)  # unit float32 vector
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "chat_answer_cache"
+        unique_together = [("namespace", "question_hash")]
+        indexes = [models.Index(fields=["namespace", "created_at"])]
+
+    def __str__(self):
+        return f"Cached answer {self.id} of agent {self.agent_id}"
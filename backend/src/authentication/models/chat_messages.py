@@ -0,0 +1,31 @@
+from django.db import models
+
+from authentication.models.chat_sessions import ChatSession
+
+
+class ChatMessage(models.Model):
+    """Copy of a row of the n8n chat memory (``n8n_chat_histories``), used for search.
+
+    Rows are appended by ``services.chat_mirror.sync`` in ``source_id`` order; ``session``
+    stays empty until a ``ChatSession`` with the same ``session_key`` exists.
+    """
+
+    source_id = models.BigIntegerField(primary_key=True)  # n8n_chat_histories.id
+    session = models.ForeignKey(
+        ChatSession,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="messages",
+    )
+    session_key = models.CharField(max_length=255, db_index=True)
+    role = models.CharField(max_length=16, default="human")  # human | ai
+    content = models.TextField(blank=True, default="")
+    synced_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "chat_messages"
+        ordering = ["source_id"]
+
+    def __str__(self):
+        return f"Message {self.source_id} ({self.role}) in {self.session_key}"
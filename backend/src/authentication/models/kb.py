@@ -14,3 +14,47 @@ class KBLink(models.Model):
     class Meta:
         db_table = "kb_links"
         unique_together = [("project", "external_id")]
+
+
+class KBDocument(models.Model):
+    """Content hash (SHA-256) of a file indexed in a KB, used to skip re-embedding
+    bytes the KB already has. Rows are written by the backend after n8n indexed the file."""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    external_id = models.CharField(max_length=128)
+    content_hash = models.CharField(max_length=64)
+    file_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "kb_documents"
+        unique_together = [("external_id", "content_hash")]
+        indexes = [models.Index(fields=["external_id", "file_name"])]
+
+
+class KBCatalog(models.Model):
+    """Local copy of the KBs stored in n8n (``enlaight_knowledge_bases``), so listing a
+    project's KBs does not need to fetch every KB from n8n.
+
+    Kept current by the KB create/edit/delete views and reconciled periodically with
+    ``kb/list-all`` (``services.kb_catalog.reconcile``). KBs gone from n8n keep a row
+    with ``deleted_at`` set, so dangling ``KBLink`` rows are told apart from KBs that
+    were never synced. ``version`` goes up on every change made through the backend
+    (``services.kb_catalog.invalidate_reads``); answers cached from the KB carry it.
+    """
+
+    external_id = models.CharField(max_length=128, primary_key=True)
+    name = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True, default="")
+    file_count = models.PositiveIntegerField(null=True, blank=True)
+    version = models.PositiveIntegerField(default=0)
+    # How the KB's ANN index stores vectors (services.kb_ann.STORAGES); "" = KB_ANN_STORAGE
+    vector_storage = models.CharField(max_length=16, blank=True, default="")
+    data = models.JSONField(default=dict, blank=True)  # row as returned by n8n
+    updated_at = models.DateTimeField(auto_now=True)
+    synced_at = models.DateTimeField(null=True, blank=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = "kb_catalog"
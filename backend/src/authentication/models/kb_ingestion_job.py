@@ -0,0 +1,69 @@
+import os
+from enum import Enum
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+
+from authentication.models.user_profile import UserProfile
+from core.models.base import Base
+
+
+class KBJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+def kb_upload_storage():
+    return FileSystemStorage(location=settings.KB_UPLOAD_ROOT)
+
+
+def kb_upload_to(instance, filename):
+    _, ext = os.path.splitext(filename)
+    return f"{instance.hash_id}/{instance.id}{ext.lower()}"
+
+
+class KBIngestionJob(Base):
+    """Upload waiting to be (or already) sent to the n8n ``kb/file/add`` webhook.
+
+    The file is kept on ``KB_UPLOAD_ROOT`` until the job reaches a final state.
+    """
+
+    hash_id = models.CharField(max_length=128, db_index=True)
+    user = models.ForeignKey(
+        UserProfile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="kb_ingestion_jobs",
+    )
+    file = models.FileField(
+        upload_to=kb_upload_to, storage=kb_upload_storage, max_length=500, blank=True
+    )
+    file_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=128, default="application/octet-stream")
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    status = models.CharField(
+        max_length=16,
+        choices=[(s.value, s.name) for s in KBJobStatus],
+        default=KBJobStatus.QUEUED.value,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    class Meta:
+        db_table = "kb_ingestion_jobs"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+            models.Index(fields=["hash_id", "content_hash"]),
+        ]
+
+    def __str__(self):
+        return f"KB job {self.id} ({self.file_name} -> {self.hash_id}): {self.status}"
@@ -1,6 +1,12 @@
+import uuid
+from collections import defaultdict
+from functools import cached_property
+from typing import Dict, Set
+
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import BasePermission
 
+from authentication.models.access import UserResourceAccess
 from authentication.models.kb import KBLink
 from authentication.models.projects import Projects
 
@@ -13,6 +19,76 @@ def is_admin_by_role(user) -> bool:
     )
 
 
+def _as_uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+class AccessContext:
+    """What a user can reach through their projects: the projects, the KBs linked to
+    them and their agents, read from the materialised access list
+    (``UserResourceAccess``) with one lookup on its unique index the first time a
+    permission check needs them, then answered from memory.
+
+    Obtained with ``access_context(user)``, which keeps it on the user object, i.e. for
+    the request that authenticated it. Membership changes made later in the same
+    request are not seen.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def is_admin(self) -> bool:
+        return bool(getattr(self.user, "is_superuser", False) or is_admin_by_role(self.user))
+
+    @cached_property
+    def _resources(self) -> Dict[str, Set[str]]:
+        resources: Dict[str, Set[str]] = defaultdict(set)
+        rows = UserResourceAccess.objects.filter(user_id=self.user.id).values_list(
+            "resource_type", "resource_id"
+        )
+        for resource_type, resource_id in rows:
+            resources[resource_type].add(resource_id)
+        return resources
+
+    @cached_property
+    def project_ids(self) -> Set[uuid.UUID]:
+        return {uuid.UUID(ref) for ref in self._resources[UserResourceAccess.PROJECT]}
+
+    @property
+    def kb_ids(self) -> Set[str]:
+        return self._resources[UserResourceAccess.KB]
+
+    @cached_property
+    def agent_ids(self) -> Set[uuid.UUID]:
+        return {uuid.UUID(ref) for ref in self._resources[UserResourceAccess.AGENT]}
+
+    def can_access_project(self, project_id) -> bool:
+        return self.is_admin or _as_uuid(project_id) in self.project_ids
+
+    def can_access_kb(self, hash_id: str) -> bool:
+        return self.is_admin or hash_id in self.kb_ids
+
+    def can_access_agent(self, agent_id) -> bool:
+        return self.is_admin or _as_uuid(agent_id) in self.agent_ids
+
+    def project_has_kb(self, project_id, hash_id: str) -> bool:
+        """Whether the KB is linked to the project (``KBLink`` unique index)."""
+        if not self.can_access_kb(hash_id):
+            return False
+        return KBLink.objects.filter(project_id=project_id, external_id=hash_id).exists()
+
+
+def access_context(user) -> AccessContext:
+    """The ``AccessContext`` of the authenticated user, created once per request."""
+    context = getattr(user, "_access_context", None)
+    if context is None:
+        context = AccessContext(user)
+        # vars(): ClaimsPrincipal is a frozen dataclass
+        vars(user)["_access_context"] = context
+    return context
+
+
 class IsAdminByRole(BasePermission):
     message = "Only administrators can perform this action."
 
@@ -27,7 +103,8 @@ class IsAdminOrRelatedToBot(BasePermission):
             return False
         if is_admin_by_role(user):
             return True
-        return obj.projects.filter(users__id=user.id).exists()
+        # Role only: unlike the other checks, superusers get no bypass here
+        return _as_uuid(obj.pk) in access_context(user).agent_ids
 
 
 def assert_user_project_access(user, project: Projects) -> None:
@@ -39,11 +116,8 @@ def assert_user_project_access(user, project: Projects) -> None:
     if not user or not getattr(user, "is_authenticated", False):
         raise PermissionDenied("Autenticação obrigatória.")
 
-    if getattr(user, "is_superuser", False) or is_admin_by_role(user):
-        return
-
     # Non-admins: must belong to the project
-    if not project.users.filter(id=user.id).exists():
+    if not access_context(user).can_access_project(project.pk):
         raise PermissionDenied("Você não tem acesso a este projeto.")
 
 
@@ -56,10 +130,19 @@ def assert_user_kb_access(user, hash_id: str) -> None:
     if not user or not getattr(user, "is_authenticated", False):
         raise PermissionDenied("Autenticação obrigatória.")
 
-    if getattr(user, "is_superuser", False) or is_admin_by_role(user):
-        return
-
     # Find any project that links to this KB and is associated to the user
-    if not KBLink.objects.filter(external_id=hash_id, project__users__id=user.id).exists():
+    if not access_context(user).can_access_kb(hash_id):
         # Return generic denial to avoid leaking existence information across tenants
         raise PermissionDenied("Você não tem acesso a este KB.")
+
+
+def assert_user_agent_access(user, agent) -> None:
+    """Ensures the user can talk to the agent (assigned to one of the user's projects).
+
+    Admins/superusers bypass. Raises PermissionDenied otherwise.
+    """
+    if not user or not getattr(user, "is_authenticated", False):
+        raise PermissionDenied("Autenticação obrigatória.")
+
+    if not access_context(user).can_access_agent(agent.pk):
+        raise PermissionDenied("Você não tem acesso a este agente.")
@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+
+class AgentChatSerializer(serializers.Serializer):
+    message = serializers.CharField(required=True, max_length=32000)
+    session_id = serializers.CharField(required=False, max_length=255)
+    metadata = serializers.DictField(required=False)
+    # False skips the answer cache (services.answer_cache) for this message
+    cache = serializers.BooleanField(required=False, default=True)
@@ -0,0 +1,13 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class KBFileBatchAddSerializer(serializers.Serializer):
+    files = serializers.ListField(child=serializers.FileField(), allow_empty=False)
+    hash_id = serializers.CharField(required=True, max_length=256)
+
+    def validate_files(self, value):
+        max_files = int(getattr(settings, "KB_BATCH_MAX_FILES", 100))
+        if len(value) > max_files:
+            raise serializers.ValidationError(f"Envie no máximo {max_files} arquivos por lote.")
+        return value
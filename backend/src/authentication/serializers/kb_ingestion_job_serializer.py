@@ -0,0 +1,47 @@
+from rest_framework import serializers
+
+from authentication.models.kb_ingestion_job import KBIngestionJob
+
+
+def _ms(start, end):
+    if not start or not end:
+        return None
+    return int((end - start).total_seconds() * 1000)
+
+
+class KBIngestionJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source="id", read_only=True)
+    file = serializers.CharField(source="file_name", read_only=True)
+    queued_at = serializers.DateTimeField(source="created_at", read_only=True)
+    wait_ms = serializers.SerializerMethodField(
+        help_text="Tempo entre o upload e o início do processamento."
+    )
+    duration_ms = serializers.SerializerMethodField(
+        help_text="Tempo de processamento (início da 1ª tentativa até o fim)."
+    )
+
+    class Meta:
+        model = KBIngestionJob
+        fields = [
+            "job_id",
+            "hash_id",
+            "file",
+            "content_hash",
+            "status",
+            "attempts",
+            "queued_at",
+            "started_at",
+            "finished_at",
+            "next_attempt_at",
+            "wait_ms",
+            "duration_ms",
+            "result",
+            "error",
+        ]
+        read_only_fields = fields
+
+    def get_wait_ms(self, obj):
+        return _ms(obj.created_at, obj.started_at)
+
+    def get_duration_ms(self, obj):
+        return _ms(obj.started_at, obj.finished_at)
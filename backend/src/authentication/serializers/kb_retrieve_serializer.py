@@ -0,0 +1,27 @@
+from django.conf import settings
+from rest_framework import serializers
+
+
+class KBRetrieveSerializer(serializers.Serializer):
+    hash_ids = serializers.ListField(
+        child=serializers.CharField(max_length=128), allow_empty=False, max_length=50
+    )
+    query = serializers.CharField(required=False, max_length=8000)
+    vector = serializers.ListField(
+        child=serializers.FloatField(), required=False, allow_empty=False, max_length=4096
+    )
+    top_k = serializers.IntegerField(required=False, min_value=1)
+    mode = serializers.ChoiceField(choices=["vector", "hybrid"], required=False, default="vector")
+
+    def validate_top_k(self, value):
+        return min(value, int(getattr(settings, "KB_RETRIEVAL_MAX_TOP_K", 50)))
+
+    def validate(self, attrs):
+        if attrs.get("mode") == "hybrid":
+            # The lexical side needs the text; vector is optional (embedding of query)
+            if not attrs.get("query"):
+                raise serializers.ValidationError("O modo hybrid exige query.")
+            return attrs
+        if bool(attrs.get("query")) == bool(attrs.get("vector")):
+            raise serializers.ValidationError("Informe query ou vector (apenas um).")
+        return attrs
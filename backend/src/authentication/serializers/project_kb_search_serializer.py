@@ -0,0 +1,12 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from authentication.serializers.kb_retrieve_serializer import KBRetrieveSerializer
+
+
+class ProjectKBSearchSerializer(KBRetrieveSerializer):
+    hash_ids = None  # every KB linked to the project
+    deadline_ms = serializers.IntegerField(required=False, min_value=50)
+
+    def validate_deadline_ms(self, value):
+        return min(value, int(getattr(settings, "KB_FEDERATED_MAX_DEADLINE_MS", 10000)))
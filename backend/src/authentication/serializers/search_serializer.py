@@ -1,5 +1,23 @@
+from django.conf import settings
 from rest_framework import serializers
 
 
 class SearchSerializer(serializers.Serializer):
     query = serializers.CharField(required=True)
+    agent_id = serializers.UUIDField(required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    limit = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_limit(self, value):
+        return min(value, int(getattr(settings, "CHAT_SEARCH_MAX_PAGE_SIZE", 100)))
+
+    def validate(self, attrs):
+        if (
+            attrs.get("date_from")
+            and attrs.get("date_to")
+            and attrs["date_from"] > attrs["date_to"]
+        ):
+            raise serializers.ValidationError({"date_to": "Deve ser posterior a date_from."})
+        return attrs
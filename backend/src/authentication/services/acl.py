@@ -0,0 +1,101 @@
+"""Maintenance of the materialised access list (``UserResourceAccess``).
+
+A user reaches a project by belonging to it (``Projects.users``), and through it the
+KBs linked to it (``KBLink``) and its agents (``ProjectsAgentsThrough``). Those joins
+used to run on every permission check; the access list keeps their result per user.
+
+``sync_users`` recomputes the rows of the given users from the source tables and
+applies the difference, so it is idempotent and a resource reachable through several
+projects is handled without reference counting. ``authentication.signals`` calls it
+(after commit) for the users affected by each membership, KB link or agent change;
+``rebuild`` (``manage.py rebuild_acl``) runs it for everybody, e.g. after changes
+made with ``QuerySet.update()``/``bulk_create`` or raw SQL, which send no signals.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from django.db import transaction
+
+from authentication.models.access import UserResourceAccess
+from authentication.models.kb import KBLink
+from authentication.models.projects import Projects, ProjectsAgentsThrough
+from authentication.models.user_profile import UserProfile
+
+Resource = Tuple[str, str]
+
+
+def project_user_ids(project_ids: Iterable) -> List:
+    """Members of the projects (the users whose access changes with them)."""
+    return list(
+        Projects.users.through.objects.filter(projects_id__in=list(project_ids))
+        .values_list("userprofile_id", flat=True)
+        .distinct()
+    )
+
+
+def expected(user_ids: Iterable) -> Dict[object, Set[Resource]]:
+    """The resources each user reaches, computed from the source tables."""
+    user_ids = list(user_ids)
+    rows: Dict[object, Set[Resource]] = defaultdict(set)
+    memberships = Projects.users.through.objects.filter(userprofile_id__in=user_ids)
+    for user_id, project_id in memberships.values_list("userprofile_id", "projects_id"):
+        rows[user_id].add((UserResourceAccess.PROJECT, str(project_id)))
+    kbs = KBLink.objects.filter(project__users__id__in=user_ids)
+    for user_id, hash_id in kbs.values_list("project__users__id", "external_id"):
+        rows[user_id].add((UserResourceAccess.KB, hash_id))
+    agents = ProjectsAgentsThrough.objects.filter(project__users__id__in=user_ids)
+    for user_id, agent_id in agents.values_list("project__users__id", "agent_id"):
+        rows[user_id].add((UserResourceAccess.AGENT, str(agent_id)))
+    return rows
+
+
+def sync_users(user_ids: Iterable) -> Tuple[int, int]:
+    """Brings the users' rows in line with the source tables; ``(added, removed)``."""
+    user_ids = list({user_id for user_id in user_ids if user_id is not None})
+    if not user_ids:
+        return 0, 0
+    wanted = expected(user_ids)
+    with transaction.atomic():
+        current: Dict[object, Dict[Resource, int]] = defaultdict(dict)
+        existing = UserResourceAccess.objects.filter(user_id__in=user_ids).values_list(
+            "id", "user_id", "resource_type", "resource_id"
+        )
+        for row_id, user_id, resource_type, resource_id in existing:
+            current[user_id][(resource_type, resource_id)] = row_id
+
+        stale = [
+            row_id
+            for user_id, rows in current.items()
+            for resource, row_id in rows.items()
+            if resource not in wanted.get(user_id, ())
+        ]
+        missing = [
+            UserResourceAccess(user_id=user_id, resource_type=kind, resource_id=ref)
+            for user_id, resources in wanted.items()
+            for kind, ref in resources
+            if (kind, ref) not in current.get(user_id, {})
+        ]
+        if stale:
+            UserResourceAccess.objects.filter(id__in=stale).delete()
+        # Concurrent syncs of the same user may insert the same rows
+        UserResourceAccess.objects.bulk_create(missing, ignore_conflicts=True)
+    return len(missing), len(stale)
+
+
+def rebuild(batch_size: int = 500) -> Dict[str, int]:
+    """Re-syncs every user, ``batch_size`` users at a time."""
+    stats = {"users": 0, "added": 0, "removed": 0}
+    user_ids = UserProfile.objects.order_by("pk").values_list("pk", flat=True)
+    last = None
+    while True:
+        batch_qs = user_ids if last is None else user_ids.filter(pk__gt=last)
+        batch = list(batch_qs[:batch_size])
+        if not batch:
+            break
+        last = batch[-1]
+        added, removed = sync_users(batch)
+        stats["users"] += len(batch)
+        stats["added"] += added
+        stats["removed"] += removed
+    return stats
@@ -0,0 +1,304 @@
+"""Cache of agent answers to standalone questions (``AnswerCacheEntry``).
+
+Many users open a chat with the same question ("como solicito férias?"), and each
+one used to run the whole agent workflow (retrieval from the KBs plus the LLM). The
+streaming chat proxy (``services.chat_proxy``) now looks the first question of a
+session up here before calling n8n, in two tiers:
+
+* exact: the normalised question (case, accents, punctuation and spacing ignored);
+* semantic: the embedding of the question (``services.embeddings``) against the
+  cached questions of the agent, when the cosine similarity reaches
+  ``CHAT_ANSWER_CACHE_SIMILARITY``.
+
+Entries are keyed by a namespace made of the agent id and the version of every KB
+linked to the agent's projects (``KBCatalog.version``). Any KB change made through the
+backend bumps its version (``kb_catalog.invalidate_reads``) and deletes the entries of
+the agents using it; linking or unlinking a KB changes the namespace as well.
+
+The semantic tier searches an in-process index per namespace (unit float32 vectors,
+``CHAT_ANSWER_CACHE_MAX_ENTRIES`` at most, ``CHAT_ANSWER_CACHE_INDEXES`` namespaces
+kept, least recently used dropped first), reloaded from the table every
+``CHAT_ANSWER_CACHE_INDEX_REFRESH`` seconds to pick up entries stored by other workers.
+
+Only questions opening a session are cached: later ones depend on the conversation.
+"""
+
+import hashlib
+import logging
+import operator
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from authentication.models.answer_cache import AnswerCacheEntry
+from authentication.models.chat_messages import ChatMessage
+from authentication.models.kb import KBCatalog, KBLink
+from authentication.services import chat_mirror, embeddings, n8n_db
+from authentication.services.redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+SEEN_PREFIX = "chat:session:seen"
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+
+_indexes: "OrderedDict[str, _Index]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    # Hits are written to the n8n chat memory, so follow-ups keep their context
+    return bool(getattr(settings, "CHAT_ANSWER_CACHE_ENABLED", True)) and n8n_db.is_configured()
+
+
+def semantic_enabled() -> bool:
+    return bool(getattr(settings, "CHAT_ANSWER_CACHE_SEMANTIC", True)) and (
+        embeddings.is_configured()
+    )
+
+
+def ttl_seconds() -> int:
+    return int(getattr(settings, "CHAT_ANSWER_CACHE_TTL", 86400))
+
+
+def similarity() -> float:
+    return float(getattr(settings, "CHAT_ANSWER_CACHE_SIMILARITY", 0.95))
+
+
+def max_entries() -> int:
+    return int(getattr(settings, "CHAT_ANSWER_CACHE_MAX_ENTRIES", 500))
+
+
+def max_indexes() -> int:
+    return int(getattr(settings, "CHAT_ANSWER_CACHE_INDEXES", 32))
+
+
+def index_refresh() -> float:
+    return float(getattr(settings, "CHAT_ANSWER_CACHE_INDEX_REFRESH", 60))
+
+
+@dataclass
+class Lookup:
+    namespace: str
+    question_hash: str
+    answer: Optional[str] = None
+    tier: Optional[str] = None  # exact | semantic
+    score: Optional[float] = None
+    vector: Optional[List[float]] = None
+
+    @property
+    def hit(self) -> bool:
+        return self.answer is not None
+
+
+class _Index:
+    """Cached questions of one namespace: exact hashes and unit vectors."""
+
+    def __init__(self, agent_id):
+        self.agent_id = str(agent_id)
+        self.loaded_at = time.monotonic()
+        self.exact: Dict[str, Tuple[int, str]] = {}
+        self.entries: List[Tuple[int, str, array]] = []
+        self.lock = threading.Lock()
+
+    def add(self, entry_id: int, question_hash: str, answer: str, vector) -> None:
+        with self.lock:
+            self.exact[question_hash] = (entry_id, answer)
+            if vector is not None:
+                self.entries.append((entry_id, answer, array("f", vector)))
+                del self.entries[: -max_entries()]
+
+    def nearest(self, vector: List[float]) -> Tuple[Optional[Tuple[int, str]], float]:
+        with self.lock:
+            entries = list(self.entries)
+        best, best_score = None, -1.0
+        for entry_id, answer, candidate in entries:
+            score = sum(map(operator.mul, vector, candidate))
+            if score > best_score:
+                best, best_score = (entry_id, answer), score
+        return best, best_score
+
+
+def normalize_question(question: str) -> str:
+    text = unicodedata.normalize("NFKD", question or "").casefold()
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def question_hash(question: str) -> str:
+    return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+
+def kb_versions(agent_id) -> List[Tuple[str, int]]:
+    """``(hash_id, version)`` of the KBs linked to the agent's projects, sorted."""
+    hash_ids = set(
+        KBLink.objects.filter(project__agents__id=agent_id).values_list("external_id", flat=True)
+    )
+    versions = dict(
+        KBCatalog.objects.filter(external_id__in=hash_ids).values_list("external_id", "version")
+    )
+    return sorted((hash_id, versions.get(hash_id, 0)) for hash_id in hash_ids)
+
+
+def namespace(agent_id) -> str:
+    kbs = ",".join(f"{hash_id}:{version}" for hash_id, version in kb_versions(agent_id))
+    return hashlib.sha256(f"{agent_id}|{kbs}".encode("utf-8")).hexdigest()
+
+
+def _cutoff():
+    return timezone.now() - timedelta(seconds=ttl_seconds())
+
+
+def _load(agent_id, ns: str) -> _Index:
+    index = _Index(agent_id)
+    rows = (
+        AnswerCacheEntry.objects.filter(namespace=ns, created_at__gte=_cutoff())
+        .order_by("-created_at")
+        .values_list("id", "question_hash", "answer", "embedding")[: max_entries()]
+    )
+    for entry_id, qhash, answer, raw in reversed(list(rows)):
+        index.add(entry_id, qhash, answer, embeddings.unpack(raw) if raw else None)
+    return index
+
+
+def _index(agent_id, ns: str) -> _Index:
+    with _indexes_lock:
+        index = _indexes.get(ns)
+        if index is not None and time.monotonic() - index.loaded_at < index_refresh():
+            _indexes.move_to_end(ns)
+            return index
+    index = _load(agent_id, ns)
+    with _indexes_lock:
+        _indexes[ns] = index
+        _indexes.move_to_end(ns)
+        while len(_indexes) > max_indexes():
+            _indexes.popitem(last=False)
+    return index
+
+
+def _record_hit(entry_id: int) -> None:
+    AnswerCacheEntry.objects.filter(id=entry_id).update(
+        hits=F("hits") + 1, last_hit_at=timezone.now()
+    )
+
+
+def _lookup_exact(agent_id, question: str) -> Tuple[Lookup, _Index]:
+    ns = namespace(agent_id)
+    result = Lookup(namespace=ns, question_hash=question_hash(question))
+    index = _index(agent_id, ns)
+
+    found = index.exact.get(result.question_hash)
+    if found is None:
+        # Stored by another worker since the index was loaded
+        found = (
+            AnswerCacheEntry.objects.filter(
+                namespace=ns, question_hash=result.question_hash, created_at__gte=_cutoff()
+            )
+            .values_list("id", "answer")
+            .first()
+        )
+    if found is not None:
+        _record_hit(found[0])
+        result.answer, result.tier, result.score = found[1], "exact", 1.0
+    return result, index
+
+
+async def lookup(agent_id, question: str) -> Lookup:
+    """Cached answer of the agent to ``question``, if any. On a miss the returned
+    ``Lookup`` is what ``store`` needs to cache the answer n8n gives.
+
+    Only the ORM work runs on the thread-sensitive executor, which also authenticates
+    every request; the embedding request and the scan of the index run on other
+    threads, so a slow embedding does not hold up the process."""
+    result, index = await sync_to_async(_lookup_exact)(agent_id, question)
+    if result.hit or not semantic_enabled():
+        return result
+    try:
+        result.vector = await sync_to_async(embeddings.embed_one, thread_sensitive=False)(question)
+    except embeddings.EmbeddingError as e:
+        logger.warning("No embedding for the answer cache lookup: %s", e)
+        return result
+    found, score = await sync_to_async(index.nearest, thread_sensitive=False)(result.vector)
+    if found is not None and score >= similarity():
+        await sync_to_async(_record_hit)(found[0])
+        result.answer, result.tier, result.score = found[1], "semantic", score
+    return result
+
+
+def store(agent_id, looked_up: Lookup, question: str, answer: str) -> None:
+    """Caches the answer n8n gave after a missed ``lookup``."""
+    if not answer.strip():
+        return
+    AnswerCacheEntry.objects.filter(agent_id=agent_id, created_at__lt=_cutoff()).delete()
+    try:
+        entry = AnswerCacheEntry.objects.create(
+            agent_id=agent_id,
+            namespace=looked_up.namespace,
+            question_hash=looked_up.question_hash,
+            question=question,
+            answer=answer,
+            embedding=embeddings.pack(looked_up.vector) if looked_up.vector else None,
+        )
+    except IntegrityError:
+        return  # same question answered meanwhile in another session
+    with _indexes_lock:
+        index = _indexes.get(looked_up.namespace)
+    if index is not None:
+        index.add(entry.id, entry.question_hash, answer, looked_up.vector)
+
+
+def invalidate_kb(external_id: str) -> int:
+    """Deletes the entries of the agents that use the KB (call after changing it)."""
+    agent_ids = {
+        str(agent_id)
+        for agent_id in KBLink.objects.filter(external_id=external_id)
+        .exclude(project__agents__isnull=True)
+        .values_list("project__agents__id", flat=True)
+    }
+    if not agent_ids:
+        return 0
+    with _indexes_lock:
+        for ns in [ns for ns, index in _indexes.items() if index.agent_id in agent_ids]:
+            del _indexes[ns]
+    deleted, _ = AnswerCacheEntry.objects.filter(agent_id__in=agent_ids).delete()
+    return deleted
+
+
+def is_new_session(session_key: str) -> bool:
+    """Whether nothing was said yet in the session (as far as the backend knows)."""
+    try:
+        if get_redis().exists(f"{SEEN_PREFIX}:{session_key}"):
+            return False
+    except redis.RedisError as e:
+        logger.warning("Redis unavailable for the answer cache (%s)", e)
+    return not ChatMessage.objects.filter(session_key=session_key).exists()
+
+
+async def mark_session(session_key: str) -> None:
+    """Records that the session has messages, before the chat mirror copies them."""
+    try:
+        await get_async_redis().set(f"{SEEN_PREFIX}:{session_key}", 1, ex=ttl_seconds())
+    except redis.RedisError as e:
+        logger.warning("Could not mark chat session %s as started: %s", session_key, e)
+
+
+def remember(session_key: str, question: str, answer: str) -> None:
+    """Writes a cached exchange to the n8n chat memory of the session."""
+    try:
+        chat_mirror.append_to_memory(session_key, question, answer)
+    except psycopg2.Error as e:
+        logger.warning("Could not add cached answer to chat memory of %s: %s", session_key, e)
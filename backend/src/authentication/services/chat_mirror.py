@@ -0,0 +1,181 @@
+"""Local mirror of the n8n chat memory (``ChatMessage``).
+
+``POST /api/search/`` used to send every session key of the user to the n8n
+``get-message`` webhook, which ran a ``LIKE '%term%'`` over the whole chat memory
+table. ``sync`` copies the rows n8n appends to that table (``n8n_chat_histories``,
+read through ``services.n8n_db``) into ``chat_messages``, so search runs locally
+(``services.chat_search``), restricted to the user's ``ChatSession`` rows.
+
+The high-water mark is the largest ``source_id`` already copied. ids are assigned
+when a row is inserted, not when it commits, so the last ``CHAT_MIRROR_OVERLAP`` ids
+below the mark are looked at again on every run to pick up rows that committed late.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Max
+from psycopg2 import sql
+from psycopg2.extras import Json
+
+from authentication.models.chat_messages import ChatMessage
+from authentication.models.chat_sessions import ChatSession
+from authentication.services import n8n_db
+
+logger = logging.getLogger(__name__)
+
+
+def enabled() -> bool:
+    return n8n_db.is_configured() and bool(getattr(settings, "CHAT_SEARCH_LOCAL", True))
+
+
+def memory_table() -> str:
+    return getattr(settings, "N8N_CHAT_MEMORY_TABLE", "n8n_chat_histories")
+
+
+def batch_size() -> int:
+    return int(getattr(settings, "CHAT_MIRROR_BATCH_SIZE", 1000))
+
+
+def overlap() -> int:
+    return int(getattr(settings, "CHAT_MIRROR_OVERLAP", 200))
+
+
+def sync_interval() -> float:
+    return float(getattr(settings, "CHAT_MIRROR_SYNC_INTERVAL", 5))
+
+
+def high_water_mark() -> int:
+    return ChatMessage.objects.aggregate(mark=Max("source_id"))["mark"] or 0
+
+
+def message_fields(message: Any) -> Tuple[str, str]:
+    """``(role, text)`` of a stored LangChain message (``{"type", "content", ...}``)."""
+    if not isinstance(message, dict):
+        return "human", str(message or "")
+    content = message.get("content", "")
+    if isinstance(content, list):
+        # Multi-part content: keep the text parts
+        content = "\n".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        )
+    return str(message.get("type") or "human")[:16], str(content or "")
+
+
+def append_to_memory(session_key: str, question: str, answer: str) -> None:
+    """Adds a question and its answer to the n8n chat memory of a session, as the
+    agent's memory node would, so the conversation can go on from there.
+    Raises ``psycopg2.Error``."""
+    messages = [
+        {"type": "human", "content": question, "additional_kwargs": {}, "response_metadata": {}},
+        {
+            "type": "ai",
+            "content": answer,
+            "tool_calls": [],
+            "invalid_tool_calls": [],
+            "additional_kwargs": {},
+            "response_metadata": {},
+        },
+    ]
+    query = sql.SQL("INSERT INTO {} (session_id, message) VALUES (%s, %s)").format(
+        sql.Identifier(memory_table())
+    )
+    with n8n_db.connection() as conn, conn.cursor() as cur:
+        cur.executemany(query, [(session_key, Json(message)) for message in messages])
+
+
+def _fetch(after: int, until: Optional[int], limit: int) -> List[Tuple[int, str, Any]]:
+    query = sql.SQL("SELECT id, session_id, message FROM {} WHERE id > %s").format(
+        sql.Identifier(memory_table())
+    )
+    params: List[Any] = [after]
+    if until is not None:
+        query += sql.SQL(" AND id <= %s")
+        params.append(until)
+    query += sql.SQL(" ORDER BY id LIMIT %s")
+    params.append(limit)
+    with n8n_db.connection() as conn, conn.cursor() as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+
+def _store(rows: Iterable[Tuple[int, str, Any]]) -> int:
+    rows = list(rows)
+    keys = {session_key for _, session_key, _ in rows}
+    sessions = dict(
+        ChatSession.objects.filter(session_key__in=keys).values_list("session_key", "id")
+    )
+    messages = []
+    for source_id, session_key, message in rows:
+        role, content = message_fields(message)
+        messages.append(
+            ChatMessage(
+                source_id=source_id,
+                session_id=sessions.get(session_key),
+                session_key=session_key,
+                role=role,
+                content=content,
+            )
+        )
+    ChatMessage.objects.bulk_create(messages, ignore_conflicts=True, batch_size=500)
+    return len(messages)
+
+
+def _backfill(mark: int) -> int:
+    """Copies rows below the mark that were not visible when it was reached."""
+    low = max(0, mark - overlap())
+    rows = _fetch(low, mark, overlap())
+    if not rows:
+        return 0
+    known = set(
+        ChatMessage.objects.filter(source_id__gt=low, source_id__lte=mark).values_list(
+            "source_id", flat=True
+        )
+    )
+    missing = [row for row in rows if row[0] not in known]
+    if missing:
+        _store(missing)
+    return len(missing)
+
+
+def link_orphans() -> int:
+    """Attaches messages copied before their ``ChatSession`` was created."""
+    keys = set(
+        ChatMessage.objects.filter(session__isnull=True)
+        .values_list("session_key", flat=True)
+        .distinct()
+    )
+    linked = 0
+    for session_key, session_id in ChatSession.objects.filter(session_key__in=keys).values_list(
+        "session_key", "id"
+    ):
+        linked += ChatMessage.objects.filter(session__isnull=True, session_key=session_key).update(
+            session_id=session_id
+        )
+    return linked
+
+
+def sync(max_batches: Optional[int] = None) -> Dict[str, int]:
+    """Copies the chat memory rows added since the last run (``max_batches`` of
+    ``CHAT_MIRROR_BATCH_SIZE`` rows at most). Raises ``psycopg2.Error``."""
+    mark = high_water_mark()
+    backfilled = _backfill(mark) if mark else 0
+    copied = 0
+    batches = 0
+    limit = batch_size()
+    while max_batches is None or batches < max_batches:
+        rows = _fetch(mark, None, limit)
+        if not rows:
+            break
+        copied += _store(rows)
+        mark = rows[-1][0]
+        batches += 1
+        if len(rows) < limit:
+            break
+    return {
+        "copied": copied,
+        "backfilled": backfilled,
+        "linked": link_orphans(),
+        "high_water_mark": mark,
+    }
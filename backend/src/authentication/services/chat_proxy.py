@@ -0,0 +1,308 @@
+"""Streaming proxy between the chat UI and the agents' n8n chat webhooks.
+
+``POST /api/agents/<id>/chat/`` forwards one message to ``Agents.url_n8n`` (the same
+``sendMessage`` payload the ``@n8n/chat`` widget sends) and relays the answer to the
+client as Server-Sent Events:
+
+* ``start`` ``{"session_id"}``, then one ``token`` ``{"content"}`` per chunk n8n
+  streams (a single one when the workflow answers in one piece),
+* ``end`` ``{"session_id", "output"}`` with the whole answer, or ``error``
+  ``{"detail", "status"}``.
+
+Answers found in ``services.answer_cache`` are sent the same way by ``replay``, with
+``cached`` (``exact`` or ``semantic``) added to ``end``.
+
+Everything runs on the event loop (no thread per stream). n8n is read as fast as it
+answers into a buffer bounded by ``CHAT_STREAM_BUFFER_BYTES``, so a slow client never
+keeps an n8n execution open; a client that falls further behind than that is cut off.
+Each user may hold ``CHAT_STREAM_MAX_PER_USER`` streams at once, across workers (Redis).
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import redis
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from authentication.services import n8n_client, n8n_guard
+from authentication.services.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+SLOTS_PREFIX = "chat:streams"
+
+# Drops expired slots, then takes one if the user is under the limit
+_ACQUIRE = """
+redis.call("zremrangebyscore", KEYS[1], "-inf", ARGV[1])
+if redis.call("zcard", KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call("zadd", KEYS[1], ARGV[2], ARGV[4])
+redis.call("pexpire", KEYS[1], ARGV[5])
+return 1
+"""
+
+# n8n "streaming" response mode: one JSON object per line
+STREAM_TYPES = {"begin", "item", "end", "error"}
+
+_END = object()
+
+
+class TooManyStreams(APIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = (
+        "Limite de conversas simultâneas atingido. "
+        "Aguarde uma resposta terminar e tente novamente."
+    )
+    default_code = "too_many_streams"
+    wait = 1  # Retry-After
+
+
+def max_per_user() -> int:
+    return int(getattr(settings, "CHAT_STREAM_MAX_PER_USER", 3))
+
+
+def max_seconds() -> float:
+    return float(getattr(settings, "CHAT_STREAM_MAX_SECONDS", 300))
+
+
+def read_timeout() -> float:
+    return float(getattr(settings, "CHAT_STREAM_READ_TIMEOUT", 120))
+
+
+def heartbeat_seconds() -> float:
+    return float(getattr(settings, "CHAT_STREAM_HEARTBEAT", 15))
+
+
+def buffer_bytes() -> int:
+    return int(getattr(settings, "CHAT_STREAM_BUFFER_BYTES", 1024 * 1024))
+
+
+def _slots_key(user_id) -> str:
+    return f"{SLOTS_PREFIX}:{user_id}"
+
+
+async def acquire_slot(user_id) -> Optional[str]:
+    """Reserves one of the user's stream slots; ``None`` when all are taken.
+
+    Slots expire after ``CHAT_STREAM_MAX_SECONDS`` in case they are never released
+    (worker killed, client gone before the stream started). If Redis is unavailable
+    streams are not limited.
+    """
+    token = uuid.uuid4().hex
+    now_ms = int(time.time() * 1000)
+    ttl_ms = int(max_seconds() * 1000)
+    try:
+        taken = await get_async_redis().eval(
+            _ACQUIRE,
+            1,
+            _slots_key(user_id),
+            now_ms,
+            now_ms + ttl_ms,
+            max_per_user(),
+            token,
+            ttl_ms,
+        )
+    except redis.RedisError as e:
+        logger.warning("Redis unavailable for chat stream limits (%s); not limiting", e)
+        return token
+    return token if taken else None
+
+
+async def release_slot(user_id, token: str) -> None:
+    try:
+        await get_async_redis().zrem(_slots_key(user_id), token)
+    except redis.RedisError:
+        logger.warning("Could not release chat stream slot of user %s", user_id)
+
+
+def payload(session_id: str, message: str, agent_id, metadata: Optional[Dict] = None) -> Dict:
+    """Body of the ``sendMessage`` call, as sent by the ``@n8n/chat`` widget."""
+    return {
+        "action": "sendMessage",
+        "sessionId": session_id,
+        "chatInput": message,
+        "metadata": {
+            **(metadata or {}),
+            "agentId": str(agent_id),
+            "customSessionId": session_id,
+        },
+    }
+
+
+def sse(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def output_of(body: Any) -> str:
+    """Answer text of a non-streamed chat webhook response."""
+    if isinstance(body, list):
+        body = body[0] if body else {}
+    if isinstance(body, dict):
+        for key in ("output", "text", "message", "response"):
+            if isinstance(body.get(key), str):
+                return body[key]
+        return json.dumps(body, ensure_ascii=False)
+    return "" if body is None else str(body)
+
+
+class _Buffer:
+    """Queue of SSE frames between the n8n reader and the client, bounded in bytes."""
+
+    def __init__(self, limit: int):
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        self.limit = limit
+        self.pending = 0
+
+    def put(self, frame: bytes) -> bool:
+        """Adds a frame; ``False`` when the client is too far behind to take it."""
+        if self.pending + len(frame) > self.limit:
+            return False
+        self.pending += len(frame)
+        self.queue.put_nowait(frame)
+        return True
+
+    def close(self, frame: Optional[bytes] = None) -> None:
+        """Ends the stream (with a last frame, never refused)."""
+        if frame is not None:
+            self.pending += len(frame)
+            self.queue.put_nowait(frame)
+        self.queue.put_nowait(_END)
+
+    async def get(self, timeout: float):
+        item = await asyncio.wait_for(self.queue.get(), timeout)
+        if isinstance(item, bytes):
+            self.pending -= len(item)
+        return item
+
+
+async def _pump(url: str, body: Dict, session_id: str, buffer: _Buffer) -> Optional[str]:
+    """Reads the n8n answer into ``buffer``; always ends it with ``end`` or ``error``.
+    Returns the answer when it ended with ``end``."""
+    timeout = httpx.Timeout(read_timeout(), connect=n8n_client.timeout_for(url)[0])
+    parts: List[str] = []
+    raw: List[str] = []
+    streamed = False
+    try:
+        async with asyncio.timeout(max_seconds()):
+            async with n8n_client.astream("POST", url, json=body, timeout=timeout) as resp:
+                if resp.status_code >= 400:
+                    await resp.aread()
+                    buffer.close(
+                        sse(
+                            "error",
+                            {
+                                "detail": f"Serviço externo respondeu {resp.status_code}.",
+                                "status": resp.status_code,
+                            },
+                        )
+                    )
+                    return
+                async for line in resp.aiter_lines():
+                    item, ok = _stream_item(line)
+                    if not ok:
+                        if not streamed:
+                            raw.append(line)
+                        continue
+                    streamed = True
+                    if item.get("type") == "error":
+                        detail = item.get("content") or "Erro no fluxo do agente."
+                        buffer.close(sse("error", {"detail": detail, "status": 502}))
+                        return
+                    content = item.get("content")
+                    if item.get("type") != "item" or not content:
+                        continue
+                    parts.append(content)
+                    if not buffer.put(sse("token", {"content": content})):
+                        buffer.close(_too_slow())
+                        return
+        if not streamed:
+            text = "\n".join(raw)
+            try:
+                output = output_of(json.loads(text)) if text.strip() else ""
+            except ValueError:
+                output = text
+            parts.append(output)
+            if output and not buffer.put(sse("token", {"content": output})):
+                buffer.close(_too_slow())
+                return
+        output = "".join(parts)
+        buffer.close(sse("end", {"session_id": session_id, "output": output}))
+        return output
+    except n8n_guard.UpstreamRejected as e:
+        buffer.close(sse("error", {"detail": str(e.detail), "status": e.status_code}))
+    except (TimeoutError, httpx.TimeoutException):
+        buffer.close(sse("error", {"detail": "Timeout ao chamar serviço externo.", "status": 504}))
+    except httpx.HTTPError as e:
+        buffer.close(
+            sse("error", {"detail": f"Erro ao chamar serviço externo: {e}", "status": 502})
+        )
+
+
+def _stream_item(line: str) -> Tuple[Dict, bool]:
+    line = line.strip()
+    if not line.startswith("{"):
+        return {}, False
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return {}, False
+    if isinstance(item, dict) and item.get("type") in STREAM_TYPES:
+        return item, True
+    return {}, False
+
+
+def _too_slow() -> bytes:
+    return sse("error", {"detail": "Cliente lento demais; resposta interrompida.", "status": 499})
+
+
+async def relay(
+    url: str,
+    body: Dict,
+    session_id: str,
+    on_close: Optional[Callable[[], Awaitable[None]]] = None,
+    on_answer: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> AsyncIterator[bytes]:
+    """SSE frames of one chat call. ``on_answer`` is awaited with the whole answer
+    once it was sent; ``on_close`` once the stream is over, including when the client
+    goes away (Django cancels the iterator)."""
+    buffer = _Buffer(buffer_bytes())
+    reader = asyncio.create_task(_pump(url, body, session_id, buffer))
+    try:
+        yield sse("start", {"session_id": session_id})
+        while True:
+            try:
+                item = await buffer.get(heartbeat_seconds())
+            except asyncio.TimeoutError:
+                # Comment line: keeps proxies from closing an idle connection
+                yield b": ping\n\n"
+                continue
+            if item is _END:
+                break
+            yield item
+        output = await reader
+        if output and on_answer is not None:
+            await on_answer(output)
+    finally:
+        if not reader.done():
+            reader.cancel()
+        try:
+            await reader
+        except (asyncio.CancelledError, Exception):
+            pass
+        if on_close is not None:
+            await on_close()
+
+
+async def replay(session_id: str, output: str, cached: str) -> AsyncIterator[bytes]:
+    """SSE frames of an answer taken from the answer cache."""
+    yield sse("start", {"session_id": session_id})
+    yield sse("token", {"content": output})
+    yield sse("end", {"session_id": session_id, "output": output, "cached": cached})
@@ -0,0 +1,205 @@
+"""Ranked, paginated search over the local chat mirror (``ChatMessage``).
+
+On MySQL the query runs against the FULLTEXT index of ``chat_messages.content``
+(boolean mode: every term required, matched as a word prefix) and hits come ordered
+by relevance. Other database backends, and queries without a term long enough for
+the index (``CHAT_SEARCH_MIN_TOKEN``, MySQL's ``innodb_ft_min_token_size``), fall
+back to a substring match ordered from the newest message.
+
+Pages are cut with a keyset cursor (relevance, message id) instead of an offset, so
+reading page 50 costs the same as reading page 1.
+"""
+
+import base64
+import html
+import json
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from authentication.models.chat_messages import ChatMessage
+
+# Only words are kept: anything else could be an operator in MySQL's boolean mode
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class SearchPage:
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+
+def page_size() -> int:
+    return int(getattr(settings, "CHAT_SEARCH_PAGE_SIZE", 20))
+
+
+def max_page_size() -> int:
+    return int(getattr(settings, "CHAT_SEARCH_MAX_PAGE_SIZE", 100))
+
+
+def min_token() -> int:
+    return int(getattr(settings, "CHAT_SEARCH_MIN_TOKEN", 3))
+
+
+def snippet_chars() -> int:
+    return int(getattr(settings, "CHAT_SEARCH_SNIPPET_CHARS", 160))
+
+
+def terms(query: str) -> List[str]:
+    return _WORD.findall(query or "")
+
+
+def encode_cursor(score: float, source_id: int) -> str:
+    raw = json.dumps({"s": score, "id": source_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return float(data["s"]), int(data["id"])
+    except (ValueError, TypeError, KeyError, UnicodeError) as e:
+        raise InvalidCursor("Cursor inválido.") from e
+
+
+def _fold(text: str) -> str:
+    """Lower-cased text without accents, one character per original character, so
+    positions found in it are positions in ``text``."""
+    return "".join((unicodedata.normalize("NFD", ch)[:1] or ch).lower()[:1] or ch for ch in text)
+
+
+def snippet(content: str, words: List[str], width: Optional[int] = None) -> str:
+    """HTML-escaped excerpt of ``content`` around the first hit, hits in ``<mark>``."""
+    width = width or snippet_chars()
+    folded = _fold(content)
+    spans: List[Tuple[int, int]] = []
+    for word in {_fold(w) for w in words if w}:
+        spans.extend((m.start(), m.end()) for m in re.finditer(re.escape(word), folded))
+    spans.sort()
+
+    start = 0
+    if spans and len(content) > width:
+        start = max(0, spans[0][0] - width // 3)
+        if start:
+            # Do not cut a word in half
+            space = content.rfind(" ", 0, start)
+            start = space + 1 if space >= 0 and start - space < 20 else start
+    end = min(len(content), start + width)
+
+    parts = ["…"] if start else []
+    pos = start
+    for s, e in spans:
+        if s < pos or s >= end:
+            continue
+        e = min(e, end)
+        parts.append(html.escape(content[pos:s]))
+        parts.append(f"<mark>{html.escape(content[s:e])}</mark>")
+        pos = e
+    parts.append(html.escape(content[pos:end]))
+    if end < len(content):
+        parts.append("…")
+    return "".join(parts)
+
+
+def _day_start(day: date) -> datetime:
+    value = datetime.combine(day, time.min)
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def search(
+    user,
+    query: str,
+    *,
+    agent_id=None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> SearchPage:
+    """One page of the user's messages matching ``query``, best match first.
+
+    ``date_from``/``date_to`` (inclusive) apply to when the conversation started
+    (``ChatSession.created_at``): the n8n chat memory keeps no time per message, and
+    ``synced_at`` is the time of the copy (the backfill for older history).
+    Raises ``InvalidCursor``.
+    """
+    limit = min(limit or page_size(), max_page_size())
+    words = terms(query)
+    if not words:
+        return SearchPage()
+    after = decode_cursor(cursor) if cursor else None
+
+    qs = ChatMessage.objects.filter(session__user=user)
+    if agent_id:
+        qs = qs.filter(session__agent_id=agent_id)
+    if date_from:
+        qs = qs.filter(session__created_at__gte=_day_start(date_from))
+    if date_to:
+        qs = qs.filter(session__created_at__lt=_day_start(date_to + timedelta(days=1)))
+
+    indexed = [w for w in words if len(w) >= min_token()]
+    if connection.vendor == "mysql" and indexed:
+        against = " ".join(f"+{w}*" for w in indexed)
+        qs = qs.annotate(
+            score=RawSQL(
+                "MATCH (`chat_messages`.`content`) AGAINST (%s IN BOOLEAN MODE)",
+                [against],
+                output_field=FloatField(),
+            )
+        ).filter(score__gt=0)
+        # Words too short for the index still have to be there
+        for word in words:
+            if len(word) < min_token():
+                qs = qs.filter(content__icontains=word)
+        if after:
+            qs = qs.filter(Q(score__lt=after[0]) | Q(score=after[0], source_id__lt=after[1]))
+        qs = qs.order_by("-score", "-source_id")
+    else:
+        for word in words:
+            qs = qs.filter(content__icontains=word)
+        if after:
+            qs = qs.filter(source_id__lt=after[1])
+        qs = qs.annotate(score=Value(0.0, output_field=FloatField())).order_by("-source_id")
+
+    rows = list(
+        qs.values(
+            "source_id",
+            "session_key",
+            "content",
+            "role",
+            "session__created_at",
+            "session__agent_id",
+            "score",
+        )[: limit + 1]
+    )
+    page = SearchPage()
+    for row in rows[:limit]:
+        page.results.append(
+            {
+                "message_id": row["source_id"],
+                "session_id": row["session_key"],
+                "message": row["content"],
+                "snippet": snippet(row["content"], words),
+                "author": row["role"],
+                "agent_id": str(row["session__agent_id"]),
+                "score": row["score"],
+                "created_at": row["session__created_at"],
+            }
+        )
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        page.next_cursor = encode_cursor(last["score"], last["source_id"])
+    return page
@@ -0,0 +1,103 @@
+"""Text chunking identical to the one the n8n ``kb/file/add`` workflow applies.
+
+The workflow splits documents with LangChain's ``RecursiveCharacterTextSplitter``
+(``chunkSize`` 1000, ``chunkOverlap`` 50, separators ``\\n\\n``, ``\\n``, `` ``, ``""``,
+separator kept at the start of the following piece). ``split_text`` reproduces it
+so the backend can tell which stored vectors (``n8n_vectors.text``) a new version of a
+file would produce again. ``KB_CHUNK_SIZE``/``KB_CHUNK_OVERLAP`` must follow the
+workflow settings.
+"""
+
+import hashlib
+import re
+from typing import List, Optional
+
+from django.conf import settings
+
+DEFAULT_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+def chunk_size() -> int:
+    return int(getattr(settings, "KB_CHUNK_SIZE", 1000))
+
+
+def chunk_overlap() -> int:
+    return int(getattr(settings, "KB_CHUNK_OVERLAP", 50))
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _split_keeping_separator(text: str, separator: str) -> List[str]:
+    if not separator:
+        return [c for c in text]
+    # Lookahead split: the separator stays at the start of the next piece
+    pieces = re.split(f"(?={re.escape(separator)})", text)
+    return [p for p in pieces if p != ""]
+
+
+def _join(pieces: List[str]) -> Optional[str]:
+    text = "".join(pieces).strip()
+    return text or None
+
+
+def _merge(splits: List[str], size: int, overlap: int) -> List[str]:
+    docs: List[str] = []
+    current: List[str] = []
+    total = 0
+    for piece in splits:
+        length = len(piece)
+        if total + length > size and current:
+            doc = _join(current)
+            if doc is not None:
+                docs.append(doc)
+            # Keep the tail of the previous chunk (up to ``overlap``) as the next head
+            while total > overlap or (total + length > size and total > 0):
+                total -= len(current[0])
+                current = current[1:]
+        current.append(piece)
+        total += length
+    doc = _join(current)
+    if doc is not None:
+        docs.append(doc)
+    return docs
+
+
+def _split(text: str, separators: List[str], size: int, overlap: int) -> List[str]:
+    separator = separators[-1]
+    remaining: List[str] = []
+    for i, candidate in enumerate(separators):
+        if candidate == "":
+            separator = candidate
+            break
+        if candidate in text:
+            separator = candidate
+            remaining = separators[i + 1 :]
+            break
+
+    chunks: List[str] = []
+    good: List[str] = []
+    for piece in _split_keeping_separator(text, separator):
+        if len(piece) < size:
+            good.append(piece)
+            continue
+        if good:
+            chunks.extend(_merge(good, size, overlap))
+            good = []
+        if remaining:
+            chunks.extend(_split(piece, remaining, size, overlap))
+        else:
+            chunks.append(piece)
+    if good:
+        chunks.extend(_merge(good, size, overlap))
+    return chunks
+
+
+def split_text(text: str, size: Optional[int] = None, overlap: Optional[int] = None) -> List[str]:
+    return _split(
+        text,
+        DEFAULT_SEPARATORS,
+        size if size is not None else chunk_size(),
+        overlap if overlap is not None else chunk_overlap(),
+    )
@@ -0,0 +1,181 @@
+"""Text embeddings from the OpenAI API, with the model the n8n KB workflows use.
+
+Vectors are returned normalised to unit length, so the cosine similarity of two of
+them is their dot product. ``pack``/``unpack`` convert them to and from the float32
+bytes stored in the database.
+
+Embeddings are content-addressed in Redis (SHA-256 of model and text), so a text
+embedded once, by any user or worker, is not sent to the API again. Vectors are
+stored as ``EMBEDDING_CACHE_DTYPE`` bytes (float16 by default: 3 KiB for
+text-embedding-3-small, precise to about 1e-3 on unit vectors). Redis also holds the
+KB job queue, so eviction is not left to ``maxmemory-policy``: a sorted set records
+when each vector was last read, and the least recently used ones beyond
+``EMBEDDING_CACHE_MAX_ENTRIES`` are dropped.
+"""
+
+import hashlib
+import logging
+import math
+import struct
+import time
+from array import array
+from typing import Dict, List, Sequence
+
+import redis
+import requests
+from django.conf import settings
+
+from authentication.services import n8n_client
+from authentication.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "emb"
+LRU_KEY = f"{PREFIX}:lru"
+
+# Drops the least recently used vectors beyond the limit
+_TRIM = """
+local extra = redis.call("zcard", KEYS[1]) - tonumber(ARGV[1])
+if extra <= 0 then
+    return 0
+end
+local old = redis.call("zpopmin", KEYS[1], extra)
+for i = 1, #old, 2 do
+    redis.call("del", old[i])
+end
+return extra
+"""
+
+_FORMATS = {"float16": "e", "float32": "f"}
+
+
+class EmbeddingError(Exception):
+    pass
+
+
+def is_configured() -> bool:
+    return bool(getattr(settings, "OPENAI_API_KEY", ""))
+
+
+def base_url() -> str:
+    return getattr(settings, "OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+
+
+def model() -> str:
+    # Default of the "Embeddings OpenAI" node of the kb/* workflows
+    return getattr(settings, "OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+
+def timeout() -> float:
+    return float(getattr(settings, "OPENAI_EMBEDDING_TIMEOUT", 10))
+
+
+def cache_enabled() -> bool:
+    return bool(getattr(settings, "EMBEDDING_CACHE_ENABLED", True))
+
+
+def cache_dtype() -> str:
+    dtype = getattr(settings, "EMBEDDING_CACHE_DTYPE", "float16")
+    return dtype if dtype in _FORMATS else "float16"
+
+
+def cache_max_entries() -> int:
+    return int(getattr(settings, "EMBEDDING_CACHE_MAX_ENTRIES", 20000))
+
+
+def cache_key(text: str) -> str:
+    digest = hashlib.sha256(f"{model()}\n{text}".encode("utf-8")).hexdigest()
+    return f"{PREFIX}:{cache_dtype()}:{digest}"
+
+
+def encode(vector: Sequence[float], dtype: str) -> bytes:
+    return struct.pack(f"<{len(vector)}{_FORMATS[dtype]}", *vector)
+
+
+def decode(raw: bytes, dtype: str) -> List[float]:
+    width = struct.calcsize(_FORMATS[dtype])
+    return list(struct.unpack(f"<{len(raw) // width}{_FORMATS[dtype]}", raw))
+
+
+def normalise(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    if not norm:
+        return list(vector)
+    return [x / norm for x in vector]
+
+
+def _read_cache(keys: List[str]) -> Dict[str, List[float]]:
+    dtype = cache_dtype()
+    try:
+        r = get_redis()
+        values = r.mget(keys)
+        found = {key: raw for key, raw in zip(keys, values) if raw is not None}
+        if found:
+            now = time.time()
+            r.zadd(LRU_KEY, {key: now for key in found})
+    except redis.RedisError as e:
+        logger.warning("Redis unavailable for the embedding cache (%s)", e)
+        return {}
+    return {key: decode(raw, dtype) for key, raw in found.items()}
+
+
+def _write_cache(vectors: Dict[str, List[float]]) -> None:
+    dtype = cache_dtype()
+    now = time.time()
+    try:
+        with get_redis().pipeline(transaction=False) as pipe:
+            for key, vector in vectors.items():
+                pipe.set(key, encode(vector, dtype))
+            pipe.zadd(LRU_KEY, {key: now for key in vectors})
+            pipe.eval(_TRIM, 1, LRU_KEY, cache_max_entries())
+            pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Could not store embeddings in Redis: %s", e)
+
+
+def embed(texts: List[str]) -> List[List[float]]:
+    """One unit vector per text, in order; texts embedded before come from the
+    cache. Raises ``EmbeddingError``."""
+    if not is_configured():
+        raise EmbeddingError("OPENAI_API_KEY não configurada.")
+    if not cache_enabled():
+        return _request(texts)
+
+    keys = [cache_key(text) for text in texts]
+    vectors = _read_cache(list(dict.fromkeys(keys)))
+    missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+    if missing:
+        fresh = dict(zip(missing, _request(list(missing.values()))))
+        _write_cache(fresh)
+        vectors.update(fresh)
+    return [vectors[key] for key in keys]
+
+
+def _request(texts: List[str]) -> List[List[float]]:
+    try:
+        # The pooled session of the n8n client; it is not bound to the n8n host
+        resp = n8n_client.get_session().post(
+            f"{base_url()}/embeddings",
+            json={"model": model(), "input": texts},
+            headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"},
+            timeout=timeout(),
+        )
+        resp.raise_for_status()
+        rows = sorted(resp.json()["data"], key=lambda row: row["index"])
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        raise EmbeddingError(f"Erro ao gerar embeddings: {e}") from e
+    return [normalise(row["embedding"]) for row in rows]
+
+
+def embed_one(text: str) -> List[float]:
+    return embed([text])[0]
+
+
+def pack(vector: Sequence[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def unpack(raw: bytes) -> array:
+    vector = array("f")
+    vector.frombytes(bytes(raw))
+    return vector
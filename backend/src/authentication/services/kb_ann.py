@@ -0,0 +1,551 @@
+"""Approximate-nearest-neighbour (pgvector) indexes of the KB collections.
+
+The n8n PGVector nodes keep every KB in the same ``n8n_vectors`` table, with an
+untyped ``vector`` column and no index, so each similarity query scans all the chunks
+of all KBs. This module gives each large enough collection its own partial index::
+
+    CREATE INDEX CONCURRENTLY n8n_vectors_ann_<collection uuid> ON n8n_vectors
+     USING hnsw ((embedding::vector(<dims>)) vector_cosine_ops) WITH (m = .., ...)
+     WHERE collection_id = '<collection uuid>'
+
+Queries only use it when they filter on that collection and order by the same
+expression (``services.kb_retrieval`` does). Parameters follow the pgvector guidance
+for the collection size (``plan``) and are kept in the index comment, next to the
+row count at build time, together with the search setting to use (``ef_search`` /
+``probes``).
+
+The index may also store the vectors in a compact form (``storage``, per KB in
+``KBCatalog.vector_storage``): ``halfvec`` (half precision, half the size, up to 4000
+dimensions instead of 2000) or ``bit`` (``binary_quantize``, one bit per dimension,
+searched by Hamming distance). The ``embedding`` column itself stays float32, since
+the n8n nodes read and write it: queries take ``KB_ANN_RERANK_*`` times more
+candidates from a compact index and re-rank them by exact cosine distance
+(``nearest_rows``).
+
+HNSW indexes stay good as rows are added; IVFFlat ones are rebuilt once the
+collection grew ``KB_ANN_REBUILD_GROWTH`` times. Rebuilds create the new index under
+a temporary name (concurrently, without blocking writes) and swap it in.
+
+The lexical side of hybrid retrieval gets a single full-text GIN index over the whole
+table (``ensure_lexical_index``): term lookups are cheap enough that the collection
+filter can come after them.
+
+Builds run from ``manage.py kb_ann_index`` or, after an ingestion, from the KB worker
+(``schedule`` then ``maintain_pending``).
+"""
+
+import json
+import logging
+import math
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import psycopg2
+import redis
+from django.conf import settings
+from psycopg2 import sql
+
+from authentication.models.kb import KBCatalog
+from authentication.services import n8n_db
+from authentication.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("hnsw", "ivfflat")
+STORAGES = ("vector", "halfvec", "bit")
+# Most dimensions pgvector can index per storage
+MAX_DIMS = {"vector": 2000, "halfvec": 4000, "bit": 64000}
+PENDING_KEY = "kb:ann:pending"
+INDEX_PREFIX = "n8n_vectors_ann_"
+LEXICAL_INDEX = "n8n_vectors_text_fts"
+
+# Largest hnsw.ef_search pgvector accepts; HNSW returns at most that many rows
+MAX_EF_SEARCH = 1000
+
+# Above this many rows pgvector suggests sqrt(rows) IVFFlat lists and a denser graph
+LARGE_COLLECTION = 1_000_000
+
+
+@dataclass
+class IndexPlan:
+    method: str
+    dims: int
+    rows: int
+    params: Dict[str, int] = field(default_factory=dict)  # WITH (...) of the index
+    search: Dict[str, int] = field(default_factory=dict)  # ef_search | probes, rerank
+    storage: str = "vector"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class Collection:
+    uuid: str
+    hash_id: str
+    rows: int
+    dims: Optional[int]
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "KB_ANN_ENABLED", True)) and n8n_db.is_configured()
+
+
+def default_method() -> str:
+    method = getattr(settings, "KB_ANN_METHOD", "hnsw")
+    return method if method in METHODS else "hnsw"
+
+
+def default_storage() -> str:
+    storage = getattr(settings, "KB_ANN_STORAGE", "vector")
+    return storage if storage in STORAGES else "vector"
+
+
+def rerank_factor(storage: str) -> int:
+    if storage == "halfvec":
+        return int(getattr(settings, "KB_ANN_RERANK_HALFVEC", 2))
+    if storage == "bit":
+        return int(getattr(settings, "KB_ANN_RERANK_BIT", 10))
+    return 1
+
+
+def min_rows() -> int:
+    return int(getattr(settings, "KB_ANN_MIN_ROWS", 10000))
+
+
+def rebuild_growth() -> float:
+    return float(getattr(settings, "KB_ANN_REBUILD_GROWTH", 2.0))
+
+
+def maintenance_work_mem() -> str:
+    return getattr(settings, "KB_ANN_MAINTENANCE_WORK_MEM", "512MB")
+
+
+def maintain_interval() -> float:
+    return float(getattr(settings, "KB_ANN_MAINTAIN_INTERVAL", 60))
+
+
+def index_name(collection_uuid: str) -> str:
+    return INDEX_PREFIX + collection_uuid.replace("-", "")
+
+
+def plan(
+    rows: int, dims: int, method: Optional[str] = None, storage: Optional[str] = None
+) -> IndexPlan:
+    """Index parameters for a collection of ``rows`` vectors."""
+    method = method or default_method()
+    storage = storage or default_storage()
+    large = rows > LARGE_COLLECTION
+    search = {"rerank": rerank_factor(storage)} if storage != "vector" else {}
+    if method == "ivfflat":
+        lists = max(1, int(math.sqrt(rows)) if large else rows // 1000)
+        search["probes"] = max(1, int(math.sqrt(lists)))
+        return IndexPlan(method, dims, rows, {"lists": lists}, search, storage)
+    search["ef_search"] = 100 if large else 40
+    return IndexPlan(
+        method,
+        dims,
+        rows,
+        {"m": 24 if large else 16, "ef_construction": 128 if large else 64},
+        search,
+        storage,
+    )
+
+
+def kb_storages(hash_ids: Iterable[str]) -> Dict[str, str]:
+    """Storage chosen for each KB (``KBCatalog.vector_storage``), if any."""
+    return {
+        external_id: storage
+        for external_id, storage in KBCatalog.objects.filter(
+            external_id__in=list(hash_ids)
+        ).values_list("external_id", "vector_storage")
+        if storage in STORAGES
+    }
+
+
+def distance(index: Dict[str, Any], literal: str, column: str = "embedding") -> sql.Composable:
+    """The distance the index is ordered by (same expression as the index definition,
+    or the planner cannot use it), to the query vector ``literal``."""
+    template = {
+        "vector": "({col}::vector({dims})) <=> {q}::vector({dims})",
+        "halfvec": "({col}::halfvec({dims})) <=> {q}::halfvec({dims})",
+        "bit": (
+            "(binary_quantize({col})::bit({dims}))"
+            " <~> binary_quantize({q}::vector({dims}))::bit({dims})"
+        ),
+    }[index.get("storage", "vector")]
+    return sql.SQL(template).format(
+        col=sql.SQL(column), dims=sql.Literal(index["dims"]), q=sql.Literal(literal)
+    )
+
+
+def candidates(index: Optional[Dict[str, Any]], top_k: int) -> int:
+    """Rows to read from the index for ``top_k`` results (more when re-ranked; an HNSW
+    scan returns at most ``MAX_EF_SEARCH``)."""
+    if not index:
+        return top_k
+    rows = top_k * max(1, int(index.get("search", {}).get("rerank", 1)))
+    if index.get("method", "hnsw") == "hnsw":
+        rows = min(rows, MAX_EF_SEARCH)
+    return rows
+
+
+def nearest_rows(
+    collection_uuid: str, index: Optional[Dict[str, Any]], literal: str, top_k: int
+) -> sql.Composable:
+    """``SELECT id, text, metadata, distance`` of the ``top_k`` chunks of a collection
+    nearest to the query (cosine ``distance``): through its index when it has one, with
+    a full-precision re-rank after a compact one; otherwise an exact scan."""
+    exact = sql.SQL("v.embedding <=> {q}::vector").format(q=sql.Literal(literal))
+    collection = sql.Literal(collection_uuid)
+    if not index or not index.get("dims"):
+        order = exact
+    elif index.get("storage", "vector") == "vector":
+        order = distance(index, literal, "v.embedding")
+    else:
+        return sql.SQL(
+            "SELECT v.id, v.text, v.metadata, {exact} AS distance FROM ("
+            "SELECT id, text, metadata, embedding FROM n8n_vectors"
+            " WHERE collection_id = {c} ORDER BY {approx} LIMIT {n}) AS v"
+            " ORDER BY distance LIMIT {k}"
+        ).format(
+            exact=exact,
+            c=collection,
+            approx=distance(index, literal),
+            n=sql.Literal(candidates(index, top_k)),
+            k=sql.Literal(top_k),
+        )
+    return sql.SQL(
+        "SELECT v.id, v.text, v.metadata, {exact} AS distance FROM n8n_vectors v"
+        " WHERE v.collection_id = {c} ORDER BY {order} LIMIT {k}"
+    ).format(exact=exact, c=collection, order=order, k=sql.Literal(top_k))
+
+
+def collections(hash_ids: Optional[Iterable[str]] = None) -> List[Collection]:
+    """The KB collections with their size and vector dimensions."""
+    query = """
+        SELECT c.uuid::text, c.name,
+               (SELECT COUNT(*) FROM n8n_vectors v WHERE v.collection_id = c.uuid),
+               (SELECT vector_dims(v.embedding) FROM n8n_vectors v
+                 WHERE v.collection_id = c.uuid LIMIT 1)
+          FROM n8n_vector_collections c
+    """
+    params: List[Any] = []
+    if hash_ids is not None:
+        query += " WHERE c.name = ANY(%s)"
+        params.append(list(hash_ids))
+    with n8n_db.connection() as conn, conn.cursor() as cur:
+        cur.execute(query + " ORDER BY c.name", params)
+        return [Collection(*row) for row in cur.fetchall()]
+
+
+def current_indexes(cur, collection_uuids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Collection uuid -> comment (built ``IndexPlan``) of its valid ANN index."""
+    names = {index_name(uuid): uuid for uuid in collection_uuids}
+    if not names:
+        return {}
+    cur.execute(
+        """
+        SELECT i.relname, obj_description(i.oid, 'pg_class')
+          FROM pg_class i
+          JOIN pg_index x ON x.indexrelid = i.oid
+         WHERE i.relname = ANY(%s) AND x.indisvalid
+        """,
+        [list(names)],
+    )
+    found = {}
+    for name, comment in cur.fetchall():
+        try:
+            found[names[name]] = json.loads(comment or "{}")
+        except ValueError:
+            found[names[name]] = {}
+    return found
+
+
+def index_bytes(cur, collection_uuid: str) -> Optional[int]:
+    """On-disk size of the collection's index (what must stay in memory to be fast)."""
+    cur.execute(
+        "SELECT pg_relation_size(oid) FROM pg_class WHERE relname = %s",
+        [index_name(collection_uuid)],
+    )
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def needs_build(current: Optional[Dict[str, Any]], wanted: IndexPlan) -> Optional[str]:
+    """Why the collection needs a (new) index, or ``None``."""
+    if current is None:
+        return "missing" if wanted.rows >= min_rows() else None
+    if current.get("method") != wanted.method:
+        return "method"
+    if current.get("dims") != wanted.dims:
+        return "dims"
+    if current.get("storage", "vector") != wanted.storage:
+        return "storage"
+    if wanted.method == "ivfflat" and wanted.rows >= current.get("rows", 0) * rebuild_growth():
+        return "growth"
+    return None
+
+
+_INDEXED = {
+    "vector": ("(embedding::vector({dims}))", "vector_cosine_ops"),
+    "halfvec": ("(embedding::halfvec({dims}))", "halfvec_cosine_ops"),
+    "bit": ("(binary_quantize(embedding)::bit({dims}))", "bit_hamming_ops"),
+}
+
+
+def _create(cur, name: str, collection: Collection, wanted: IndexPlan) -> None:
+    expression, opclass = _INDEXED[wanted.storage]
+    cur.execute(
+        sql.SQL(
+            "CREATE INDEX CONCURRENTLY {name} ON n8n_vectors USING {method} "
+            "({expression} {opclass}) WITH ({params}) "
+            "WHERE collection_id = {collection}"
+        ).format(
+            name=sql.Identifier(name),
+            method=sql.SQL(wanted.method),
+            expression=sql.SQL(expression).format(dims=sql.Literal(wanted.dims)),
+            opclass=sql.SQL(opclass),
+            params=sql.SQL(", ").join(
+                sql.SQL("{} = {}").format(sql.SQL(key), sql.Literal(value))
+                for key, value in wanted.params.items()
+            ),
+            collection=sql.Literal(collection.uuid),
+        )
+    )
+
+
+def _drop(cur, name: str) -> None:
+    cur.execute(sql.SQL("DROP INDEX CONCURRENTLY IF EXISTS {}").format(sql.Identifier(name)))
+
+
+def build(
+    collection: Collection,
+    method: Optional[str] = None,
+    force: bool = False,
+    storage: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Creates or replaces the collection's index when needed (``force``: always).
+    ``storage`` defaults to the KB's (``kb_storages``), then ``KB_ANN_STORAGE``.
+
+    Returns a report (``action``: ``built``/``skipped``/``busy``, the plan, the build
+    time). Raises ``psycopg2.Error``.
+    """
+    report: Dict[str, Any] = {"hash_id": collection.hash_id, "rows": collection.rows}
+    if not collection.dims:
+        return {**report, "action": "skipped", "reason": "empty"}
+    storage = storage or kb_storages([collection.hash_id]).get(collection.hash_id)
+    wanted = plan(collection.rows, collection.dims, method, storage)
+    if wanted.dims > MAX_DIMS[wanted.storage]:
+        return {**report, "action": "skipped", "reason": f"dims > {MAX_DIMS[wanted.storage]}"}
+    name = index_name(collection.uuid)
+    temp, old = f"{name}_new", f"{name}_old"
+
+    with n8n_db.autocommit_connection() as conn, conn.cursor() as cur:
+        # One build per collection at a time, across workers
+        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [name])
+        if not cur.fetchone()[0]:
+            return {**report, "action": "busy"}
+        current = current_indexes(cur, [collection.uuid]).get(collection.uuid)
+        reason = "forced" if force else needs_build(current, wanted)
+        if reason is None:
+            return {**report, "action": "skipped", "index": current}
+
+        started = time.monotonic()
+        cur.execute("SET maintenance_work_mem = %s", [maintenance_work_mem()])
+        for leftover in (temp, old):  # from an interrupted build
+            _drop(cur, leftover)
+        _create(cur, temp, collection, wanted)
+        # Renames only take a brief lock: queries always find an index
+        cur.execute(
+            sql.SQL("ALTER INDEX IF EXISTS {} RENAME TO {}").format(
+                sql.Identifier(name), sql.Identifier(old)
+            )
+        )
+        cur.execute(
+            sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                sql.Identifier(temp), sql.Identifier(name)
+            )
+        )
+        _drop(cur, old)
+        cur.execute(
+            sql.SQL("COMMENT ON INDEX {} IS {}").format(
+                sql.Identifier(name), sql.Literal(json.dumps(wanted.as_dict()))
+            )
+        )
+        seconds = time.monotonic() - started
+    logger.info("ANN index of KB %s built in %.1fs (%s)", collection.hash_id, seconds, reason)
+    return {
+        **report,
+        "action": "built",
+        "reason": reason,
+        "index": wanted.as_dict(),
+        "build_seconds": round(seconds, 3),
+    }
+
+
+def ensure_lexical_index() -> str:
+    """Creates the full-text index ``kb_retrieval.lexical_search`` uses, if missing (or
+    left invalid by an interrupted build): ``"built"`` now, ``"exists"`` already or
+    ``"busy"`` (another process is building it). Raises ``psycopg2.Error``."""
+    with n8n_db.autocommit_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [LEXICAL_INDEX])
+        if not cur.fetchone()[0]:
+            return "busy"
+        cur.execute(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+            " WHERE c.relname = %s",
+            [LEXICAL_INDEX],
+        )
+        row = cur.fetchone()
+        if row and row[0]:
+            return "exists"
+        started = time.monotonic()
+        cur.execute("SET maintenance_work_mem = %s", [maintenance_work_mem()])
+        _drop(cur, LEXICAL_INDEX)
+        # Same expression as the lexical query, or the planner cannot use it
+        cur.execute(
+            sql.SQL(
+                "CREATE INDEX CONCURRENTLY {} ON n8n_vectors"
+                " USING gin (to_tsvector('simple', text))"
+            ).format(sql.Identifier(LEXICAL_INDEX))
+        )
+    logger.info("Lexical KB index built in %.1fs", time.monotonic() - started)
+    return "built"
+
+
+def search_settings(cur, indexes: Iterable[Dict[str, Any]], top_k: int = 0) -> None:
+    """Applies the search settings of the indexes a query will use (current
+    transaction only). HNSW never returns more than ``ef_search`` rows, and pgvector
+    rejects values above ``MAX_EF_SEARCH``."""
+    ef_search = probes = rows = 0
+    for index in indexes:
+        ef_search = max(ef_search, index.get("search", {}).get("ef_search", 0))
+        probes = max(probes, index.get("search", {}).get("probes", 0))
+        rows = max(rows, candidates(index, top_k))
+    if ef_search:
+        cur.execute("SET LOCAL hnsw.ef_search = %s", [min(max(ef_search, rows), MAX_EF_SEARCH)])
+    if probes:
+        cur.execute("SET LOCAL ivfflat.probes = %s", [probes])
+
+
+def _top_ids(cur, collection: Collection, vector: str, k: int, index: Optional[Dict]) -> List[str]:
+    cur.execute(
+        sql.SQL("SELECT id::text FROM ({}) AS hits").format(
+            nearest_rows(collection.uuid, index, vector, k)
+        )
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def measure_recall(collection: Collection, k: int = 10, samples: int = 20) -> Dict[str, Any]:
+    """Recall@k of the index against exact search, using stored vectors as queries,
+    with the mean latency of both. Raises ``psycopg2.Error``."""
+    with n8n_db.connection() as conn, conn.cursor() as cur:
+        index = current_indexes(cur, [collection.uuid]).get(collection.uuid)
+        if index is None:
+            return {"hash_id": collection.hash_id, "index": None}
+        cur.execute(
+            "SELECT embedding::text FROM n8n_vectors WHERE collection_id = %s "
+            "ORDER BY random() LIMIT %s",
+            [collection.uuid, samples],
+        )
+        queries = [row[0] for row in cur.fetchall()]
+
+    hits = 0
+    exact_s = ann_s = 0.0
+    for vector in queries:
+        with n8n_db.connection() as conn, conn.cursor() as cur:
+            cur.execute("SET LOCAL enable_indexscan = off")
+            cur.execute("SET LOCAL enable_bitmapscan = off")
+            started = time.monotonic()
+            exact = _top_ids(cur, collection, vector, k, None)
+            exact_s += time.monotonic() - started
+        with n8n_db.connection() as conn, conn.cursor() as cur:
+            search_settings(cur, [index], k)
+            started = time.monotonic()
+            approx = _top_ids(cur, collection, vector, k, index)
+            ann_s += time.monotonic() - started
+        hits += len(set(exact) & set(approx)) / max(1, len(exact))
+    count = max(1, len(queries))
+    return {
+        "hash_id": collection.hash_id,
+        "index": index,
+        "k": k,
+        "queries": len(queries),
+        "recall": round(hits / count, 4),
+        "exact_ms": round(exact_s / count * 1000, 2),
+        "ann_ms": round(ann_s / count * 1000, 2),
+    }
+
+
+def schedule(hash_id: str) -> None:
+    """Asks the KB worker to check the collection's index (after its rows changed)."""
+    if not enabled():
+        return
+    try:
+        get_redis().sadd(PENDING_KEY, hash_id)
+    except redis.RedisError as e:
+        logger.warning("Could not schedule ANN index check of KB %s: %s", hash_id, e)
+
+
+def _pop_pending() -> List[str]:
+    try:
+        return [raw.decode() for raw in get_redis().spop(PENDING_KEY, 1000) or []]
+    except redis.RedisError as e:
+        logger.warning("Could not read pending ANN index checks: %s", e)
+        return []
+
+
+_lexical_ready = False
+
+
+def maintain_pending() -> List[Dict[str, Any]]:
+    """Builds the indexes the scheduled collections need. Raises ``psycopg2.Error``
+    (the first one) once the collections it could not check are scheduled again."""
+    global _lexical_ready
+    hash_ids = _pop_pending()
+    if not hash_ids:
+        return []
+    try:
+        if not _lexical_ready:  # once per process; new rows are indexed by Postgres
+            _lexical_ready = ensure_lexical_index() != "busy"
+        found = collections(hash_ids)
+    except psycopg2.Error:
+        for hash_id in hash_ids:
+            schedule(hash_id)
+        raise
+    reports = []
+    error = None
+    for collection in found:
+        try:
+            report = build(collection)
+        except psycopg2.Error as e:
+            logger.warning("ANN index check of KB %s failed: %s", collection.hash_id, e)
+            schedule(collection.hash_id)
+            error = error or e
+            continue
+        if report["action"] == "busy":
+            schedule(collection.hash_id)
+        reports.append(report)
+    if error is not None:
+        raise error
+    return reports
+
+
+def indexed_collections(cur, hash_ids: Iterable[str]) -> List[Tuple[Collection, Optional[Dict]]]:
+    """Collections of the KBs (without row counts) and their ANN index, if any."""
+    cur.execute(
+        "SELECT uuid::text, name FROM n8n_vector_collections WHERE name = ANY(%s)",
+        [list(hash_ids)],
+    )
+    found = [Collection(uuid, name, 0, None) for uuid, name in cur.fetchall()]
+    indexes = current_indexes(cur, [c.uuid for c in found])
+    result = []
+    for collection in found:
+        index = indexes.get(collection.uuid)
+        if index:
+            collection.dims = index.get("dims")
+        result.append((collection, index))
+    return result
@@ -0,0 +1,254 @@
+"""Local catalogue of the KBs stored in n8n (``KBCatalog``).
+
+``GET /api/kb/list-all/`` used to download every KB of every tenant from the n8n
+``kb/list-all`` webhook and filter it against the project's ``KBLink`` rows. It now
+reads this table instead, which is kept current by:
+
+* the KB create/edit/delete views (``upsert`` / ``mark_deleted``),
+* ``reconcile``, run periodically by ``run_kb_worker`` (``KB_CATALOG_RECONCILE_INTERVAL``)
+  or on demand with ``manage.py sync_kb_catalog``, which also refreshes file counts
+  from the n8n Postgres when it is reachable (``services.n8n_db``).
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import psycopg2
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+
+from authentication.models.kb import KBCatalog
+from authentication.services import answer_cache, n8n_client, n8n_coalesce, n8n_db
+
+logger = logging.getLogger(__name__)
+
+LIST_ALL_PATH = "/webhook/kb/list-all"
+KB_GET_PATH = "/webhook/kb/get/"
+FILE_LIST_PATH = "/webhook/webhook/kb/file/list"
+
+
+def reconcile_interval() -> float:
+    return float(getattr(settings, "KB_CATALOG_RECONCILE_INTERVAL", 300))
+
+
+def normalize(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    ext_id = row.get("hash_id") or row.get("id") or row.get("external_id")
+    if not ext_id:
+        return None
+    name = row.get("name") or row.get("kb_name") or ""
+    return {"external_id": ext_id, "name": name, **row}
+
+
+def rows_from_payload(payload: Any) -> List[Dict[str, Any]]:
+    """KB rows of a ``kb/list-all`` answer.
+
+    Raises ``ValueError`` on anything that is not a listing, so an error payload is
+    never taken for "no KBs" (which would mark every KB deleted).
+    """
+    if not isinstance(payload, dict) or not ("kbs" in payload or "data" in payload):
+        raise ValueError("Unexpected kb/list-all payload")
+    rows = payload.get("kbs") or payload.get("data") or []
+    return [r for r in rows if isinstance(r, dict)]
+
+
+def as_item(entry: KBCatalog) -> Dict[str, Any]:
+    """Shape of a KB in the list-all response (the n8n row plus the local fields)."""
+    return {
+        **entry.data,
+        "external_id": entry.external_id,
+        "hash_id": entry.external_id,
+        "name": entry.name,
+        "description": entry.description,
+        "file_count": entry.file_count,
+        "updated_at": entry.updated_at,
+    }
+
+
+def upsert(
+    external_id: str,
+    *,
+    name: Optional[str] = None,
+    description: Optional[str] = None,
+    data: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Creates or updates a KB after a create/edit went through n8n."""
+    defaults: Dict[str, Any] = {"deleted_at": None}
+    if name is not None:
+        defaults["name"] = name
+    if description is not None:
+        defaults["description"] = description
+    if data is not None:
+        defaults["data"] = {k: v for k, v in data.items() if k != "status"}
+    try:
+        KBCatalog.objects.update_or_create(external_id=external_id, defaults=defaults)
+    except IntegrityError:
+        # Created concurrently (another request or the reconcile job)
+        KBCatalog.objects.filter(external_id=external_id).update(
+            **defaults, updated_at=timezone.now()
+        )
+
+
+def invalidate_reads(external_id: Optional[str] = None) -> None:
+    """Drops what a KB change makes stale: the cached n8n reads
+    (``services.n8n_coalesce``) and the agent answers built on the KB
+    (``services.answer_cache``, by bumping ``KBCatalog.version``)."""
+    n8n_coalesce.invalidate(LIST_ALL_PATH)
+    if external_id:
+        n8n_coalesce.invalidate(KB_GET_PATH, {"hash_id": external_id})
+        n8n_coalesce.invalidate(FILE_LIST_PATH, {"hash_id": external_id})
+        KBCatalog.objects.filter(external_id=external_id).update(version=F("version") + 1)
+        answer_cache.invalidate_kb(external_id)
+
+
+def mark_deleted(external_id: str) -> None:
+    now = timezone.now()
+    KBCatalog.objects.filter(external_id=external_id, deleted_at__isnull=True).update(
+        deleted_at=now, updated_at=now
+    )
+
+
+def adjust_file_count(external_id: str, delta: int) -> None:
+    """Applies a file add (+1) or delete (-1) without waiting for the next reconcile."""
+    if not delta:
+        return
+    KBCatalog.objects.filter(external_id=external_id, file_count__gte=-delta).update(
+        file_count=F("file_count") + delta
+    )
+
+
+def mark_missing(external_ids: Iterable[str]) -> None:
+    """Records KBs unknown to n8n as deleted (e.g. links to a KB removed outside the
+    backend), so they are not looked up upstream again on every listing."""
+    now = timezone.now()
+    KBCatalog.objects.bulk_create(
+        [KBCatalog(external_id=ext_id, deleted_at=now) for ext_id in external_ids],
+        ignore_conflicts=True,
+    )
+
+
+def sync_rows(rows: Iterable[Dict[str, Any]], as_of: Optional[datetime] = None) -> Dict[str, int]:
+    """Brings the catalogue in line with a complete ``kb/list-all`` listing.
+
+    KBs missing from the listing are marked deleted, unless they changed after
+    ``as_of`` (when the listing was requested): a KB created meanwhile is not in it
+    yet. Returns the number of rows created, updated and deleted.
+    """
+    now = timezone.now()
+    as_of = as_of or now
+    existing = {e.external_id: e for e in KBCatalog.objects.all()}
+    seen = set()
+    to_create: List[KBCatalog] = []
+    to_update: List[KBCatalog] = []
+    for row in rows:
+        item = normalize(row)
+        if item is None or item["external_id"] in seen:
+            continue
+        ext_id = item["external_id"]
+        seen.add(ext_id)
+        data = {k: v for k, v in row.items() if k != "status"}
+        description = row.get("description") or ""
+        entry = existing.get(ext_id)
+        if entry is None:
+            to_create.append(
+                KBCatalog(
+                    external_id=ext_id,
+                    name=item["name"],
+                    description=description,
+                    data=data,
+                    synced_at=now,
+                )
+            )
+            continue
+        if (
+            entry.name != item["name"]
+            or entry.description != description
+            or entry.data != data
+            or entry.deleted_at is not None
+        ):
+            entry.name = item["name"]
+            entry.description = description
+            entry.data = data
+            entry.deleted_at = None
+            entry.updated_at = now
+            to_update.append(entry)
+
+    gone = [
+        ext_id
+        for ext_id, entry in existing.items()
+        if ext_id not in seen and entry.deleted_at is None and entry.updated_at < as_of
+    ]
+
+    KBCatalog.objects.bulk_create(to_create, ignore_conflicts=True, batch_size=500)
+    KBCatalog.objects.bulk_update(
+        to_update,
+        ["name", "description", "data", "deleted_at", "updated_at"],
+        batch_size=500,
+    )
+    if gone:
+        KBCatalog.objects.filter(external_id__in=gone).update(deleted_at=now, updated_at=now)
+    KBCatalog.objects.filter(external_id__in=seen).update(synced_at=now)
+    return {"created": len(to_create), "updated": len(to_update), "deleted": len(gone)}
+
+
+def count_files(hash_ids: Optional[List[str]] = None) -> Dict[str, int]:
+    """Number of distinct files indexed per KB, read from the PGVector tables."""
+    query = """
+        SELECT c.name, COUNT(DISTINCT v.metadata->>'original_file_name')
+          FROM n8n_vector_collections c
+          LEFT JOIN n8n_vectors v ON v.collection_id = c.uuid
+    """
+    params: List[Any] = []
+    if hash_ids is not None:
+        query += " WHERE c.name = ANY(%s)"
+        params.append(list(hash_ids))
+    query += " GROUP BY c.name"
+    with n8n_db.connection() as conn, conn.cursor() as cur:
+        cur.execute(query, params)
+        return {name: count for name, count in cur.fetchall()}
+
+
+def refresh_file_counts(hash_ids: Optional[List[str]] = None) -> int:
+    """Updates ``file_count`` (all live KBs when ``hash_ids`` is None).
+
+    Best effort: does nothing when the n8n Postgres is not configured or reachable.
+    KBs without a collection yet (no file uploaded) count as 0.
+    """
+    if not n8n_db.is_configured():
+        return 0
+    try:
+        counts = count_files(hash_ids)
+    except psycopg2.Error:
+        logger.warning("Could not count KB files in the n8n Postgres", exc_info=True)
+        return 0
+
+    entries = KBCatalog.objects.filter(deleted_at__isnull=True)
+    if hash_ids is not None:
+        entries = entries.filter(external_id__in=hash_ids)
+    changed = []
+    for entry in entries.only("external_id", "file_count"):
+        count = counts.get(entry.external_id, 0)
+        if entry.file_count != count:
+            entry.file_count = count
+            changed.append(entry)
+    KBCatalog.objects.bulk_update(changed, ["file_count"], batch_size=500)
+    return len(changed)
+
+
+def fetch_rows() -> List[Dict[str, Any]]:
+    """Complete KB listing from n8n; raises ``requests.RequestException``/``ValueError``."""
+    resp = n8n_client.get(
+        LIST_ALL_PATH,
+        headers={"key": settings.N8N_KB_KEY, "Content-Type": "application/json"},
+    )
+    resp.raise_for_status()
+    return rows_from_payload(resp.json())
+
+
+def reconcile() -> Dict[str, int]:
+    as_of = timezone.now()
+    stats = sync_rows(fetch_rows(), as_of=as_of)
+    stats["file_counts"] = refresh_file_counts()
+    return stats
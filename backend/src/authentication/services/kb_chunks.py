@@ -0,0 +1,119 @@
+"""Incremental (chunk-level) replacement of a file in a KB.
+
+Replacing a file used to embed the whole new version and drop every vector of the
+old one. For plain-text files the backend can chunk the new version exactly like
+the n8n workflow does (``services.chunking``), compare the chunk hashes with the
+texts already stored in ``n8n_vectors`` for the old file, and then:
+
+* keep the vectors whose text is unchanged (``reused``), renaming them to the new
+  file name if needed,
+* send only the new texts to the ``kb/chunks/add`` webhook for embedding (``added``),
+* delete the vectors whose text is gone (``removed``).
+"""
+
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from authentication.services import n8n_db
+from authentication.services.chunking import chunk_hash, split_text
+
+ADD_CHUNKS_PATH = "/webhook/kb/chunks/add"
+
+# Files the n8n data loader reads as plain text (no PDF/DOCX/CSV parsing involved)
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".text"}
+
+
+@dataclass
+class ChunkPlan:
+    reused: List[str] = field(default_factory=list)  # n8n_vectors ids kept
+    added: List[Tuple[str, str]] = field(default_factory=list)  # (chunk hash, text)
+    removed: List[str] = field(default_factory=list)  # n8n_vectors ids dropped
+
+    def counts(self) -> Dict[str, int]:
+        return {"reused": len(self.reused), "added": len(self.added), "removed": len(self.removed)}
+
+
+def max_incremental_bytes() -> int:
+    return int(getattr(settings, "KB_INCREMENTAL_MAX_BYTES", 20 * 1024 * 1024))
+
+
+def supports_incremental(file_name: str, size: int) -> bool:
+    _, ext = os.path.splitext(file_name or "")
+    return (
+        n8n_db.is_configured()
+        and ext.lower() in TEXT_EXTENSIONS
+        and size <= max_incremental_bytes()
+    )
+
+
+def read_text(upload) -> Optional[str]:
+    """Decoded content of a text upload, or ``None`` if it is not valid UTF-8."""
+    upload.seek(0)
+    raw = b"".join(upload.chunks())
+    upload.seek(0)
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def load_stored_chunks(hash_id: str, file_name: str) -> Dict[str, List[str]]:
+    """Chunk hash -> ids of the vectors stored for ``file_name`` in the KB."""
+    stored: Dict[str, List[str]] = defaultdict(list)
+    with n8n_db.connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT v.id::text, v.text
+              FROM n8n_vectors v
+              JOIN n8n_vector_collections c ON v.collection_id = c.uuid
+             WHERE c.name = %s
+               AND v.metadata->>'original_file_name' = %s
+            """,
+            [hash_id, file_name],
+        )
+        for vector_id, text in cur.fetchall():
+            stored[chunk_hash(text or "")].append(vector_id)
+    return stored
+
+
+def plan(stored: Dict[str, List[str]], new_text: str) -> ChunkPlan:
+    """Matches the new chunks against the stored ones (as a multiset of texts)."""
+    available = {h: list(ids) for h, ids in stored.items()}
+    result = ChunkPlan()
+    for text in split_text(new_text):
+        h = chunk_hash(text)
+        if available.get(h):
+            result.reused.append(available[h].pop())
+        else:
+            result.added.append((h, text))
+    result.removed = [vector_id for ids in available.values() for vector_id in ids]
+    return result
+
+
+def add_payload(hash_id: str, file_name: str, chunk_plan: ChunkPlan) -> Dict:
+    return {
+        "hash_id": hash_id,
+        "file": file_name,
+        "chunks": [{"chunk_hash": h, "text": text} for h, text in chunk_plan.added],
+    }
+
+
+def apply_stored_changes(old_file: str, new_file: str, chunk_plan: ChunkPlan) -> None:
+    """Renames the reused vectors to ``new_file`` and deletes the removed ones
+    (single transaction). Call once the added chunks are embedded."""
+    with n8n_db.connection() as conn, conn.cursor() as cur:
+        if chunk_plan.reused and new_file != old_file:
+            cur.execute(
+                """
+                UPDATE n8n_vectors
+                   SET metadata = jsonb_set(metadata, '{original_file_name}', to_jsonb(%s::text))
+                 WHERE id = ANY(%s::uuid[])
+                """,
+                [new_file, chunk_plan.reused],
+            )
+        if chunk_plan.removed:
+            cur.execute("DELETE FROM n8n_vectors WHERE id = ANY(%s::uuid[])", [chunk_plan.removed])
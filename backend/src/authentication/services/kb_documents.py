@@ -0,0 +1,63 @@
+"""Content-hash index of the files stored in each KB (``KBDocument``).
+
+n8n only recognises a file it already indexed by its name, so the same bytes uploaded
+under another name (or through ``kb/file/update``) used to be embedded again. Uploads
+are hashed while they are written to disk (``uploads.BoundedTemporaryFileUploadHandler``)
+and looked up here before anything is sent to n8n.
+"""
+
+import hashlib
+from typing import Optional
+
+from django.db import IntegrityError
+
+from authentication.models.kb import KBDocument
+from authentication.uploads import upload_chunk_size
+
+
+def content_hash(upload) -> str:
+    """SHA-256 hex digest of an uploaded file.
+
+    Uses the digest computed while the upload was received when available, otherwise
+    reads the (Django ``File``) upload in chunks.
+    """
+    digest = getattr(upload, "sha256", None)
+    if digest:
+        return digest
+
+    sha = hashlib.sha256()
+    for chunk in upload.chunks(upload_chunk_size()):  # rewinds the file first
+        sha.update(chunk)
+    upload.seek(0)
+    return sha.hexdigest()
+
+
+def find_indexed(hash_id: str, digest: str) -> Optional[KBDocument]:
+    if not digest:
+        return None
+    return KBDocument.objects.filter(external_id=hash_id, content_hash=digest).first()
+
+
+def record_indexed(hash_id: str, digest: str, file_name: str, size: int = 0) -> None:
+    """Remembers that ``file_name`` (with content ``digest``) is indexed in the KB."""
+    if not digest:
+        return
+    try:
+        KBDocument.objects.update_or_create(
+            external_id=hash_id,
+            content_hash=digest,
+            defaults={"file_name": file_name, "size": size},
+        )
+    except IntegrityError:
+        # Recorded concurrently by another worker
+        pass
+
+
+def forget_file(hash_id: str, file_name: str) -> int:
+    """Drops the file's records; the number of rows deleted (0: not known here)."""
+    deleted, _ = KBDocument.objects.filter(external_id=hash_id, file_name=file_name).delete()
+    return deleted
+
+
+def forget_kb(hash_id: str) -> None:
+    KBDocument.objects.filter(external_id=hash_id).delete()
@@ -0,0 +1,157 @@
+"""Project-wide KB search: every KB linked to a project, searched in parallel.
+
+A project may link many KBs (``KBLink``); the agent workflows only query a fixed
+collection and ``kb_retrieval.search`` runs one statement over the KBs it is given,
+so one large or slow KB holds up the whole answer. ``search`` fans out one query per
+KB (two in hybrid mode: vector and lexical) to a shared, bounded thread pool, waits
+until the deadline and merges whatever came back:
+
+* vector mode: the best ``top_k`` by cosine similarity (comparable across KBs);
+* hybrid mode: each search's candidates merged by score, then fused with RRF, as in
+  ``kb_retrieval.hybrid_search``.
+
+KBs still running at the deadline are reported in ``timed_out`` (their queued
+queries are cancelled; running ones hit the same ``statement_timeout``), KBs whose
+query failed in ``failed``: the answer is then ``partial`` instead of an error.
+
+The pool is per process and smaller than the n8n Postgres pool
+(``N8N_POSTGRES_POOL_MAX``), so concurrent requests queue for a worker and leave
+connections to the rest of the backend (which waits for one, ``n8n_db.connection``). Access is checked by the caller, on the project
+(``assert_user_project_access``).
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence
+
+import psycopg2
+from django.conf import settings
+
+from authentication.models.kb import KBLink
+from authentication.services import kb_retrieval
+from authentication.services.kb_retrieval import RetrievedChunk
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+@dataclass
+class FederatedResult:
+    results: List[RetrievedChunk]
+    hash_ids: List[str]
+    timed_out: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.timed_out or self.failed)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hash_ids": self.hash_ids,
+            "count": len(self.results),
+            "results": [chunk.as_dict() for chunk in self.results],
+            "partial": self.partial,
+            "timed_out": self.timed_out,
+            "failed": self.failed,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+        }
+
+
+def workers() -> int:
+    return int(getattr(settings, "KB_FEDERATED_WORKERS", 4))
+
+
+def default_deadline_ms() -> int:
+    return int(getattr(settings, "KB_FEDERATED_DEADLINE_MS", 2000))
+
+
+def max_deadline_ms() -> int:
+    return int(getattr(settings, "KB_FEDERATED_MAX_DEADLINE_MS", 10000))
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers(), thread_name_prefix="kb-federated"
+                )
+    return _executor
+
+
+def project_hash_ids(project) -> List[str]:
+    """The KBs linked to the project, resolved once per request."""
+    return list(
+        KBLink.objects.filter(project=project)
+        .order_by("external_id")
+        .values_list("external_id", flat=True)
+        .distinct()
+    )
+
+
+def search(
+    hash_ids: Sequence[str],
+    vector: Sequence[float],
+    top_k: int,
+    *,
+    mode: str = "vector",
+    query: Optional[str] = None,
+    deadline_ms: Optional[int] = None,
+) -> FederatedResult:
+    """Searches each KB on its own and merges the results found within the deadline."""
+    started = time.monotonic()
+    deadline_ms = min(deadline_ms or default_deadline_ms(), max_deadline_ms())
+    hybrid = mode == "hybrid"
+    candidates = top_k * max(1, kb_retrieval.hybrid_candidates()) if hybrid else top_k
+
+    tasks = {}
+    for hash_id in hash_ids:
+        runs = {"vector": partial(kb_retrieval.search, [hash_id], vector, candidates, deadline_ms)}
+        if hybrid:
+            runs["lexical"] = partial(
+                kb_retrieval.lexical_search, [hash_id], query or "", candidates, deadline_ms
+            )
+        for source, run in runs.items():
+            tasks[get_executor().submit(run)] = (hash_id, source)
+
+    done, pending = wait(tasks, timeout=deadline_ms / 1000)
+    for future in pending:
+        future.cancel()  # queued ones never start; running ones are left to finish
+
+    rankings: Dict[str, List[RetrievedChunk]] = {"vector": []}
+    if hybrid:
+        rankings["lexical"] = []
+    failed = set()
+    for future in done:
+        hash_id, source = tasks[future]
+        try:
+            rankings[source].extend(future.result())
+        except psycopg2.Error as e:
+            logger.warning("Federated search of KB %s (%s) failed: %s", hash_id, source, e)
+            failed.add(hash_id)
+    timed_out = {tasks[future][0] for future in pending} - failed
+    if timed_out:
+        logger.info("Federated search deadline (%sms) hit by KBs %s", deadline_ms, timed_out)
+
+    for ranking in rankings.values():
+        ranking.sort(key=lambda chunk: chunk.score, reverse=True)
+    if hybrid:
+        results = kb_retrieval.fuse(rankings, top_k)
+    else:
+        results = rankings["vector"][:top_k]
+    return FederatedResult(
+        results=results,
+        hash_ids=list(hash_ids),
+        timed_out=sorted(timed_out),
+        failed=sorted(failed),
+        elapsed_ms=(time.monotonic() - started) * 1000,
+    )
@@ -0,0 +1,360 @@
+"""Background ingestion of files uploaded to a knowledge base.
+
+``POST /api/kb/file/add/`` only stores the upload as a ``KBIngestionJob`` and pushes
+its id to the Redis list ``KB_JOB_QUEUE``; ``manage.py run_kb_worker`` pops the ids
+and calls ``run_job``, which sends the file to the n8n ``kb/file/add`` webhook.
+
+The database row is the source of truth. Redis only carries job ids, so an id lost
+on the way (Redis restart, worker killed mid-job) is pushed again by ``sweep``, and
+``claim`` makes sure a job is only run by one worker even if its id shows up twice.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+import requests
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from authentication.models.kb_ingestion_job import KBIngestionJob, KBJobStatus
+from authentication.services import kb_ann, kb_catalog, kb_documents, n8n_client, n8n_guard
+from authentication.services.multipart import MultipartStream
+from authentication.services.redis_client import get_redis
+from authentication.uploads import upload_chunk_size
+
+logger = logging.getLogger(__name__)
+
+TARGET_PATH = "/webhook/kb/file/add"
+
+# Upstream answers worth another attempt; other 4xx mean the file itself was refused
+RETRYABLE_STATUS = {408, 425, 429}
+
+
+def queue_name() -> str:
+    return getattr(settings, "KB_JOB_QUEUE", "kb:ingest:queue")
+
+
+def max_attempts() -> int:
+    return int(getattr(settings, "KB_JOB_MAX_ATTEMPTS", 3))
+
+
+def batch_parallelism() -> int:
+    return max(1, int(getattr(settings, "KB_BATCH_PARALLELISM", 4)))
+
+
+def create_job(user, hash_id: str, upload) -> Tuple[KBIngestionJob, bool]:
+    """Persists ``upload`` and queues it; the id is pushed once the row is committed.
+
+    Content the KB already has is not queued again: a job already ``done`` (pointing
+    at the indexed file) is returned instead, or the queued/running job ingesting the
+    same bytes. Returns ``(job, queued)``.
+    """
+    digest = kb_documents.content_hash(upload)
+    file_name = upload.name
+    content_type = getattr(upload, "content_type", None) or "application/octet-stream"
+
+    indexed = kb_documents.find_indexed(hash_id, digest)
+    if indexed is not None:
+        now = timezone.now()
+        job = KBIngestionJob.objects.create(
+            hash_id=hash_id,
+            user=user,
+            file_name=file_name,
+            content_type=content_type,
+            content_hash=digest,
+            status=KBJobStatus.DONE.value,
+            started_at=now,
+            finished_at=now,
+            result={
+                "status_code": 200,
+                "data": {"status": "duplicate", "file": indexed.file_name},
+            },
+        )
+        return job, False
+
+    in_flight = (
+        KBIngestionJob.objects.filter(
+            hash_id=hash_id,
+            content_hash=digest,
+            status__in=[KBJobStatus.QUEUED.value, KBJobStatus.RUNNING.value],
+        )
+        .order_by("created_at")
+        .first()
+    )
+    if in_flight is not None:
+        return in_flight, False
+
+    job = KBIngestionJob(
+        hash_id=hash_id,
+        user=user,
+        file_name=file_name,
+        content_type=content_type,
+        content_hash=digest,
+    )
+    job.file.save(upload.name, upload, save=False)
+    job.save()
+    transaction.on_commit(lambda: enqueue(job.id))
+    return job, True
+
+
+def _outcome(job: KBIngestionJob, queued: bool) -> str:
+    if queued:
+        return "queued"
+    if job.status == KBJobStatus.DONE.value:
+        return "duplicate"
+    return "in_progress"
+
+
+def create_jobs(user, hash_id: str, uploads) -> List[Dict[str, Any]]:
+    """``create_job`` for many files of one KB (``POST /api/kb/files/batch-add/``).
+
+    Files are stored by up to ``KB_BATCH_PARALLELISM`` threads, and the worker sends
+    them to n8n with its own concurrency. Identical contents in the batch are stored
+    once. A file that cannot be stored does not stop the others. Returns one entry per
+    upload, in order: ``{"file", "outcome", "job", "error"}``, where ``outcome`` is
+    ``queued``, ``duplicate`` (already indexed), ``in_progress`` (same content being
+    ingested) or ``error``.
+    """
+    uploads = list(uploads)
+    digests = [kb_documents.content_hash(upload) for upload in uploads]
+    first_by_digest: Dict[str, int] = {}
+    unique: List[int] = []
+    for i, digest in enumerate(digests):
+        if digest not in first_by_digest:
+            first_by_digest[digest] = i
+            unique.append(i)
+
+    def store(i: int) -> Dict[str, Any]:
+        upload = uploads[i]
+        try:
+            job, queued = create_job(user, hash_id, upload)
+        except Exception:
+            logger.exception("Could not store %s for KB %s", upload.name, hash_id)
+            return {
+                "file": upload.name,
+                "outcome": "error",
+                "job": None,
+                "error": "Não foi possível gravar o arquivo.",
+            }
+        return {"file": upload.name, "outcome": _outcome(job, queued), "job": job, "error": ""}
+
+    def store_in_thread(i: int) -> Dict[str, Any]:
+        try:
+            return store(i)
+        finally:
+            # Database connections are per thread; do not leave them open in the pool
+            connections.close_all()
+
+    workers = min(batch_parallelism(), len(unique))
+    if workers <= 1:
+        stored = [store(i) for i in unique]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kb-batch") as pool:
+            stored = list(pool.map(store_in_thread, unique))
+    by_index = dict(zip(unique, stored))
+
+    results = []
+    for i, upload in enumerate(uploads):
+        first = by_index[first_by_digest[digests[i]]]
+        if i in by_index:
+            results.append(first)
+        elif first["job"] is None:
+            results.append({**first, "file": upload.name})
+        else:
+            # Same bytes as an earlier file of the batch: nothing else to ingest
+            results.append({**first, "file": upload.name, "outcome": "duplicate"})
+    return results
+
+
+def enqueue(job_id) -> bool:
+    """Pushes ``job_id`` to the queue. When Redis is unavailable the job stays
+    ``queued`` in the database and is picked up by the next ``sweep``."""
+    try:
+        get_redis().lpush(queue_name(), str(job_id))
+        return True
+    except redis.RedisError:
+        logger.warning("Could not enqueue KB ingestion job %s; left for the sweeper", job_id)
+        return False
+
+
+def claim(job_id) -> Optional[KBIngestionJob]:
+    """Atomically moves a queued job to ``running``; ``None`` if another worker has it,
+    it already finished, its retry is not due yet or it does not exist."""
+    now = timezone.now()
+    updated = (
+        KBIngestionJob.objects.filter(id=job_id, status=KBJobStatus.QUEUED.value)
+        .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+        .update(
+            status=KBJobStatus.RUNNING.value,
+            attempts=F("attempts") + 1,
+            started_at=Coalesce(F("started_at"), now),
+            next_attempt_at=None,
+            updated_at=now,
+        )
+    )
+    if not updated:
+        return None
+    return KBIngestionJob.objects.get(id=job_id)
+
+
+def _upstream_payload(response: requests.Response) -> Any:
+    try:
+        return response.json()
+    except ValueError:
+        return {"raw": response.text}
+
+
+def _send(job: KBIngestionJob) -> requests.Response:
+    with job.file.open("rb") as fh:
+        body = MultipartStream(
+            fields={"hash_id": job.hash_id},
+            files={"file": (job.file_name, fh, job.content_type)},
+            chunk_size=upload_chunk_size(),
+        )
+        return n8n_client.post_multipart(TARGET_PATH, body, headers={"key": settings.N8N_KB_KEY})
+
+
+def _finish(job: KBIngestionJob, status: KBJobStatus, result=None, error: str = "") -> None:
+    job.status = status.value
+    job.result = result
+    job.error = error
+    job.finished_at = timezone.now()
+    # The upload is not needed anymore once the job reached a final state
+    if job.file:
+        try:
+            job.file.delete(save=False)
+        except OSError:
+            logger.warning("Could not remove upload of KB ingestion job %s", job.id)
+    job.save(update_fields=["status", "result", "error", "finished_at", "file", "updated_at"])
+
+
+def _retry_or_fail(job: KBIngestionJob, error: str, result=None) -> None:
+    if job.attempts >= max_attempts():
+        logger.error(
+            "KB ingestion job %s failed after %s attempts: %s", job.id, job.attempts, error
+        )
+        _finish(job, KBJobStatus.FAILED, result=result, error=error)
+        return
+
+    backoff = int(getattr(settings, "KB_JOB_RETRY_BACKOFF", 15)) * 2 ** (job.attempts - 1)
+    job.status = KBJobStatus.QUEUED.value
+    job.next_attempt_at = timezone.now() + timedelta(seconds=backoff)
+    job.result = result
+    job.error = error
+    job.save(update_fields=["status", "next_attempt_at", "result", "error", "updated_at"])
+    logger.warning(
+        "KB ingestion job %s attempt %s failed (%s); retrying in %ss",
+        job.id,
+        job.attempts,
+        error,
+        backoff,
+    )
+
+
+def _defer(job: KBIngestionJob, rejected: n8n_guard.UpstreamRejected) -> None:
+    """Puts the job back without spending an attempt: n8n was never called."""
+    job.status = KBJobStatus.QUEUED.value
+    job.attempts = max(0, job.attempts - 1)
+    job.next_attempt_at = timezone.now() + timedelta(seconds=rejected.wait)
+    job.error = str(rejected.detail)
+    job.save(update_fields=["status", "attempts", "next_attempt_at", "error", "updated_at"])
+    logger.info("KB ingestion job %s deferred %ss: %s", job.id, rejected.wait, rejected.detail)
+
+
+def run_job(job_id) -> Optional[KBIngestionJob]:
+    """Claims the job and sends its file to n8n. Returns ``None`` if it was not claimed."""
+    job = claim(job_id)
+    if job is None:
+        return None
+
+    if not n8n_client.is_configured():
+        _retry_or_fail(job, "Configuração do N8N ausente (N8N_BASE_URL/N8N_KB_KEY).")
+        return job
+
+    try:
+        response = _send(job)
+    except (FileNotFoundError, ValueError):
+        # ValueError: the FileField is empty (upload already removed)
+        _finish(job, KBJobStatus.FAILED, error="Arquivo do job não encontrado.")
+        return job
+    except n8n_guard.UpstreamRejected as e:
+        _defer(job, e)
+        return job
+    except requests.Timeout:
+        _retry_or_fail(job, "Timeout ao chamar serviço externo.")
+        return job
+    except requests.RequestException as e:
+        _retry_or_fail(job, f"Erro ao chamar serviço externo: {e}")
+        return job
+
+    result = {"status_code": response.status_code, "data": _upstream_payload(response)}
+    if response.ok:
+        kb_documents.record_indexed(job.hash_id, job.content_hash, job.file_name, job.file.size)
+        kb_catalog.adjust_file_count(job.hash_id, 1)
+        kb_catalog.invalidate_reads(job.hash_id)
+        kb_ann.schedule(job.hash_id)
+        _finish(job, KBJobStatus.DONE, result=result)
+    elif response.status_code >= 500 or response.status_code in RETRYABLE_STATUS:
+        _retry_or_fail(job, f"Serviço externo respondeu {response.status_code}.", result=result)
+    else:
+        _finish(
+            job,
+            KBJobStatus.FAILED,
+            result=result,
+            error=f"Serviço externo recusou o arquivo ({response.status_code}).",
+        )
+    return job
+
+
+def sweep() -> Tuple[int, int]:
+    """Re-queues jobs whose id is not (or no longer) in Redis.
+
+    * ``running`` jobs older than ``KB_JOB_STALE_AFTER`` lost their worker; they are
+      retried (or failed once out of attempts).
+    * ``queued`` jobs are pushed when their retry is due, or when nobody picked them
+      up for ``KB_JOB_STALE_AFTER`` seconds. Pushing clears ``next_attempt_at`` and
+      touches ``updated_at``, so the same job is not pushed again on every sweep.
+
+    Returns ``(recovered, pushed)``.
+    """
+    now = timezone.now()
+    stale_after = timedelta(seconds=int(getattr(settings, "KB_JOB_STALE_AFTER", 120)))
+
+    recovered = 0
+    stale = KBIngestionJob.objects.filter(
+        status=KBJobStatus.RUNNING.value,
+        updated_at__lt=now - stale_after,
+    )
+    for job in stale:
+        # Only the sweeper that flips the row handles it
+        if KBIngestionJob.objects.filter(
+            id=job.id, status=KBJobStatus.RUNNING.value, updated_at=job.updated_at
+        ).update(updated_at=now):
+            job.updated_at = now
+            _retry_or_fail(job, "Worker interrompido durante o processamento.")
+            recovered += 1
+
+    cutoff = now - stale_after
+    due: List[Dict[str, Any]] = list(
+        KBIngestionJob.objects.filter(status=KBJobStatus.QUEUED.value)
+        .filter(
+            Q(next_attempt_at__lte=now)
+            | Q(next_attempt_at__isnull=True, updated_at__lt=cutoff)
+            | Q(next_attempt_at__isnull=True, updated_at__isnull=True, created_at__lt=cutoff)
+        )
+        .values("id")[:500]
+    )
+    pushed = 0
+    for row in due:
+        KBIngestionJob.objects.filter(id=row["id"], status=KBJobStatus.QUEUED.value).update(
+            next_attempt_at=None, updated_at=now
+        )
+        if enqueue(row["id"]):
+            pushed += 1
+    return recovered, pushed
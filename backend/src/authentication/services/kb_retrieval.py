@@ -0,0 +1,264 @@
+"""Semantic retrieval straight from the PGVector collections of the n8n Postgres.
+
+The agent workflows retrieve chunks with n8n's ``Postgres PGVector Store`` node;
+anything else that needed retrieval had to go through a webhook execution. ``search``
+runs the same nearest-neighbour query over a pooled connection (``services.n8n_db``):
+the chunks of the given KBs (``n8n_vector_collections.name`` = ``hash_id``) closest
+to the query vector by cosine distance, with ``score`` = cosine similarity.
+
+Each KB is queried on its own and the results merged, so collections with an ANN
+index (``services.kb_ann``) are searched through it; the others are scanned.
+
+Vector search misses exact identifiers (product codes, ticket numbers), so
+``hybrid_search`` also runs a lexical search over the chunk texts (Postgres full text,
+``simple`` configuration, so codes like ``SKU-1042`` stay whole; ranked with
+``ts_rank`` normalised by length, GIN index from ``kb_ann.ensure_lexical_index``) at
+the same time, and merges both rankings with reciprocal-rank fusion:
+``score = sum(1 / (KB_HYBRID_RRF_K + rank))``.
+
+Query vectors must come from the model the KBs were indexed with (``embeddings.embed``
+uses the same one). Access is the caller's business in ``search``; ``authorize`` checks
+it with ``assert_user_kb_access`` (``retrieve`` does both).
+"""
+
+import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, List, Optional, Sequence
+
+from django.conf import settings
+from psycopg2 import sql
+
+from authentication.permissions import assert_user_kb_access
+from authentication.services import kb_ann, n8n_db
+
+
+@dataclass
+class RetrievedChunk:
+    id: str
+    hash_id: str
+    file: str
+    text: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    ranks: Dict[str, int] = field(default_factory=dict)  # hybrid: rank in each search
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+MODES = ("vector", "hybrid")
+
+# Words, and codes made of words joined by - . / (kept whole by the simple parser)
+_TERM = re.compile(r"\w(?:[\w./-]*\w)?", re.UNICODE)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def default_top_k() -> int:
+    return int(getattr(settings, "KB_RETRIEVAL_TOP_K", 5))
+
+
+def max_top_k() -> int:
+    return int(getattr(settings, "KB_RETRIEVAL_MAX_TOP_K", 50))
+
+
+def statement_timeout_ms() -> int:
+    return int(getattr(settings, "KB_RETRIEVAL_TIMEOUT_MS", 5000))
+
+
+def rrf_k() -> int:
+    return int(getattr(settings, "KB_HYBRID_RRF_K", 60))
+
+
+def hybrid_candidates() -> int:
+    return int(getattr(settings, "KB_HYBRID_CANDIDATES", 4))
+
+
+def max_terms() -> int:
+    return int(getattr(settings, "KB_LEXICAL_MAX_TERMS", 32))
+
+
+def hybrid_workers() -> int:
+    return int(getattr(settings, "KB_HYBRID_WORKERS", 4))
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=hybrid_workers(), thread_name_prefix="kb-hybrid"
+                )
+    return _executor
+
+
+def vector_literal(vector: Sequence[float]) -> str:
+    """pgvector text form (``[0.1,0.2,...]``), cast with ``::vector`` in the query."""
+    return "[" + ",".join(repr(float(x)) for x in vector) + "]"
+
+
+def _nearest(collection, index: Optional[Dict], literal: str, top_k: int) -> sql.Composable:
+    return sql.SQL(
+        "(SELECT hits.id::text AS id, {name} AS name, hits.text, hits.metadata, hits.distance"
+        " FROM ({rows}) AS hits)"
+    ).format(
+        name=sql.Literal(collection.hash_id),
+        rows=kb_ann.nearest_rows(collection.uuid, index, literal, top_k),
+    )
+
+
+def search(
+    hash_ids: Sequence[str],
+    vector: Sequence[float],
+    top_k: int,
+    timeout_ms: Optional[int] = None,
+) -> List[RetrievedChunk]:
+    """The ``top_k`` chunks of the KBs closest to ``vector``, best first.
+    Raises ``psycopg2.Error`` (``DataError`` when the dimensions do not match)."""
+    if not hash_ids:
+        return []
+    literal = vector_literal(vector)
+    with n8n_db.connection() as conn, conn.cursor() as cur:
+        # Per transaction: the connection goes back to the pool afterwards
+        cur.execute("SET LOCAL statement_timeout = %s", [timeout_ms or statement_timeout_ms()])
+        found = kb_ann.indexed_collections(cur, hash_ids)
+        if not found:
+            return []
+        kb_ann.search_settings(cur, [index for _, index in found if index], top_k)
+        cur.execute(
+            sql.SQL("SELECT id, name, text, metadata, 1 - distance FROM ({}) AS hits").format(
+                sql.SQL(" UNION ALL ").join(
+                    _nearest(collection, index, literal, top_k) for collection, index in found
+                )
+            )
+            + sql.SQL(" ORDER BY distance LIMIT {}").format(sql.Literal(top_k))
+        )
+        return _chunks(cur.fetchall())
+
+
+def _chunks(rows) -> List[RetrievedChunk]:
+    return [
+        RetrievedChunk(
+            id=vector_id,
+            hash_id=hash_id,
+            file=(metadata or {}).get("original_file_name", ""),
+            text=text or "",
+            score=float(score),
+            metadata=metadata or {},
+        )
+        for vector_id, hash_id, text, metadata, score in rows
+    ]
+
+
+def lexical_terms(query: str) -> List[str]:
+    terms = dict.fromkeys(term.lower() for term in _TERM.findall(query or ""))
+    return list(terms)[: max_terms()]
+
+
+def lexical_search(
+    hash_ids: Sequence[str], query: str, top_k: int, timeout_ms: Optional[int] = None
+) -> List[RetrievedChunk]:
+    """The ``top_k`` chunks of the KBs containing most of the query terms (any of
+    them), best first. Raises ``psycopg2.Error``."""
+    terms = lexical_terms(query)
+    if not hash_ids or not terms:
+        return []
+    # OR of the terms; each one may still be several lexemes (e.g. "SKU-1042")
+    tsquery = sql.SQL(" || ").join(
+        sql.SQL("plainto_tsquery('simple', {})").format(sql.Literal(term)) for term in terms
+    )
+    with n8n_db.connection() as conn, conn.cursor() as cur:
+        cur.execute("SET LOCAL statement_timeout = %s", [timeout_ms or statement_timeout_ms()])
+        cur.execute(
+            sql.SQL(
+                """
+                SELECT v.id::text, c.name, v.text, v.metadata,
+                       ts_rank(to_tsvector('simple', v.text), q.query, 1) AS score
+                  FROM n8n_vectors v
+                  JOIN n8n_vector_collections c ON v.collection_id = c.uuid
+                 CROSS JOIN (SELECT {tsquery} AS query) q
+                 WHERE c.name = ANY({hash_ids})
+                   AND to_tsvector('simple', v.text) @@ q.query
+                 ORDER BY score DESC
+                 LIMIT {limit}
+                """
+            ).format(
+                tsquery=tsquery, hash_ids=sql.Literal(list(hash_ids)), limit=sql.Literal(top_k)
+            )
+        )
+        return _chunks(cur.fetchall())
+
+
+def fuse(rankings: Dict[str, List[RetrievedChunk]], top_k: int) -> List[RetrievedChunk]:
+    """Reciprocal-rank fusion of several rankings of chunks."""
+    k = rrf_k()
+    scores: Dict[str, float] = defaultdict(float)
+    ranks: Dict[str, Dict[str, int]] = defaultdict(dict)
+    chunks: Dict[str, RetrievedChunk] = {}
+    for source, ranking in rankings.items():
+        for rank, chunk in enumerate(ranking, start=1):
+            scores[chunk.id] += 1.0 / (k + rank)
+            ranks[chunk.id][source] = rank
+            chunks.setdefault(chunk.id, chunk)
+    best = sorted(scores, key=lambda chunk_id: scores[chunk_id], reverse=True)[:top_k]
+    return [
+        replace(chunks[chunk_id], score=scores[chunk_id], ranks=ranks[chunk_id])
+        for chunk_id in best
+    ]
+
+
+def hybrid_search(
+    hash_ids: Sequence[str], query: str, vector: Sequence[float], top_k: int
+) -> List[RetrievedChunk]:
+    """Vector and lexical search run in parallel (one pooled connection each), fused
+    with RRF. Both go to a per-process pool of ``KB_HYBRID_WORKERS`` threads, so
+    concurrent requests queue for it instead of holding two connections each.
+    Raises ``psycopg2.Error``."""
+    candidates = top_k * max(1, hybrid_candidates())
+    by_vector = get_executor().submit(search, hash_ids, vector, candidates)
+    by_text = get_executor().submit(lexical_search, hash_ids, query, candidates)
+    rankings = {"vector": by_vector.result(), "lexical": by_text.result()}
+    return fuse(rankings, top_k)
+
+
+def authorize(user, hash_ids: Sequence[str]) -> List[str]:
+    """The distinct ``hash_ids``, once the user may read all of them; raises
+    ``PermissionDenied`` otherwise. ORM queries: run it on the sync thread."""
+    hash_ids = list(dict.fromkeys(hash_ids))
+    for hash_id in hash_ids:
+        assert_user_kb_access(user, hash_id)
+    return hash_ids
+
+
+def run(
+    hash_ids: Sequence[str],
+    vector: Sequence[float],
+    top_k: int,
+    *,
+    mode: str = "vector",
+    query: Optional[str] = None,
+) -> List[RetrievedChunk]:
+    """``search`` (or ``hybrid_search`` with ``query``) with ``top_k`` capped at
+    ``max_top_k``; no ORM access, so it can run in any thread."""
+    top_k = min(top_k, max_top_k())
+    if mode == "hybrid":
+        return hybrid_search(hash_ids, query or "", vector, top_k)
+    return search(hash_ids, vector, top_k)
+
+
+def retrieve(
+    user,
+    hash_ids: Sequence[str],
+    vector: Sequence[float],
+    top_k: int,
+    *,
+    mode: str = "vector",
+    query: Optional[str] = None,
+) -> List[RetrievedChunk]:
+    """``run`` over KBs the user may read; raises ``PermissionDenied`` otherwise."""
+    return run(authorize(user, hash_ids), vector, top_k, mode=mode, query=query)
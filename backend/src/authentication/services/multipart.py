@@ -0,0 +1,124 @@
+"""``multipart/form-data`` bodies streamed from disk.
+
+``requests`` builds a multipart body by reading every file fully into memory, and a
+second copy of an upload is exactly what a KB proxy should not hold. ``MultipartStream``
+computes the body length upfront (so n8n still receives a plain ``Content-Length``
+request) and yields it in fixed-size chunks read from the file objects, keeping memory
+per upload at one chunk whatever the file size.
+"""
+
+import asyncio
+import os
+import uuid
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# field name -> (file name, file object, content type)
+FileSpec = Tuple[str, BinaryIO, Optional[str]]
+Part = Union[bytes, Tuple[BinaryIO, int]]
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', "%22").replace("\r", "").replace("\n", "")
+
+
+def _file_size(fileobj: BinaryIO) -> int:
+    size = getattr(fileobj, "size", None)
+    if size is not None:
+        return int(size)
+    try:
+        return os.fstat(fileobj.fileno()).st_size
+    except (AttributeError, OSError, ValueError):
+        pos = fileobj.tell()
+        fileobj.seek(0, os.SEEK_END)
+        size = fileobj.tell()
+        fileobj.seek(pos)
+        return size
+
+
+class MultipartStream:
+    """Multipart body made of plain ``fields`` followed by ``files``.
+
+    Iterate it (``for chunk in body`` / ``async for chunk in body.aiter()``) to get the
+    encoded bytes; ``len(body)`` is the exact ``Content-Length``. File objects must be
+    seekable; they are rewound before being read.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[Dict[str, str]] = None,
+        files: Optional[Dict[str, FileSpec]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        boundary: Optional[str] = None,
+    ):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self._parts: List[Part] = []
+
+        delimiter = f"--{self.boundary}\r\n".encode()
+        for name, value in (fields or {}).items():
+            self._parts.append(
+                delimiter
+                + f'Content-Disposition: form-data; name="{_quote(name)}"\r\n\r\n'.encode()
+                + str(value).encode()
+                + b"\r\n"
+            )
+        for name, (file_name, fileobj, content_type) in (files or {}).items():
+            self._parts.append(
+                delimiter
+                + (
+                    f'Content-Disposition: form-data; name="{_quote(name)}"; '
+                    f'filename="{_quote(file_name)}"\r\n'
+                    f"Content-Type: {content_type or 'application/octet-stream'}\r\n\r\n"
+                ).encode()
+            )
+            self._parts.append((fileobj, _file_size(fileobj)))
+            self._parts.append(b"\r\n")
+        self._parts.append(f"--{self.boundary}--\r\n".encode())
+
+        self.content_length = sum(
+            len(part) if isinstance(part, bytes) else part[1] for part in self._parts
+        )
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Content-Type": self.content_type, "Content-Length": str(self.content_length)}
+
+    def __len__(self) -> int:
+        return self.content_length
+
+    def _read(self, fileobj: BinaryIO, remaining: int) -> bytes:
+        chunk = fileobj.read(min(self.chunk_size, remaining))
+        if not chunk:
+            raise IOError("Arquivo terminou antes do tamanho esperado.")
+        return chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            fileobj, remaining = part
+            fileobj.seek(0)
+            while remaining > 0:
+                chunk = self._read(fileobj, remaining)
+                remaining -= len(chunk)
+                yield chunk
+
+    async def aiter(self) -> AsyncIterator[bytes]:
+        """Async variant of ``__iter__``; file reads run in a thread."""
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+                continue
+            fileobj, remaining = part
+            await asyncio.to_thread(fileobj.seek, 0)
+            while remaining > 0:
+                chunk = await asyncio.to_thread(self._read, fileobj, remaining)
+                remaining -= len(chunk)
+                yield chunk
@@ -0,0 +1,216 @@
+"""Process-wide HTTP clients for the n8n webhooks.
+
+Every KB proxy view and the chat search go through this module so that calls to
+``N8N_BASE_URL`` reuse keep-alive connections from a single pool instead of
+opening a new TCP/TLS connection per request.
+
+Two flavours are exposed: a blocking ``requests`` session (``request``/``get``/...)
+for sync code such as management commands and workers, and an ``httpx.AsyncClient``
+(``arequest``/``aget``/...) for the async views served through ``asgi.py``.
+
+Both are subject to the per-webhook circuit breaker and in-flight cap of
+``services.n8n_guard``.
+"""
+
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from authentication.services import n8n_guard
+from authentication.services.multipart import MultipartStream
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# httpx.AsyncClient is bound to the event loop it first ran on, so keep one per loop
+# (a single one per worker under uvicorn).
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=int(getattr(settings, "N8N_POOL_CONNECTIONS", 4)),
+        pool_maxsize=int(getattr(settings, "N8N_POOL_MAXSIZE", 32)),
+        pool_block=bool(getattr(settings, "N8N_POOL_BLOCK", False)),
+        max_retries=0,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Returns the shared ``requests.Session`` (created lazily, once per process)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def is_configured() -> bool:
+    return bool(getattr(settings, "N8N_BASE_URL", None) and getattr(settings, "N8N_KB_KEY", None))
+
+
+def build_url(path: str) -> str:
+    return f"{settings.N8N_BASE_URL}{path}"
+
+
+def resolve_url(target: str) -> str:
+    """Absolute URL of a webhook given either as a path under ``N8N_BASE_URL`` or as a
+    full URL (e.g. ``Agents.url_n8n``)."""
+    if target.startswith(("http://", "https://")):
+        return target
+    return build_url(target)
+
+
+def guard_key(target: str) -> str:
+    """Path under which ``services.n8n_guard`` tracks calls to ``target``."""
+    return httpx.URL(resolve_url(target)).path
+
+
+def timeout_for(path: str) -> Tuple[float, float]:
+    """(connect, read) timeout for a webhook path.
+
+    The read timeout comes from ``N8N_ENDPOINT_TIMEOUTS[path]`` when set, falling back
+    to ``N8N_TIMEOUT``. The connect timeout is ``N8N_CONNECT_TIMEOUT`` for every path.
+    """
+    overrides: Dict[str, Any] = getattr(settings, "N8N_ENDPOINT_TIMEOUTS", {}) or {}
+    read = overrides.get(path, getattr(settings, "N8N_TIMEOUT", 10))
+    connect = getattr(settings, "N8N_CONNECT_TIMEOUT", 5)
+    return float(connect), float(read)
+
+
+def request(
+    method: str, path: str, *, timeout: Optional[Timeout] = None, **kwargs
+) -> requests.Response:
+    """Sends ``method`` to ``N8N_BASE_URL + path`` through the pooled session.
+
+    Extra keyword arguments (``headers``, ``json``, ``data``, ``files``...) are passed
+    straight to ``requests``. Network errors are raised as ``requests`` exceptions;
+    calls refused by ``services.n8n_guard`` raise ``n8n_guard.UpstreamRejected``.
+    """
+    with n8n_guard.guard(path) as call:
+        response = get_session().request(
+            method,
+            build_url(path),
+            timeout=timeout if timeout is not None else timeout_for(path),
+            **kwargs,
+        )
+        call.record(response.status_code)
+    return response
+
+
+def get(path: str, **kwargs) -> requests.Response:
+    return request("GET", path, **kwargs)
+
+
+def post(path: str, **kwargs) -> requests.Response:
+    return request("POST", path, **kwargs)
+
+
+def patch(path: str, **kwargs) -> requests.Response:
+    return request("PATCH", path, **kwargs)
+
+
+def delete(path: str, **kwargs) -> requests.Response:
+    return request("DELETE", path, **kwargs)
+
+
+def post_multipart(
+    path: str, body: MultipartStream, *, headers: Optional[Dict[str, str]] = None, **kwargs
+) -> requests.Response:
+    """POSTs a streamed multipart ``body`` (see ``services.multipart``) without buffering it."""
+    return request("POST", path, data=body, headers={**(headers or {}), **body.headers}, **kwargs)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Returns the ``httpx.AsyncClient`` shared by every coroutine on the running loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        max_connections = int(getattr(settings, "N8N_ASYNC_MAX_CONNECTIONS", 200))
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=int(
+                    getattr(settings, "N8N_POOL_MAXSIZE", max_connections)
+                ),
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def arequest(
+    method: str, path: str, *, timeout: Optional[Timeout] = None, **kwargs
+) -> httpx.Response:
+    """Async counterpart of ``request``; network errors are raised as ``httpx`` exceptions."""
+    if timeout is None:
+        connect, read = timeout_for(path)
+        timeout = httpx.Timeout(read, connect=connect)
+    with n8n_guard.guard(path) as call:
+        response = await get_async_client().request(
+            method, build_url(path), timeout=timeout, **kwargs
+        )
+        call.record(response.status_code)
+    return response
+
+
+@asynccontextmanager
+async def astream(
+    method: str, target: str, *, timeout: Optional[Timeout] = None, **kwargs
+) -> AsyncIterator[httpx.Response]:
+    """Opens a streamed call to ``target`` (path or full URL, see ``resolve_url``).
+
+    Yields the response as soon as its headers arrive; read the body with
+    ``aiter_bytes``/``aiter_lines`` inside the block. The call holds its
+    ``services.n8n_guard`` slot until the block exits.
+    """
+    path = guard_key(target)
+    if timeout is None:
+        connect, read = timeout_for(path)
+        timeout = httpx.Timeout(read, connect=connect)
+    with n8n_guard.guard(path) as call:
+        async with get_async_client().stream(
+            method, resolve_url(target), timeout=timeout, **kwargs
+        ) as response:
+            call.record(response.status_code)
+            yield response
+
+
+async def aget(path: str, **kwargs) -> httpx.Response:
+    return await arequest("GET", path, **kwargs)
+
+
+async def apost(path: str, **kwargs) -> httpx.Response:
+    return await arequest("POST", path, **kwargs)
+
+
+async def apatch(path: str, **kwargs) -> httpx.Response:
+    return await arequest("PATCH", path, **kwargs)
+
+
+async def adelete(path: str, **kwargs) -> httpx.Response:
+    return await arequest("DELETE", path, **kwargs)
+
+
+async def apost_multipart(
+    path: str, body: MultipartStream, *, headers: Optional[Dict[str, str]] = None, **kwargs
+) -> httpx.Response:
+    return await arequest(
+        "POST", path, content=body.aiter(), headers={**(headers or {}), **body.headers}, **kwargs
+    )
@@ -0,0 +1,249 @@
+"""Single-flight coalescing of identical n8n webhook reads.
+
+When a dashboard loads, many users of the same project ask for the same KB (or its
+file list) at once, and each request used to run its own n8n execution. ``aget``
+makes identical reads (same path and JSON body) share one upstream call:
+
+* inside a worker process, concurrent callers await the same ``asyncio`` task;
+* across processes, the first caller takes a Redis lock (``SET NX``) and runs the
+  call, the others subscribe to a channel and get the leader's response from it.
+
+The response is stored under a result key for ``N8N_COALESCE_TTL`` seconds when it
+is a success (a short cache, cleared by ``invalidate`` after writes), or for a
+fraction of a second otherwise, just long enough for followers that subscribed late.
+If Redis is unavailable, or the leader does not answer in time, callers go to n8n
+directly. Request headers are not part of the key: only use it for reads that send
+the same credentials (``N8N_KB_KEY``).
+"""
+
+import asyncio
+import base64
+import hashlib
+import json as jsonlib
+import logging
+import uuid
+import weakref
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import redis
+from django.conf import settings
+
+from authentication.services import n8n_client, n8n_guard
+from authentication.services.redis_client import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "n8n:sf"
+
+# How long a non-cached result stays readable for followers that subscribed late
+RESULT_LINGER_MS = 500
+
+# Deletes the lock only if it is still ours (it may have expired and been re-taken)
+_RELEASE = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "N8N_COALESCE_ENABLED", True))
+
+
+def default_ttl() -> float:
+    return float(getattr(settings, "N8N_COALESCE_TTL", 0))
+
+
+def request_key(method: str, path: str, json: Any = None) -> str:
+    body = (
+        jsonlib.dumps(json, sort_keys=True, separators=(",", ":"), default=str)
+        if json is not None
+        else ""
+    )
+    return hashlib.sha256(f"{method} {path}\n{body}".encode("utf-8")).hexdigest()
+
+
+def _result_key(key: str) -> str:
+    return f"{PREFIX}:res:{key}"
+
+
+def _lock_key(key: str) -> str:
+    return f"{PREFIX}:lock:{key}"
+
+
+def _channel(key: str) -> str:
+    return f"{PREFIX}:ch:{key}"
+
+
+def _pack(response: httpx.Response) -> bytes:
+    return jsonlib.dumps(
+        {
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type", ""),
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+    ).encode("utf-8")
+
+
+def _pack_error(kind: str, detail: str) -> bytes:
+    return jsonlib.dumps({"error": kind, "detail": detail}).encode("utf-8")
+
+
+def _pack_rejected(error: n8n_guard.UpstreamRejected) -> bytes:
+    return jsonlib.dumps(
+        {
+            "error": "rejected",
+            "status": error.status_code,
+            "wait": error.wait,
+            "detail": str(error.detail),
+        }
+    ).encode("utf-8")
+
+
+def _unpack(raw: bytes, path: str) -> httpx.Response:
+    """Rebuilds the shared result; upstream errors are raised again as ``httpx`` errors
+    (and admission refusals as ``n8n_guard.UpstreamRejected``)."""
+    data = jsonlib.loads(raw)
+    request = httpx.Request("GET", n8n_client.build_url(path))
+    if data.get("error") == "rejected":
+        cls = (
+            n8n_guard.UpstreamBusy
+            if data["status"] == n8n_guard.UpstreamBusy.status_code
+            else n8n_guard.UpstreamUnavailable
+        )
+        raise cls(path, data["wait"], data["detail"])
+    if "error" in data:
+        if data["error"] == "timeout":
+            raise httpx.TimeoutException(data["detail"], request=request)
+        raise httpx.TransportError(data["detail"], request=request)
+    headers = {"Content-Type": data["content_type"]} if data["content_type"] else {}
+    return httpx.Response(
+        data["status"],
+        headers=headers,
+        content=base64.b64decode(data["body"]),
+        request=request,
+    )
+
+
+async def _call(path: str, headers: Optional[Dict[str, str]], json: Any) -> Tuple[bytes, bool]:
+    """Runs the upstream call; returns the packed result and whether it may be cached."""
+    try:
+        response = await n8n_client.aget(path, headers=headers, json=json)
+    except n8n_guard.UpstreamRejected as e:
+        return _pack_rejected(e), False
+    except httpx.TimeoutException as e:
+        return _pack_error("timeout", str(e) or "Timeout."), False
+    except httpx.HTTPError as e:
+        return _pack_error("http", str(e)), False
+    return _pack(response), response.is_success
+
+
+def _lock_ms(path: str) -> int:
+    connect, read = n8n_client.timeout_for(path)
+    return int((connect + read + 1) * 1000)
+
+
+async def _lead(r, key: str, token: str, path, headers, json, ttl: float) -> bytes:
+    raw, cacheable = await _call(path, headers, json)
+    px = int(ttl * 1000) if cacheable and ttl > 0 else RESULT_LINGER_MS
+    try:
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.set(_result_key(key), raw, px=px)
+            pipe.publish(_channel(key), raw)
+            pipe.eval(_RELEASE, 1, _lock_key(key), token)
+            await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Could not share n8n result for %s: %s", path, e)
+    return raw
+
+
+async def _follow(r, key: str, path, headers, json, wait_ms: int) -> bytes:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait_ms / 1000
+    pubsub = r.pubsub()
+    try:
+        # Subscribe before looking for the result: the leader stores it before
+        # publishing, so one of the two always sees it.
+        await pubsub.subscribe(_channel(key))
+        raw = await r.get(_result_key(key))
+        if raw is not None:
+            return raw
+        while (remaining := deadline - loop.time()) > 0:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=min(remaining, 1.0)
+            )
+            if message is not None and message["type"] == "message":
+                return message["data"]
+            if not await r.exists(_lock_key(key)):
+                # Leader finished (result may have lingered out) or died: stop waiting
+                raw = await r.get(_result_key(key))
+                if raw is not None:
+                    return raw
+                break
+    finally:
+        await pubsub.aclose()
+    logger.info("No shared n8n result for %s; calling upstream directly", path)
+    raw, _ = await _call(path, headers, json)
+    return raw
+
+
+async def _shared(path: str, headers, json, key: str, ttl: float) -> bytes:
+    try:
+        r = get_async_redis()
+        raw = await r.get(_result_key(key))
+        if raw is not None:
+            return raw
+        token = uuid.uuid4().hex
+        lock_ms = _lock_ms(path)
+        if await r.set(_lock_key(key), token, nx=True, px=lock_ms):
+            return await _lead(r, key, token, path, headers, json, ttl)
+        return await _follow(r, key, path, headers, json, lock_ms)
+    except redis.RedisError as e:
+        logger.warning("Redis unavailable for n8n coalescing (%s); calling upstream", e)
+        raw, _ = await _call(path, headers, json)
+        return raw
+
+
+async def aget(
+    path: str,
+    *,
+    headers: Optional[Dict[str, str]] = None,
+    json: Any = None,
+    ttl: Optional[float] = None,
+) -> httpx.Response:
+    """Coalesced ``n8n_client.aget``; raises the same ``httpx`` errors.
+
+    ``ttl`` (seconds) overrides ``N8N_COALESCE_TTL`` for this read; 0 only shares
+    calls already in flight.
+    """
+    if not enabled():
+        return await n8n_client.aget(path, headers=headers, json=json)
+
+    ttl = default_ttl() if ttl is None else ttl
+    key = request_key("GET", path, json)
+    loop = asyncio.get_running_loop()
+    tasks = _inflight.setdefault(loop, {})
+    task = tasks.get(key)
+    if task is None:
+        task = loop.create_task(_shared(path, headers, json, key, ttl))
+        tasks[key] = task
+        task.add_done_callback(lambda _t: tasks.pop(key, None))
+    # shield: a caller that goes away must not cancel the call the others wait for
+    raw = await asyncio.shield(task)
+    return _unpack(raw, path)
+
+
+def invalidate(path: str, json: Any = None) -> None:
+    """Drops the cached result of a read (call after a write that changes it)."""
+    if not enabled():
+        return
+    try:
+        get_redis().delete(_result_key(request_key("GET", path, json)))
+    except redis.RedisError as e:
+        logger.warning("Could not invalidate cached n8n read %s: %s", path, e)
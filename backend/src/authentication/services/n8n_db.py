@@ -0,0 +1,97 @@
+"""Pooled connections to the n8n Postgres (PGVector collections, chat memory).
+
+The KB endpoints normally reach this database only through n8n webhooks. Operations
+that n8n cannot express efficiently (e.g. touching single chunks of a file) open a
+connection from a small per-process ``ThreadedConnectionPool`` instead.
+
+The pool itself fails at once when all its connections are in use; ``connection``
+waits up to ``N8N_POSTGRES_POOL_TIMEOUT`` seconds for one instead, so bursts of
+concurrent requests queue rather than fail (``PoolError`` after the wait).
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from django.conf import settings
+from psycopg2 import InterfaceError, OperationalError
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+_pool: Optional[ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def is_configured() -> bool:
+    return bool(getattr(settings, "N8N_POSTGRES_HOST", None))
+
+
+def pool_max() -> int:
+    return int(getattr(settings, "N8N_POSTGRES_POOL_MAX", 10))
+
+
+def pool_timeout() -> float:
+    return float(getattr(settings, "N8N_POSTGRES_POOL_TIMEOUT", 10))
+
+
+def get_pool() -> ThreadedConnectionPool:
+    global _pool, _slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _slots = threading.BoundedSemaphore(pool_max())
+                _pool = ThreadedConnectionPool(
+                    minconn=0,
+                    maxconn=pool_max(),
+                    host=settings.N8N_POSTGRES_HOST,
+                    port=int(getattr(settings, "N8N_POSTGRES_PORT", 5432)),
+                    dbname=settings.N8N_POSTGRES_DB,
+                    user=settings.N8N_POSTGRES_USER,
+                    password=settings.N8N_POSTGRES_PASSWORD,
+                    connect_timeout=int(getattr(settings, "N8N_POSTGRES_CONNECT_TIMEOUT", 5)),
+                )
+    return _pool
+
+
+@contextmanager
+def _borrowed(close: bool = False) -> Iterator:
+    """A connection of the pool, waiting for a free one; returned (or closed) after."""
+    pool = get_pool()
+    if not _slots.acquire(timeout=pool_timeout()):
+        raise PoolError("connection pool exhausted")
+    try:
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            pool.putconn(conn, close=close or bool(conn.closed))
+    finally:
+        _slots.release()
+
+
+@contextmanager
+def connection() -> Iterator:
+    """Borrows a connection; commits on success, rolls back on error.
+
+    Connections that broke while in use are discarded instead of returned to the pool.
+    """
+    with _borrowed() as conn:
+        try:
+            yield conn
+            conn.commit()
+        except (OperationalError, InterfaceError):
+            conn.close()  # broken while in use: not returned to the pool
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+
+
+@contextmanager
+def autocommit_connection() -> Iterator:
+    """Borrows a connection in autocommit mode, for statements that cannot run in a
+    transaction (``CREATE INDEX CONCURRENTLY``). Always closed afterwards, so session
+    settings and advisory locks never leak back into the pool."""
+    with _borrowed(close=True) as conn:
+        conn.autocommit = True
+        yield conn
@@ -0,0 +1,247 @@
+"""Circuit breaker and admission control for the n8n webhooks.
+
+Every call made through ``services.n8n_client`` is admitted here first, per webhook
+path and per worker process:
+
+* **In-flight cap** — at most ``N8N_MAX_IN_FLIGHT`` calls to the same path run at
+  once (``N8N_MAX_IN_FLIGHT_PER_PATH`` overrides it per path). Extra requests are
+  refused right away with ``429`` + ``Retry-After`` instead of queueing behind n8n.
+* **Circuit breaker** — after ``N8N_BREAKER_FAILURE_THRESHOLD`` consecutive failures
+  (network error, timeout or ``5xx``) the path is *open*: calls fail fast with
+  ``503`` + ``Retry-After`` for ``N8N_BREAKER_RESET_TIMEOUT`` seconds. Then one probe
+  call is let through (*half-open*); its outcome closes or re-opens the breaker.
+
+``snapshot()`` reports the state and counters of this process (``GET /api/health/n8n/``);
+rejections are also counted in Redis (``n8n:guard:rejected``) so the totals cover
+every worker.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+import redis
+import requests
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from authentication.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+REJECTED_KEY = "n8n:guard:rejected"
+
+# Errors that mean n8n did not answer (as opposed to our own bugs or a cancelled request)
+UPSTREAM_ERRORS = (requests.RequestException, httpx.HTTPError)
+
+
+class UpstreamRejected(APIException):
+    """A call refused before reaching n8n; ``wait`` becomes the ``Retry-After`` header."""
+
+    def __init__(self, path: str, retry_after: float, detail: Optional[str] = None):
+        self.path = path
+        self.wait = max(1, int(retry_after + 0.999))
+        super().__init__(detail)
+
+
+class UpstreamUnavailable(UpstreamRejected):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Serviço externo indisponível no momento. Tente novamente em instantes."
+    default_code = "upstream_unavailable"
+
+
+class UpstreamBusy(UpstreamRejected):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = "Serviço externo ocupado. Tente novamente em instantes."
+    default_code = "upstream_busy"
+
+
+def failure_threshold() -> int:
+    return int(getattr(settings, "N8N_BREAKER_FAILURE_THRESHOLD", 5))
+
+
+def reset_timeout() -> float:
+    return float(getattr(settings, "N8N_BREAKER_RESET_TIMEOUT", 30))
+
+
+def max_in_flight(path: str) -> int:
+    overrides: Dict[str, Any] = getattr(settings, "N8N_MAX_IN_FLIGHT_PER_PATH", {}) or {}
+    return int(overrides.get(path, getattr(settings, "N8N_MAX_IN_FLIGHT", 50)))
+
+
+@dataclass
+class Breaker:
+    path: str
+    state: str = CLOSED
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    in_flight: int = 0
+    probing: bool = False
+    successes: int = 0
+    failures: int = 0
+    rejected_open: int = 0
+    rejected_busy: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def as_dict(self) -> Dict[str, Any]:
+        retry_after = 0.0
+        if self.state == OPEN:
+            retry_after = max(0.0, self.opened_at + reset_timeout() - time.monotonic())
+        return {
+            "path": self.path,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after": round(retry_after, 1),
+            "in_flight": self.in_flight,
+            "max_in_flight": max_in_flight(self.path),
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected_open": self.rejected_open,
+            "rejected_busy": self.rejected_busy,
+        }
+
+
+_breakers: Dict[str, Breaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(path: str) -> Breaker:
+    breaker = _breakers.get(path)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(path, Breaker(path))
+    return breaker
+
+
+def _count_rejection(path: str, reason: str) -> None:
+    try:
+        get_redis().hincrby(REJECTED_KEY, f"{reason}:{path}", 1)
+    except redis.RedisError:
+        pass
+
+
+def _admit(breaker: Breaker) -> bool:
+    """Reserves an in-flight slot; returns whether the call is the half-open probe."""
+    with breaker.lock:
+        now = time.monotonic()
+        if breaker.state == OPEN:
+            remaining = breaker.opened_at + reset_timeout() - now
+            if remaining > 0:
+                breaker.rejected_open += 1
+                reason, error = "open", UpstreamUnavailable(breaker.path, remaining)
+            else:
+                breaker.state = HALF_OPEN
+                logger.info("n8n breaker for %s half-open: probing", breaker.path)
+        if breaker.state == HALF_OPEN and breaker.probing:
+            breaker.rejected_open += 1
+            reason, error = "open", UpstreamUnavailable(breaker.path, 1)
+        elif breaker.state != OPEN and breaker.in_flight >= max_in_flight(breaker.path):
+            breaker.rejected_busy += 1
+            reason, error = "busy", UpstreamBusy(breaker.path, 1)
+        elif breaker.state != OPEN:
+            breaker.in_flight += 1
+            probe = breaker.state == HALF_OPEN
+            breaker.probing = breaker.probing or probe
+            return probe
+    _count_rejection(breaker.path, reason)
+    raise error
+
+
+def check(path: str) -> None:
+    """Raises what ``guard`` would raise right now, without taking a slot. For callers
+    that must answer before the call itself starts (e.g. streamed responses)."""
+    breaker = get_breaker(path)
+    with breaker.lock:
+        error: Optional[UpstreamRejected] = None
+        if breaker.state == OPEN:
+            remaining = breaker.opened_at + reset_timeout() - time.monotonic()
+            if remaining > 0:
+                breaker.rejected_open += 1
+                reason, error = "open", UpstreamUnavailable(path, remaining)
+        elif breaker.state == HALF_OPEN and breaker.probing:
+            breaker.rejected_open += 1
+            reason, error = "open", UpstreamUnavailable(path, 1)
+        if error is None and breaker.in_flight >= max_in_flight(path):
+            breaker.rejected_busy += 1
+            reason, error = "busy", UpstreamBusy(path, 1)
+    if error is not None:
+        _count_rejection(path, reason)
+        raise error
+
+
+def _release(breaker: Breaker, probe: bool, ok: Optional[bool]) -> None:
+    """Frees the slot; ``ok`` is None when the call ended without an upstream verdict."""
+    with breaker.lock:
+        breaker.in_flight -= 1
+        if probe:
+            breaker.probing = False
+        if ok is None:
+            return
+        if ok:
+            breaker.successes += 1
+            breaker.consecutive_failures = 0
+            if breaker.state == HALF_OPEN and probe:
+                breaker.state = CLOSED
+                logger.info("n8n breaker for %s closed", breaker.path)
+            return
+        breaker.failures += 1
+        breaker.consecutive_failures += 1
+        if (breaker.state == HALF_OPEN and probe) or (
+            breaker.state == CLOSED and breaker.consecutive_failures >= failure_threshold()
+        ):
+            breaker.state = OPEN
+            breaker.opened_at = time.monotonic()
+            logger.warning(
+                "n8n breaker for %s open after %s consecutive failures",
+                breaker.path,
+                breaker.consecutive_failures,
+            )
+
+
+class Call:
+    """Outcome holder of a guarded call; ``record`` it with the upstream status code."""
+
+    def __init__(self):
+        self.ok: Optional[bool] = None
+
+    def record(self, status_code: int) -> None:
+        self.ok = status_code < 500
+
+
+@contextmanager
+def guard(path: str) -> Iterator[Call]:
+    """Admits a call to ``path`` (or raises ``UpstreamRejected``) and books its outcome."""
+    breaker = get_breaker(path)
+    probe = _admit(breaker)
+    call = Call()
+    try:
+        yield call
+    except UPSTREAM_ERRORS:
+        call.ok = False
+        raise
+    finally:
+        _release(breaker, probe, call.ok)
+
+
+def snapshot() -> Dict[str, Any]:
+    rejected: Dict[str, int] = {}
+    try:
+        rejected = {
+            k.decode(): int(v) for k, v in (get_redis().hgetall(REJECTED_KEY) or {}).items()
+        }
+    except redis.RedisError:
+        pass
+    breakers: List[Dict[str, Any]] = [b.as_dict() for b in list(_breakers.values())]
+    return {
+        "breakers": sorted(breakers, key=lambda b: b["path"]),
+        "rejected_total": rejected,
+    }
@@ -0,0 +1,52 @@
+"""Shared Redis connection for queues and caches.
+
+The connection pool is created lazily on first use (once per process) from
+``REDIS_URL``; ``redis.Redis`` instances are thread-safe, so views, management
+commands and worker threads can all share the same client. Async views use
+``get_async_redis`` instead (one ``redis.asyncio.Redis`` per event loop).
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Optional
+
+import redis
+import redis.asyncio
+from django.conf import settings
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+
+# redis.asyncio connections belong to the loop that opened them (one per uvicorn worker)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, redis.asyncio.Redis]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _options():
+    return {
+        "socket_connect_timeout": float(getattr(settings, "REDIS_CONNECT_TIMEOUT", 2)),
+        "socket_timeout": float(getattr(settings, "REDIS_SOCKET_TIMEOUT", 5)),
+        "health_check_interval": 30,
+    }
+
+
+def get_redis() -> redis.Redis:
+    """Returns the process-wide Redis client (responses are raw ``bytes``)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(settings.REDIS_URL, **_options())
+    return _client
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Returns the ``redis.asyncio`` client of the running event loop (raw ``bytes``)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = redis.asyncio.Redis.from_url(settings.REDIS_URL, **_options())
+        _async_clients[loop] = client
+    return client
@@ -0,0 +1,137 @@
+"""Where the state of refresh tokens (outstanding, blacklisted) is kept.
+
+With ``ROTATE_REFRESH_TOKENS`` and ``BLACKLIST_AFTER_ROTATION`` every refresh and
+logout blacklists a refresh token. simplejwt keeps that in the ``OutstandingToken`` /
+``BlacklistedToken`` tables, which grow without limit and need the user row (the
+``IntegrityError`` fallbacks of the login and refresh views). ``TOKEN_STORE`` selects
+the store used by ``authentication.tokens.RefreshToken``:
+
+* ``"redis"`` (default): one key per ``jti``, expiring with the token. Blacklisting
+  is a single ``SET NX``, which also tells whether the token was already used: a
+  refresh or logout costs one Redis operation and a token cannot be rotated twice;
+* ``"sql"``: simplejwt's tables, as before.
+
+``manage.py migrate_token_store`` copies the tokens still valid from the tables to
+Redis before switching. When Redis is unavailable tokens are not blacklisted (logged),
+as the refresh view already did when the blacklist failed.
+"""
+
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from authentication.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "auth:jwt"
+
+
+def _ttl(exp) -> int:
+    return int(exp - time.time())
+
+
+class RedisTokenStore:
+    """``auth:jwt:outstanding:<jti>`` and ``auth:jwt:blacklist:<jti>`` hold the user id
+    and expire with the token."""
+
+    name = "redis"
+
+    @staticmethod
+    def _key(kind: str, jti: str) -> str:
+        return f"{PREFIX}:{kind}:{jti}"
+
+    def outstand(self, jti: str, user_id, exp: int, token: str = "") -> None:
+        if _ttl(exp) <= 0:
+            return
+        try:
+            get_redis().set(self._key("outstanding", jti), str(user_id or ""), ex=_ttl(exp))
+        except redis.RedisError as e:
+            logger.warning("Could not record outstanding token %s: %s", jti, e)
+
+    def blacklist(self, jti: str, user_id, exp: int, token: str = "") -> bool:
+        """Blacklists the token; ``False`` when it already was."""
+        if _ttl(exp) <= 0:  # expired: rejected anyway
+            return True
+        try:
+            return bool(
+                get_redis().set(
+                    self._key("blacklist", jti), str(user_id or ""), ex=_ttl(exp), nx=True
+                )
+            )
+        except redis.RedisError as e:
+            logger.warning("Could not blacklist token %s: %s", jti, e)
+            return True
+
+    def load(self, tokens) -> int:
+        """Writes ``(jti, user_id, exp, blacklisted)`` tuples (``migrate_token_store``) in
+        one pipeline; expired ones are skipped. Redis errors propagate."""
+        pipe = get_redis().pipeline(transaction=False)
+        count = 0
+        for jti, user_id, exp, blacklisted in tokens:
+            if _ttl(exp) <= 0:
+                continue
+            pipe.set(self._key("outstanding", jti), str(user_id or ""), ex=_ttl(exp))
+            if blacklisted:
+                pipe.set(self._key("blacklist", jti), str(user_id or ""), ex=_ttl(exp))
+            count += 1
+        pipe.execute()
+        return count
+
+    def is_blacklisted(self, jti: str) -> bool:
+        try:
+            return bool(get_redis().exists(self._key("blacklist", jti)))
+        except redis.RedisError as e:
+            logger.warning("Token blacklist unavailable: %s", e)
+            return False
+
+
+class SQLTokenStore:
+    """simplejwt's ``OutstandingToken`` / ``BlacklistedToken`` tables."""
+
+    name = "sql"
+
+    @staticmethod
+    def _outstanding(jti: str, user_id, exp: int, token: str = "") -> OutstandingToken:
+        User = get_user_model()
+        user = User.objects.filter(**{jwt_api_settings.USER_ID_FIELD: user_id}).first()
+        outstanding, _ = OutstandingToken.objects.get_or_create(
+            jti=jti,
+            defaults={
+                "user": user,
+                "created_at": timezone.now(),
+                "token": token,
+                "expires_at": datetime_from_epoch(exp),
+            },
+        )
+        return outstanding
+
+    def outstand(self, jti: str, user_id, exp: int, token: str = "") -> None:
+        self._outstanding(jti, user_id, exp, token)
+
+    def blacklist(self, jti: str, user_id, exp: int, token: str = "") -> bool:
+        _, created = BlacklistedToken.objects.get_or_create(
+            token=self._outstanding(jti, user_id, exp, token)
+        )
+        return created
+
+    def is_blacklisted(self, jti: str) -> bool:
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+_STORES = {store.name: store for store in (RedisTokenStore(), SQLTokenStore())}
+
+
+def get_store():
+    name = getattr(settings, "TOKEN_STORE", "redis")
+    try:
+        return _STORES[name]
+    except KeyError:
+        raise ValueError(f"TOKEN_STORE inválido: {name!r} (use 'redis' ou 'sql').")
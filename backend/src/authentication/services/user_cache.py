@@ -0,0 +1,177 @@
+"""Redis cache of the users resolved by JWT authentication.
+
+Every authenticated request used to load its ``UserProfile`` from the database. The
+row is now cached in Redis, shared by all workers, under ``auth:user:<id>`` together
+with the user's version number (``auth:user:<id>:v``), and read with one ``MGET``.
+Entries are JSON and leave out the password and reset token (``SECRET_FIELDS``); only
+an MD5 digest of the password hash is kept, for ``CHECK_REVOKE_TOKEN``.
+
+Changes bump the version (``invalidate``) instead of deleting the entry, so a worker
+that loaded the user just before a change cannot put the old row back: it stores it
+under the version it read, which no longer matches. ``authentication.signals`` calls
+``invalidate`` after every save or delete of a user and every change of their groups
+(roles), once the transaction commits; the logout view calls it too. Entries also
+expire after ``USER_CACHE_TTL`` seconds.
+
+Stateless authentication (``authentication.stateless_auth``) trusts the token claims
+instead of the row. ``invalidate`` also records when the user last changed, so tokens
+whose claims were read before are re-checked against the row; the marker outlives
+the claims it concerns (``claims_max_age``). Logging out revokes the access token
+(``revoke_token``) until it expires.
+
+Redis errors fall back to the database lookup.
+"""
+
+import json
+import logging
+import time
+from typing import Callable, Optional, Tuple
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from authentication.models.user_profile import UserProfile
+from authentication.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "auth:user"
+# Never written to Redis; only a digest of the password (CHECK_REVOKE_TOKEN)
+SECRET_FIELDS = {"password", "password_reset_token", "password_reset_token_expires_at"}
+PASSWORD_MD5 = "_password_md5"
+
+
+def enabled() -> bool:
+    return bool(getattr(settings, "USER_CACHE_ENABLED", True))
+
+
+def ttl() -> int:
+    return int(getattr(settings, "USER_CACHE_TTL", 300))
+
+
+def _keys(user_id) -> tuple:
+    return f"{PREFIX}:{user_id}:v", f"{PREFIX}:{user_id}"
+
+
+def _changed_key(user_id) -> str:
+    return f"{PREFIX}:{user_id}:changed"
+
+
+def _revoked_key(jti) -> str:
+    return f"auth:revoked:{jti}"
+
+
+def claims_max_age() -> int:
+    """Age after which token claims are no longer covered by the markers. Refreshing
+    copies the claims (and ``claims_at``) of the refresh token into the new access
+    token, so they may be as old as the refresh token."""
+    return int(jwt_api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+
+
+def _marker_ttl() -> int:
+    return claims_max_age() + 60
+
+
+def _cached_fields():
+    return [f for f in UserProfile._meta.concrete_fields if f.attname not in SECRET_FIELDS]
+
+
+def _dump(version: int, user: UserProfile) -> str:
+    data = {
+        field.attname: field.get_prep_value(getattr(user, field.attname))
+        for field in _cached_fields()
+    }
+    if jwt_api_settings.CHECK_REVOKE_TOKEN:
+        data[PASSWORD_MD5] = get_md5_hash_password(user.password)
+    return json.dumps({"version": version, "user": data}, cls=DjangoJSONEncoder)
+
+
+def _load(raw: bytes, version: int):
+    cached = json.loads(raw)
+    if cached["version"] != version:
+        return None
+    data = cached["user"]
+    fields = _cached_fields()
+    values = [field.to_python(data[field.attname]) for field in fields]
+    # The secret fields are deferred: read from the database if ever accessed, and
+    # left out of save()
+    user = UserProfile.from_db("default", [field.attname for field in fields], values)
+    if PASSWORD_MD5 in data:
+        user._password_md5 = data[PASSWORD_MD5]
+    return user
+
+
+def password_md5(user) -> str:
+    """``get_md5_hash_password(user.password)`` without loading the password of a
+    cached user."""
+    cached = getattr(user, "_password_md5", None)
+    return cached if cached is not None else get_md5_hash_password(user.password)
+
+
+def get_user(user_id, load: Callable[[], UserProfile]) -> UserProfile:
+    """The cached user, or ``load()`` (then cached). Exceptions of ``load`` (e.g.
+    ``DoesNotExist``) propagate and nothing is cached."""
+    if not enabled():
+        return load()
+    version_key, key = _keys(user_id)
+    try:
+        version, raw = get_redis().mget(version_key, key)
+    except redis.RedisError as e:
+        logger.warning("User cache unavailable: %s", e)
+        return load()
+    version = int(version or 0)
+    if raw:
+        try:
+            user = _load(raw, version)
+        except Exception as e:  # model changed since it was cached
+            logger.info("Discarding cached user %s: %s", user_id, e)
+            user = None
+        if user is not None:
+            return user
+
+    user = load()
+    try:
+        get_redis().set(key, _dump(version, user), ex=ttl())
+    except redis.RedisError as e:
+        logger.warning("Could not cache user %s: %s", user_id, e)
+    return user
+
+
+def invalidate(user_id) -> None:
+    """Makes every worker reload the user on its next request."""
+    version_key, key = _keys(user_id)
+    try:
+        pipe = get_redis().pipeline()
+        pipe.incr(version_key)
+        # Outlives any entry stored under the previous versions
+        pipe.expire(version_key, ttl() * 2)
+        pipe.delete(key)
+        pipe.set(_changed_key(user_id), int(time.time()), ex=_marker_ttl())
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Could not invalidate cached user %s: %s", user_id, e)
+
+
+def revoke_token(jti, exp) -> None:
+    """Logout: the access token stops being accepted statelessly (until it expires)."""
+    ttl_left = int(exp - time.time())
+    if not jti or ttl_left <= 0:
+        return
+    try:
+        get_redis().set(_revoked_key(jti), 1, ex=ttl_left)
+    except redis.RedisError as e:
+        logger.warning("Could not revoke token %s: %s", jti, e)
+
+
+def token_markers(user_id, jti) -> Optional[Tuple[int, bool]]:
+    """``(changed_at, revoked)``: when the user last changed (0 if not recently) and
+    whether the token was revoked, or ``None`` when Redis cannot tell."""
+    try:
+        changed, revoked = get_redis().mget(_changed_key(user_id), _revoked_key(jti))
+    except redis.RedisError as e:
+        logger.warning("User cache unavailable: %s", e)
+        return None
+    return int(changed or 0), revoked is not None
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from authentication.models.kb import KBLink
+from authentication.models.projects import Projects, ProjectsAgentsThrough
+from authentication.models.user_profile import UserProfile
+from authentication.services import acl, user_cache
+
+
+def _invalidate_users(user_ids) -> None:
+    # After commit: a request reading the old row meanwhile must not re-cache it
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: [user_cache.invalidate(user_id) for user_id in user_ids])
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Profile updates, role and ``active`` changes, deletions."""
+    _invalidate_users([instance.pk])
+
+
+@receiver(m2m_changed, sender=UserProfile.groups.through)
+def invalidate_cached_user_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    """Roles added/removed as groups (``users/<id>/roles/add|remove/``)."""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            _invalidate_users([instance.pk])
+    elif action == "pre_clear":  # group.user_set.clear(): pk_set is not given
+        _invalidate_users(instance.user_set.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove") and pk_set:
+        _invalidate_users(pk_set)
+
+
+# ---- Access list (services/acl.py) ----
+
+
+def _sync_acl(user_ids) -> None:
+    # Users are resolved now (the memberships may be gone after commit, e.g. project
+    # deletion), their rows recomputed once the change is committed
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: acl.sync_users(user_ids))
+
+
+def _sync_acl_projects(project_ids) -> None:
+    _sync_acl(acl.project_user_ids(project_ids))
+
+
+@receiver(m2m_changed, sender=Projects.users.through)
+def sync_acl_project_users(sender, instance, action, reverse, pk_set, **kwargs):
+    """Users added to/removed from projects (either side of ``Projects.users``)."""
+    if action == "pre_clear":
+        if reverse:  # user.projects.clear()
+            _sync_acl([instance.pk])
+        else:  # project.users.clear()
+            _sync_acl_projects([instance.pk])
+    elif action in ("post_add", "post_remove") and pk_set:
+        _sync_acl([instance.pk] if reverse else pk_set)
+
+
+@receiver(m2m_changed, sender=ProjectsAgentsThrough)
+def sync_acl_project_agents(sender, instance, action, reverse, pk_set, **kwargs):
+    """Agents attached to/detached from projects (``project.agents.add/remove``)."""
+    if action == "pre_clear":
+        if reverse:  # agent.projects.clear()
+            _sync_acl_projects(instance.projects.values_list("pk", flat=True))
+        else:
+            _sync_acl_projects([instance.pk])
+    elif action in ("post_add", "post_remove") and pk_set:
+        _sync_acl_projects(pk_set if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=ProjectsAgentsThrough)
+@receiver(post_delete, sender=ProjectsAgentsThrough)
+@receiver(post_save, sender=KBLink)
+@receiver(post_delete, sender=KBLink)
+def sync_acl_project_link(sender, instance, **kwargs):
+    """KB links and agent rows created/deleted one by one (also by cascade)."""
+    _sync_acl_projects([instance.project_id])
+
+
+@receiver(pre_delete, sender=Projects)
+def sync_acl_project_delete(sender, instance, **kwargs):
+    """The project's memberships are deleted with it without ``m2m_changed``."""
+    _sync_acl_projects([instance.pk])
@@ -0,0 +1,108 @@
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+
+from authentication.debug_auth import CachedJWTAuthentication
+from authentication.models.roles import UserRole
+from authentication.services import user_cache
+
+
+def _uuid(value) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class ClaimsPrincipal:
+    """The authenticated user as stated by the claims of a verified access token
+    (``CUSTOM_CLAIMS``), without loading the ``UserProfile`` row.
+
+    Enough for ``IsAuthenticated``, ``is_admin_by_role`` and filtering by ``user_id``;
+    anything else (relations, saving) needs the row: ``UserProfile.objects.get(pk=...)``.
+    """
+
+    id: uuid.UUID
+    email: str = ""
+    username: str = ""
+    role: str = UserRole.USER.value
+    client_id: Optional[uuid.UUID] = None
+    is_superuser: bool = False
+    is_staff: bool = False
+    is_active: bool = True
+    claims_at: int = 0
+
+    is_authenticated = True
+    is_anonymous = False
+
+    @property
+    def pk(self) -> uuid.UUID:
+        return self.id
+
+    @classmethod
+    def from_token(cls, token) -> "ClaimsPrincipal":
+        user_id = _uuid(token.get(jwt_api_settings.USER_ID_CLAIM))
+        if user_id is None:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        return cls(
+            id=user_id,
+            email=token.get("email") or "",
+            username=token.get("username") or "",
+            role=token.get("role") or UserRole.USER.value,
+            client_id=_uuid(token.get("client_id")),
+            is_superuser=bool(token.get("is_superuser")),
+            is_staff=bool(token.get("is_staff")),
+            is_active=token.get("is_active") is not False,
+            claims_at=int(token.get("claims_at") or 0),
+        )
+
+
+class StatelessJWTAuthentication(CachedJWTAuthentication):
+    """Opt-in JWT authentication that trusts the token claims instead of the user row.
+
+    Per request it only reads two markers from Redis (``user_cache.token_markers``):
+
+    * token revoked by a logout: rejected;
+    * changed (profile, role, ``active``) after that, claims older than the markers
+      (``claims_max_age``) or without ``claims_at`` (tokens issued before this class
+      existed), Redis unavailable: the user row is loaded as usual
+      (``CachedJWTAuthentication``), so stale claims are never trusted;
+    * otherwise: a ``ClaimsPrincipal``, without touching the database.
+    """
+
+    def get_user(self, validated_token):
+        principal = ClaimsPrincipal.from_token(validated_token)
+        age = time.time() - principal.claims_at
+        fresh = principal.claims_at and age <= user_cache.claims_max_age()
+        jti = validated_token.get(jwt_api_settings.JTI_CLAIM)
+        markers = user_cache.token_markers(principal.id, jti) if fresh else None
+        if markers is None:
+            return super().get_user(validated_token)
+        changed_at, revoked = markers
+        if revoked:
+            raise exceptions.AuthenticationFailed("Sessão encerrada.", code="token_revoked")
+        if changed_at and principal.claims_at <= changed_at:
+            return super().get_user(validated_token)
+        if jwt_api_settings.CHECK_USER_IS_ACTIVE and not principal.is_active:
+            raise exceptions.AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return principal
+
+
+class StatelessListMixin:
+    """Authenticates the ``stateless_actions`` of a viewset with
+    ``StatelessJWTAuthentication``; their code must only use the principal's claims."""
+
+    stateless_actions = ("list",)
+
+    def get_authenticators(self):
+        action = getattr(self, "action_map", {}).get(self.request.method.lower())
+        if action in self.stateless_actions:
+            return [StatelessJWTAuthentication()]
+        return super().get_authenticators()
@@ -0,0 +1,54 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin
+from rest_framework_simplejwt.tokens import RefreshToken as SimpleRefreshToken
+
+from authentication.services import token_store
+
+
+class RefreshToken(SimpleRefreshToken):
+    """simplejwt's ``RefreshToken`` with its outstanding/blacklist state kept in the
+    configured ``token_store`` (Redis by default) instead of the SQL tables."""
+
+    def __init__(self, token=None, verify: bool = True, check_blacklist: bool = True) -> None:
+        self._check_blacklist = check_blacklist
+        super().__init__(token, verify)
+
+    def verify(self, *args, **kwargs) -> None:
+        if self._check_blacklist:
+            self.check_blacklist()
+        super(BlacklistMixin, self).verify(*args, **kwargs)
+
+    def _state(self):
+        return (
+            self.payload[jwt_api_settings.JTI_CLAIM],
+            self.payload.get(jwt_api_settings.USER_ID_CLAIM),
+            self.payload["exp"],
+        )
+
+    def check_blacklist(self) -> None:
+        if token_store.get_store().is_blacklisted(self.payload[jwt_api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self) -> None:
+        """Blacklists the token; ``TokenError`` if it already was."""
+        if not token_store.get_store().blacklist(*self._state(), token=str(self)):
+            raise TokenError(_("Token is blacklisted"))
+
+    def outstand(self) -> None:
+        token_store.get_store().outstand(*self._state(), token=str(self))
+
+    @classmethod
+    def for_user(cls, user) -> "RefreshToken":
+        token = super(BlacklistMixin, cls).for_user(user)  # skips the OutstandingToken row
+        token.outstand()
+        return token
+
+    @classmethod
+    def consume(cls, raw: str) -> "RefreshToken":
+        """Validates the token and blacklists it in the same store operation (rotation,
+        logout): a refresh token can only be used once."""
+        token = cls(raw, check_blacklist=False)
+        token.blacklist()
+        return token
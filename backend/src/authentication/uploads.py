@@ -0,0 +1,76 @@
+"""Bounded-memory handling of KB file uploads.
+
+``StreamingMultiPartParser`` replaces DRF's ``MultiPartParser`` on the KB upload views:
+every file part is written straight to a temporary file in ``KB_UPLOAD_CHUNK_SIZE``
+chunks (never kept in memory, whatever its size) and the upload is aborted with
+``413`` as soon as it grows past ``KB_UPLOAD_MAX_BYTES``. Files are hashed (SHA-256)
+while being written so deduplication does not need a second pass.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import MultiPartParser
+
+
+def max_upload_bytes() -> int:
+    return int(getattr(settings, "KB_UPLOAD_MAX_BYTES", 256 * 1024 * 1024))
+
+
+def max_batch_bytes() -> int:
+    """Largest whole request accepted by ``kb/files/batch-add`` (all files together)."""
+    return int(getattr(settings, "KB_BATCH_MAX_BYTES", 1024 * 1024 * 1024))
+
+
+def upload_chunk_size() -> int:
+    return int(getattr(settings, "KB_UPLOAD_CHUNK_SIZE", 64 * 1024))
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_code = "upload_too_large"
+
+    def __init__(self, max_bytes=None):
+        max_bytes = max_bytes or max_upload_bytes()
+        super().__init__(f"Arquivo excede o tamanho máximo permitido ({max_bytes} bytes).")
+
+
+class BoundedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """Streams each uploaded file to disk and refuses files above ``KB_UPLOAD_MAX_BYTES``.
+
+    The SHA-256 of the content is computed on the way and exposed as ``file.sha256``.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = upload_chunk_size()
+        self.max_bytes = max_upload_bytes()
+        self.received = 0
+
+    def new_file(self, *args, **kwargs):
+        self.received = 0
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            self.file.close()
+            raise UploadTooLarge(self.max_bytes)
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        uploaded.sha256 = self.sha256.hexdigest()
+        return uploaded
+
+
+class StreamingMultiPartParser(MultiPartParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context["request"]
+        request.upload_handlers = [BoundedTemporaryFileUploadHandler(request)]
+        return super().parse(stream, media_type, parser_context)
@@ -2,6 +2,7 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenVerifyView
 
+from authentication.views.agent_chat import AgentChatStreamView
 from authentication.views.authentication import (
     AddUserRoleView,
     CustomTokenBlacklistView,
@@ -26,19 +27,24 @@ from authentication.views.expertise_area import ExpertiseAreaViewSet
 from authentication.views.get_guest_token import GetGuestTokenView
 from authentication.views.google_auth import GoogleAuthView
 from authentication.views.health_db import db_health
+from authentication.views.health_n8n import n8n_health
 from authentication.views.invite import ConfirmInviteView, InviteUserView
 from authentication.views.kb import KBGetProxyView
 from authentication.views.kb_create import KBCreateProxyView
 from authentication.views.kb_delete import KBDeleteProxyView
 from authentication.views.kb_edit import KBEditProxyView
 from authentication.views.kb_file_add import KBFileAddProxyView
+from authentication.views.kb_file_batch_add import KBFileBatchAddProxyView
 from authentication.views.kb_file_delete import KBFileDeleteProxyView
+from authentication.views.kb_job import KBJobStatusView
 from authentication.views.kb_link import KBLinkAttachView
 from authentication.views.kb_list import KBFileListProxyView
 from authentication.views.kb_list_all import KBListAllProxyView
+from authentication.views.kb_retrieve import KBRetrieveView
 from authentication.views.kb_update import KBFileUpdateProxyView
 from authentication.views.login_as import LoginAsView
 from authentication.views.project import ProjectViewSet
+from authentication.views.project_kb_search import ProjectKBSearchView
 from authentication.views.roles import RolesListView
 from authentication.views.translation import TranslateBatchView, TranslateLookupView
 from authentication.views.user import UserViewSet
@@ -59,9 +65,6 @@ bot_router.register(r"bots", BotViewSet, basename="bot")
 chat_session_router = DefaultRouter()
 chat_session_router.register(r"", ChatSessionView, basename="chat_session")
 
-search_router = DefaultRouter()
-search_router.register(r"", SearchView, basename="search")
-
 expertise_router = DefaultRouter()
 expertise_router.register(r"expertise-areas", ExpertiseAreaViewSet, basename="expertise-area")
 
@@ -87,10 +90,16 @@ urlpatterns = [
     path("users/<uuid:user_id>/roles/add/", AddUserRoleView.as_view()),
     path("users/<uuid:user_id>/roles/remove/", RemoveUserRoleView.as_view()),
     path("clients/", include(client_router.urls)),
+    path(
+        "projects/<uuid:project_id>/kb/search/",
+        ProjectKBSearchView.as_view(),
+        name="project_kb_search",
+    ),
     path("projects/", include(project_router.urls)),
     path("boards/", include(board_router.urls)),
     path("chat-session/", include(chat_session_router.urls)),
-    path("search/", include(search_router.urls)),
+    path("search/", SearchView.as_view(), name="search"),
+    path("agents/<uuid:agent_id>/chat/", AgentChatStreamView.as_view(), name="agent_chat"),
     path("", include(bot_router.urls)),
     path("", include(expertise_router.urls)),
     path("", include(chat_favorites_router.urls)),
@@ -99,12 +108,15 @@ urlpatterns = [
     path("kb/files/list/", KBFileListProxyView.as_view(), name="kb_file_list"),
     path("kb/create/", KBCreateProxyView.as_view(), name="kb_create"),
     path("kb/file/add/", KBFileAddProxyView.as_view(), name="kb_file_add"),
+    path("kb/files/batch-add/", KBFileBatchAddProxyView.as_view(), name="kb_files_batch_add"),
+    path("kb/jobs/<uuid:job_id>/", KBJobStatusView.as_view(), name="kb_job_status"),
     path("kb/edit/", KBEditProxyView.as_view(), name="kb_edit"),
     path("kb/delete/", KBDeleteProxyView.as_view(), name="kb_delete"),
     path("kb/file/delete/", KBFileDeleteProxyView.as_view(), name="kb_file_delete"),
     path("kb/list-all/", KBListAllProxyView.as_view(), name="kb_list_all"),
     path("kb/file/update/", KBFileUpdateProxyView.as_view(), name="kb_file_update"),
     path("kb/attach/", KBLinkAttachView.as_view(), name="kb_attach"),
+    path("kb/retrieve/", KBRetrieveView.as_view(), name="kb_retrieve"),
     path("i18n/translate/", TranslateLookupView.as_view(), name="i18n_translate"),
     path("i18n/translate/batch/", TranslateBatchView.as_view(), name="i18n_translate_batch"),
     path(
@@ -113,6 +125,7 @@ urlpatterns = [
         name="get-guest-token",
     ),
     path("health/db/", db_health, name="health_db"),
+    path("health/n8n/", n8n_health, name="health_n8n"),
     # Development-only debug endpoints
     path("debug/token/", debug_token, name="debug_token"),
     path("debug/check-token/", debug_check_token, name="debug_check_token"),
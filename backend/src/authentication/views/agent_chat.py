@@ -0,0 +1,119 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+
+from authentication.models.agents import Agents
+from authentication.models.chat_sessions import ChatSession
+from authentication.permissions import assert_user_agent_access
+from authentication.serializers.agent_chat_serializer import AgentChatSerializer
+from authentication.services import answer_cache, chat_proxy, n8n_client, n8n_guard
+from authentication.views.async_api import AsyncAPIView
+
+
+class AgentChatStreamView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    http_method_names = ["post"]
+
+    @swagger_auto_schema(
+        tags=["agents"],
+        operation_id="agent_chat_stream",
+        summary="Conversa com o agente (proxy n8n, SSE)",
+        description=(
+            "Envia `message` ao webhook de chat do agente (`url_n8n`) na sessão `session_id` "
+            "(uma ChatSession do usuário; se ausente, uma nova é criada) e devolve a resposta como Server-Sent Events: `start` "
+            "`{session_id}`, `token` `{content}` (um por trecho recebido do n8n), e por fim "
+            "`end` `{session_id, output}` ou `error` `{detail, status}`. Cada usuário pode "
+            "manter até `CHAT_STREAM_MAX_PER_USER` conversas em andamento; acima disso "
+            "responde `429` com `Retry-After`. A primeira pergunta de uma sessão pode ser "
+            "respondida do cache de respostas do agente (mesma pergunta, ou uma parecida, "
+            "desde a última alteração dos KBs do agente); nesse caso `end` traz `cached` "
+            "(`exact` ou `semantic`). Envie `cache: false` para sempre consultar o agente."
+        ),
+        request_body=AgentChatSerializer,
+        produces=["text/event-stream"],
+        responses={
+            200: openapi.Response("Fluxo SSE"),
+            403: openapi.Response("Sem acesso ao agente ou sessão de outro usuário"),
+            404: openapi.Response("Agente não encontrado"),
+            429: openapi.Response("Conversas simultâneas demais / serviço ocupado"),
+            503: openapi.Response("Serviço externo indisponível"),
+        },
+    )
+    async def post(self, request, agent_id, *args, **kwargs):
+        ser = AgentChatSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+
+        agent = await sync_to_async(get_object_or_404)(Agents, id=agent_id)
+        await sync_to_async(assert_user_agent_access)(
+            request.user, agent
+        )  # may raise PermissionDenied
+
+        message = ser.validated_data["message"]
+        metadata = ser.validated_data.get("metadata")
+        session_id = ser.validated_data.get("session_id")
+        # The n8n chat memory of a session is written below: only the owner's sessions
+        if (
+            session_id
+            and not await ChatSession.objects.filter(
+                user_id=request.user.id, session_key=session_id
+            ).aexists()
+        ):
+            raise PermissionDenied("Sessão de chat não encontrada para este usuário.")
+        lookup = None
+        # Only questions opening a session stand on their own; custom metadata may
+        # change what the workflow answers
+        if answer_cache.enabled() and ser.validated_data["cache"] and not metadata:
+            if not session_id or await sync_to_async(answer_cache.is_new_session)(session_id):
+                lookup = await answer_cache.lookup(agent.id, message)
+        if not session_id:
+            session_id = str(uuid.uuid4())
+            await ChatSession.objects.acreate(
+                session_key=session_id, agent=agent, user_id=request.user.id
+            )
+
+        if lookup is not None and lookup.hit:
+            await sync_to_async(answer_cache.remember)(session_id, message, lookup.answer)
+            await answer_cache.mark_session(session_id)
+            return self._stream(chat_proxy.replay(session_id, lookup.answer, lookup.tier))
+
+        # Fail before streaming when n8n is known to be down or saturated
+        n8n_guard.check(n8n_client.guard_key(agent.url_n8n))
+
+        user_id = request.user.id
+        token = await chat_proxy.acquire_slot(user_id)
+        if token is None:
+            raise chat_proxy.TooManyStreams()
+        await answer_cache.mark_session(session_id)
+
+        body = chat_proxy.payload(session_id, message, agent.id, metadata)
+
+        async def release():
+            await chat_proxy.release_slot(user_id, token)
+
+        on_answer = None
+        if lookup is not None:
+
+            async def store_answer(output):
+                await sync_to_async(answer_cache.store)(agent.id, lookup, message, output)
+
+            on_answer = store_answer
+
+        return self._stream(
+            chat_proxy.relay(
+                agent.url_n8n, body, session_id, on_close=release, on_answer=on_answer
+            )
+        )
+
+    @staticmethod
+    def _stream(frames) -> StreamingHttpResponse:
+        response = StreamingHttpResponse(frames, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Tells nginx/traefik-style proxies not to buffer the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,49 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+def _is_multipart(request) -> bool:
+    return (request.content_type or "").lower().startswith("multipart/")
+
+
+class AsyncAPIView(APIView):
+    """APIView whose handlers are ``async def`` coroutines.
+
+    Django marks the view as async when every handler is a coroutine, so when served
+    through ``asgi.py`` the request never holds a worker thread while waiting on upstream
+    calls. Authentication, permission and throttling checks (``initial``) may hit the
+    database, so they still run through ``sync_to_async``, and so does parsing a
+    multipart body (uploads of up to ``KB_UPLOAD_MAX_BYTES``), before the handler first
+    reads ``request.data``. Exception handling and response finalisation are the
+    regular DRF ones.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if _is_multipart(request):
+                # Uploads are hashed and spooled to disk while parsing: not on the loop
+                await sync_to_async(lambda: request.data, thread_sensitive=False)()
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
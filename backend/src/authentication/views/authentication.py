@@ -1,6 +1,7 @@
 import logging
 import os
 import subprocess
+import time
 from datetime import date, datetime
 from uuid import UUID
 
@@ -19,17 +20,22 @@ from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.settings import api_settings as jwt_api_settings
-from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.tokens import AccessToken
 
-from authentication.debug_auth import DebugJWTAuthentication, FlexibleJWTAuthentication
+from authentication.debug_auth import (
+    CachedJWTAuthentication,
+    DebugJWTAuthentication,
+    FlexibleJWTAuthentication,
+)
 from authentication.models import UserProfile
 from authentication.serializers.login_serializer import LoginSerializer
 from authentication.serializers.user_profile import UserProfileSerializer
 from authentication.serializers.user_profile_create_serializer import UserProfileCreateSerializer
 from authentication.serializers.user_profile_update_serializer import UserProfileUpdateSerializer
+from authentication.services import user_cache
+from authentication.tokens import RefreshToken
 from core import settings
 
 logger = logging.getLogger(__name__)
@@ -50,6 +56,8 @@ CUSTOM_CLAIMS = (
     "joined_at",
     "is_superuser",
     "is_staff",
+    "client_id",
+    "claims_at",  # when the claims were read from the user row (stateless auth)
 )
 
 
@@ -76,6 +84,8 @@ def enrich_refresh_claims(refresh: RefreshToken, user) -> RefreshToken:
     for field in CUSTOM_CLAIMS:
         if field == "id":
             val = str(getattr(user, "id", None))
+        elif field == "claims_at":
+            val = int(time.time())
         elif field == "avatar":
             f = getattr(user, "avatar", None)
             val = _to_claim(f)
@@ -118,6 +128,8 @@ def make_stateless_refresh_for_user(user) -> RefreshToken:
     for field in CUSTOM_CLAIMS:
         if field == "id":
             val = str(getattr(user, "id", None))
+        elif field == "claims_at":
+            val = int(time.time())
         elif field == "avatar":
             f = getattr(user, "avatar", None)
             val = _to_claim(f)
@@ -158,6 +170,8 @@ def make_stateless_refresh_for_user(user) -> RefreshToken:
     for field in CUSTOM_CLAIMS:
         if field == "id":
             val = str(getattr(user, "id", None))
+        elif field == "claims_at":
+            val = int(time.time())
         elif field == "avatar":
             f = getattr(user, "avatar", None)
             val = _to_claim(f)
@@ -482,8 +496,15 @@ class CustomTokenRefreshView(APIView):
                 {"detail": "Field 'refresh' is required."}, status=status.HTTP_400_BAD_REQUEST
             )
 
+        # Rotation blacklists the old token in the same store operation that checks it
         try:
-            old_refresh = RefreshToken(refresh_str)
+            if (
+                jwt_api_settings.ROTATE_REFRESH_TOKENS
+                and jwt_api_settings.BLACKLIST_AFTER_ROTATION
+            ):
+                old_refresh = RefreshToken.consume(refresh_str)
+            else:
+                old_refresh = RefreshToken(refresh_str)
         except TokenError as e:
             return Response(
                 {"detail": "Invalid refresh token.", "error": str(e)},
@@ -498,36 +519,6 @@ class CustomTokenRefreshView(APIView):
 
         payload = {"access": str(access)}
 
-        if jwt_api_settings.ROTATE_REFRESH_TOKENS:
-            if jwt_api_settings.BLACKLIST_AFTER_ROTATION:
-                # Defensive: ensure the refresh token contains the configured user id claim
-                user_id_claim = jwt_api_settings.USER_ID_CLAIM
-                has_user_claim = user_id_claim in getattr(old_refresh, "payload", {})
-
-                if not has_user_claim:
-                    logger.warning(
-                        "Old refresh token missing '%s' claim; skipping blacklist to avoid DB IntegrityError.",
-                        user_id_claim,
-                    )
-                else:
-                    try:
-                        old_refresh.blacklist()
-                    except AttributeError:
-                        logger.warning(
-                            "Token blacklist not enabled; could not blacklist the refresh token."
-                        )
-                    except TokenError:
-                        # propagate TokenError (invalid token) as before
-                        raise
-                    except IntegrityError as e:
-                        # Specific DB integrity error observed in production (user_id NULL)
-                        logger.exception("IntegrityError while blacklisting refresh token: %s", e)
-                    except Exception:
-                        # Log unexpected errors but do not fail the refresh operation
-                        logger.exception(
-                            "Unexpected error while blacklisting refresh token; continuing."
-                        )
-
         new_refresh = make_refresh_from_payload(old_refresh)
         payload["refresh"] = str(new_refresh)
 
@@ -559,21 +550,42 @@ class CustomTokenBlacklistView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         try:
-            token = RefreshToken(refresh_str)
-            token.blacklist()
+            token = RefreshToken.consume(refresh_str)
         except TokenError:
             return Response(
                 {"error": "Token inválido ou já invalidado."}, status=status.HTTP_400_BAD_REQUEST
             )
+        user_id = token.get(jwt_api_settings.USER_ID_CLAIM)
+        if user_id:
+            user_cache.invalidate(user_id)
+        self._revoke_access_token(request)
 
         resp = Response({"detail": "Logout realizado."}, status=status.HTTP_200_OK)
         resp.delete_cookie("access", samesite="Lax")
         resp.delete_cookie("refresh", samesite="Lax")
         return resp
 
+    @staticmethod
+    def _revoke_access_token(request):
+        # The access token of the session, if sent, stops working on stateless endpoints
+        authenticator = CachedJWTAuthentication()
+        header = authenticator.get_header(request)
+        raw = authenticator.get_raw_token(header) if header else None
+        if raw is None:
+            return
+        try:
+            access = AccessToken(raw)
+        except TokenError:
+            return
+        user_cache.revoke_token(access.get(jwt_api_settings.JTI_CLAIM), access.get("exp", 0))
+
 
 class MeView(APIView):
-    authentication_classes = [FlexibleJWTAuthentication, JWTAuthentication, DebugJWTAuthentication]
+    authentication_classes = [
+        FlexibleJWTAuthentication,
+        CachedJWTAuthentication,
+        DebugJWTAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
@@ -1,24 +1,25 @@
-from django.contrib.auth import get_user_model
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from authentication.debug_auth import CachedJWTAuthentication
 from authentication.models.boards import Boards
 from authentication.models.clients import Clients
 from authentication.models.projects import Projects
+from authentication.permissions import access_context
 from authentication.serializers.board_serializer import BoardSerializer
 from authentication.serializers.board_update_serializer import BoardUpdateSerializer
 from authentication.serializers.user_profile import UserProfileSerializer
+from authentication.stateless_auth import StatelessListMixin
 
 
-class BoardViewSet(viewsets.ModelViewSet):
+class BoardViewSet(StatelessListMixin, viewsets.ModelViewSet):
     serializer_class = BoardSerializer
     queryset = Boards.objects.all()
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     http_method_names = ["get", "put"]
 
     @swagger_auto_schema(
@@ -31,24 +32,8 @@ class BoardViewSet(viewsets.ModelViewSet):
         tags=["Boards"],
     )
     def list(self, request, *args, **kwargs):
-
-        User = get_user_model()
-        try:
-            user = User.objects.get(id=request.user.id)
-        except Exception as e:
-            print(e)
-            return Response(
-                {"status": "Error: User not found", "detail": e},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
-
-        # User of permission level "admin" can access all boards
-        user_role = user.role
-
-        # Else user can only access the boards belonging to their client and projects
-        user_client = user.client_id
-        projects = [p.id for p in user.projects.all()]
-        queryset = Boards.objects.filter(project_id__in=projects)
+        # Boards of the user's projects (request.user may be a ClaimsPrincipal)
+        queryset = Boards.objects.filter(project_id__in=access_context(request.user).project_ids)
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
@@ -6,13 +6,18 @@ from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from datetime import datetime
 
+from authentication.debug_auth import CachedJWTAuthentication
 from authentication.models.agents import Agents
 from authentication.models.chat_sessions import ChatSession
-from authentication.permissions import IsAdminByRole, IsAdminOrRelatedToBot, is_admin_by_role
+from authentication.permissions import (
+    IsAdminByRole,
+    IsAdminOrRelatedToBot,
+    access_context,
+    is_admin_by_role,
+)
 from authentication.serializers.bot_serializer import BotN8nSerializer
 from authentication.serializers.bot_update_serializer import (
     BotExpertiseOnlySerializer,
@@ -23,7 +28,7 @@ from authentication.serializers.default_pagination import DefaultPagination
 from pprint import pprint
 
 class BotViewSet(viewsets.ModelViewSet):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     queryset = Agents.objects.all().order_by("name")
@@ -57,7 +62,7 @@ class BotViewSet(viewsets.ModelViewSet):
         if is_admin_by_role(user):
             return qs
 
-        return qs.filter(projects__users__id=user.id).distinct()
+        return qs.filter(id__in=access_context(user).agent_ids)
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -4,24 +4,24 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from authentication.debug_auth import CachedJWTAuthentication
 from authentication.models.agents import Agents
 from authentication.models.chat_favorites import ChatFavorite
 from authentication.models.chat_sessions import ChatSession
 from authentication.serializers.chat_favorites_serializer import ChatFavoriteSerializer
+from authentication.stateless_auth import StatelessListMixin
 
 
-class ChatFavoriteViewSet(viewsets.ModelViewSet):
+class ChatFavoriteViewSet(StatelessListMixin, viewsets.ModelViewSet):
     serializer_class = ChatFavoriteSerializer
     queryset = ChatFavorite.objects.all()
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     http_method_names = ["get", "post", "delete"]
 
     def get_queryset(self):
-        user = self.request.user
-        qs = ChatFavorite.objects.filter(user=user)
+        qs = ChatFavorite.objects.filter(user_id=self.request.user.id)
 
         agent_id = self.request.query_params.get("agent_id")
         session_key = self.request.query_params.get("session_key")
@@ -40,7 +40,7 @@ class ChatFavoriteViewSet(viewsets.ModelViewSet):
     )
     def list(self, request, *args, **kwargs):
         qs = self.get_queryset()
-        chat_sessions = ChatSession.objects.filter(user=request.user)
+        chat_sessions = ChatSession.objects.filter(user_id=request.user.id)
         chat_sessions_dict = {cs.id: str(cs.session_key) for cs in chat_sessions}
 
         return_data = [{
@@ -5,18 +5,19 @@ from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from authentication.debug_auth import CachedJWTAuthentication
 from authentication.models.agents import Agents
 from authentication.models.chat_sessions import ChatSession
 from authentication.serializers.chat_sessions_serializer import ChatSessionSerializer
+from authentication.stateless_auth import StatelessListMixin
 
 
-class ChatSessionView(viewsets.ModelViewSet):
+class ChatSessionView(StatelessListMixin, viewsets.ModelViewSet):
     serializer_class = ChatSessionSerializer
     queryset = ChatSession.objects.all()
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     http_method_names = ["get", "post", "delete"]
 
     @swagger_auto_schema(
@@ -30,9 +31,8 @@ class ChatSessionView(viewsets.ModelViewSet):
         tags=["Chat_Sessions"],
     )
     def list(self, request, *args, **kwargs):
-        user = request.user
         # Get last 6 sessions of the user, newest first
-        qs = ChatSession.objects.filter(user=user).order_by("-created_at")[:6]
+        qs = ChatSession.objects.filter(user_id=request.user.id).order_by("-created_at")[:6]
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
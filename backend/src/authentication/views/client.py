@@ -6,8 +6,8 @@ from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from authentication.debug_auth import CachedJWTAuthentication
 from authentication.models.clients import Clients
 from authentication.serializers.client_serializer import ClientSerializer
 
@@ -15,7 +15,7 @@ from authentication.serializers.client_serializer import ClientSerializer
 class ClientViewSet(viewsets.ModelViewSet):
     serializer_class = ClientSerializer
     queryset = Clients.objects.all().order_by("name")
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     http_method_names = ["get", "post", "patch", "delete"]
 
@@ -7,7 +7,8 @@ from google.oauth2 import id_token
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.tokens import RefreshToken
 
 User = get_user_model()
 
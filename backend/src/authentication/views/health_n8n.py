@@ -0,0 +1,34 @@
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from authentication.permissions import is_admin_by_role
+from authentication.services import n8n_guard
+
+
+@swagger_auto_schema(
+    method="get",
+    operation_summary="n8n circuit breakers",
+    operation_description=(
+        "`status` and the number of breakers not closed (`open`), as seen by the worker "
+        "process that answers. Administrators also get each webhook's breaker "
+        "(closed/open/half_open), in-flight calls and rejection counters; "
+        "`rejected_total` sums the rejections of every worker (Redis)."
+    ),
+    responses={
+        200: openapi.Response(description="No breaker open"),
+        503: openapi.Response(description="At least one breaker open"),
+    },
+)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def n8n_health(request):
+    snapshot = n8n_guard.snapshot()
+    not_closed = sum(b["state"] != n8n_guard.CLOSED for b in snapshot["breakers"])
+    body = {"status": "degraded" if not_closed else "ok", "open": not_closed}
+    # The breakers are keyed by webhook path, which must not leak to anonymous callers
+    if is_admin_by_role(request.user):
+        body.update(snapshot)
+    return Response(body, status=503 if not_closed else 200)
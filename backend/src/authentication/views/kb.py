@@ -1,19 +1,21 @@
 from typing import Any, Dict
 
-import requests
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
 from authentication.permissions import assert_user_kb_access
 from authentication.serializers.kg_get_serializer import KBGetQuerySerializer
+from authentication.services import n8n_coalesce
+from authentication.views.async_api import AsyncAPIView
 
 
-class KBGetProxyView(APIView):
+class KBGetProxyView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
     target_path = "/webhook/kb/get/"
 
@@ -36,7 +38,7 @@ class KBGetProxyView(APIView):
             )
         },
     )
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         ser = KBGetQuerySerializer(data=request.query_params)
         has_query = ser.is_valid()
 
@@ -58,17 +60,17 @@ class KBGetProxyView(APIView):
             )
 
         # Enforce tenant isolation for the KB
-        assert_user_kb_access(request.user, payload["hash_id"])  # may raise PermissionDenied
+        await sync_to_async(assert_user_kb_access)(
+            request.user, payload["hash_id"]
+        )  # may raise PermissionDenied
 
-        url = f"{settings.N8N_BASE_URL}{self.target_path}"
-        timeout = int(getattr(settings, "N8N_TIMEOUT", 10))
         try:
-            upstream = requests.get(
-                url, headers=self._build_headers(), json=payload, timeout=timeout
+            upstream = await n8n_coalesce.aget(
+                self.target_path, headers=self._build_headers(), json=payload
             )
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return Response({"detail": "Timeout."}, status=status.HTTP_504_GATEWAY_TIMEOUT)
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             return Response(
                 {"detail": f"Error calling external service: {str(e)}"},
                 status=status.HTTP_502_BAD_GATEWAY,
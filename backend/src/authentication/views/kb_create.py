@@ -1,21 +1,23 @@
 from typing import Any, Dict
 
-import requests
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
 from authentication.models.kb import KBLink
 from authentication.models.projects import Projects
 from authentication.permissions import assert_user_project_access
 from authentication.serializers.kb_create_serializer import KBCreateSerializer
+from authentication.services import kb_catalog, n8n_client
+from authentication.views.async_api import AsyncAPIView
 
 
-class KBCreateProxyView(APIView):
+class KBCreateProxyView(AsyncAPIView):
     """
     Proxy para o n8n: POST /webhook/kb/create/
     Envia name + description no body JSON.
@@ -44,15 +46,15 @@ class KBCreateProxyView(APIView):
             )
         },
     )
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         ser = KBCreateSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
 
         try:
-            project = Projects.objects.get(pk=ser.validated_data["project_id"])
+            project = await Projects.objects.aget(pk=ser.validated_data["project_id"])
         except Projects.DoesNotExist:
             return Response({"detail": "Projeto não encontrado."}, status=404)
-        assert_user_project_access(request.user, project)
+        await sync_to_async(assert_user_project_access)(request.user, project)
 
         payload_n8n = {
             "name": ser.validated_data["name"],
@@ -64,15 +66,14 @@ class KBCreateProxyView(APIView):
                 {"detail": "Configuração do N8N ausente (N8N_BASE_URL/N8N_KB_KEY)."}, status=500
             )
 
-        url = f"{settings.N8N_BASE_URL}{self.target_path}"
         try:
-            upstream = requests.post(
-                url, headers=self._build_headers(), json=payload_n8n, timeout=10
+            upstream = await n8n_client.apost(
+                self.target_path, headers=self._build_headers(), json=payload_n8n
             )
             data = upstream.json()
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return Response({"detail": "Timeout ao chamar serviço externo."}, status=504)
-        except (requests.RequestException, ValueError) as e:
+        except (httpx.HTTPError, ValueError) as e:
             return Response({"detail": f"Erro ao chamar serviço externo: {e}"}, status=502)
 
         ext_id = (
@@ -84,11 +85,18 @@ class KBCreateProxyView(APIView):
         if not ext_id:
             return Response({"detail": "Resposta do n8n sem identificador do KB."}, status=502)
 
-        KBLink.objects.get_or_create(
+        await KBLink.objects.aget_or_create(
             project_id=project.id,
             external_id=ext_id,
             defaults={"name": payload_n8n["name"]},
         )
+        await sync_to_async(kb_catalog.upsert)(
+            ext_id,
+            name=payload_n8n["name"],
+            description=payload_n8n["description"],
+            data=data,
+        )
+        await sync_to_async(kb_catalog.invalidate_reads)(ext_id)
 
         return Response(
             {"project_id": str(project.id), **data},
@@ -1,19 +1,21 @@
 from typing import Any, Dict
 
-import requests
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
 from authentication.permissions import assert_user_kb_access
 from authentication.serializers.kb_delete_serializer import KBDeleteSerializer
+from authentication.services import kb_catalog, kb_documents, n8n_client
+from authentication.views.async_api import AsyncAPIView
 
 
-class KBDeleteProxyView(APIView):
+class KBDeleteProxyView(AsyncAPIView):
     """
     Proxy para o n8n: DELETE /webhook/kb/delete/
     Envia JSON com hash_id. (Aceita fallback por query ?hash_id=... para conveniência.)
@@ -42,7 +44,7 @@ class KBDeleteProxyView(APIView):
             )
         },
     )
-    def delete(self, request, *args, **kwargs):
+    async def delete(self, request, *args, **kwargs):
         payload: Dict[str, Any] = {}
         if isinstance(request.data, dict) and request.data:
             ser = KBDeleteSerializer(data=request.data)
@@ -57,7 +59,9 @@ class KBDeleteProxyView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        assert_user_kb_access(request.user, payload["hash_id"])  # may raise PermissionDenied
+        await sync_to_async(assert_user_kb_access)(
+            request.user, payload["hash_id"]
+        )  # may raise PermissionDenied
 
         if not settings.N8N_BASE_URL or not settings.N8N_KB_KEY:
             return Response(
@@ -65,26 +69,28 @@ class KBDeleteProxyView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        url = f"{settings.N8N_BASE_URL}{self.target_path}"
-        timeout = int(getattr(settings, "N8N_TIMEOUT", 10))
         try:
-            upstream = requests.delete(
-                url,
+            upstream = await n8n_client.adelete(
+                self.target_path,
                 headers=self._build_headers(),
                 json=payload,
-                timeout=timeout,
             )
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return Response(
                 {"detail": "Timeout ao chamar serviço externo."},
                 status=status.HTTP_504_GATEWAY_TIMEOUT,
             )
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             return Response(
                 {"detail": f"Erro ao chamar serviço externo: {str(e)}"},
                 status=status.HTTP_502_BAD_GATEWAY,
             )
 
+        if upstream.status_code < 300:
+            await sync_to_async(kb_documents.forget_kb)(payload["hash_id"])
+            await sync_to_async(kb_catalog.mark_deleted)(payload["hash_id"])
+            await sync_to_async(kb_catalog.invalidate_reads)(payload["hash_id"])
+
         try:
             return Response(upstream.json(), status=upstream.status_code)
         except ValueError:
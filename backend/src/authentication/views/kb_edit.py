@@ -1,19 +1,21 @@
 from typing import Any, Dict
 
-import requests
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
 from authentication.permissions import assert_user_kb_access
 from authentication.serializers.kb_edit_serializer import KBEditSerializer
+from authentication.services import kb_catalog, n8n_client
+from authentication.views.async_api import AsyncAPIView
 
 
-class KBEditProxyView(APIView):
+class KBEditProxyView(AsyncAPIView):
     """
     Proxy para o n8n: PATCH /webhook/kb/edit/
     Aceita JSON com hash_id (obrigatório) e name/description (opcionais).
@@ -42,12 +44,14 @@ class KBEditProxyView(APIView):
             )
         },
     )
-    def patch(self, request, *args, **kwargs):
+    async def patch(self, request, *args, **kwargs):
         ser = KBEditSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         payload: Dict[str, Any] = ser.validated_data
 
-        assert_user_kb_access(request.user, payload["hash_id"])  # may raise PermissionDenied
+        await sync_to_async(assert_user_kb_access)(
+            request.user, payload["hash_id"]
+        )  # may raise PermissionDenied
 
         if not settings.N8N_BASE_URL or not settings.N8N_KB_KEY:
             return Response(
@@ -55,26 +59,31 @@ class KBEditProxyView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        url = f"{settings.N8N_BASE_URL}{self.target_path}"
-        timeout = int(getattr(settings, "N8N_TIMEOUT", 10))
         try:
-            upstream = requests.patch(
-                url,
+            upstream = await n8n_client.apatch(
+                self.target_path,
                 headers=self._build_headers(),
                 json=payload,
-                timeout=timeout,
             )
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return Response(
                 {"detail": "Timeout ao chamar serviço externo."},
                 status=status.HTTP_504_GATEWAY_TIMEOUT,
             )
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             return Response(
                 {"detail": f"Erro ao chamar serviço externo: {str(e)}"},
                 status=status.HTTP_502_BAD_GATEWAY,
             )
 
+        if upstream.status_code < 300:
+            await sync_to_async(kb_catalog.upsert)(
+                payload["hash_id"],
+                name=payload.get("name"),
+                description=payload.get("description"),
+            )
+            await sync_to_async(kb_catalog.invalidate_reads)(payload["hash_id"])
+
         try:
             return Response(upstream.json(), status=upstream.status_code)
         except ValueError:
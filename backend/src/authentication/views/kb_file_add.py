@@ -1,48 +1,57 @@
-from typing import Dict
-
-import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.urls import reverse
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
-from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.parsers import FormParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
 from authentication.permissions import assert_user_kb_access
 from authentication.serializers.kb_file_add_serializer import KBFileAddSerializer
+from authentication.serializers.kb_ingestion_job_serializer import KBIngestionJobSerializer
+from authentication.services import kb_ingestion
+from authentication.uploads import StreamingMultiPartParser
+from authentication.views.async_api import AsyncAPIView
 
 
-class KBFileAddProxyView(APIView):
-    target_path = "/webhook/kb/file/add"
-    parser_classes = [MultiPartParser, FormParser]
+class KBFileAddProxyView(AsyncAPIView):
+    parser_classes = [StreamingMultiPartParser, FormParser]
     permission_classes = [IsAuthenticated]
 
-    def _build_headers(self) -> Dict[str, str]:
-        return {"key": settings.N8N_KB_KEY}
-
     @swagger_auto_schema(
         tags=["kb"],
         operation_id="kb_file_add",
         summary="Adiciona arquivo ao KB (proxy n8n)",
-        description="Envia `file` (upload) e `hash_id` para o webhook do n8n.",
+        description=(
+            "Recebe `file` (upload) e `hash_id`, grava o arquivo e responde `202` com o job "
+            "de ingestão. O envio ao webhook do n8n é feito em segundo plano; acompanhe o "
+            "status em `GET /api/kb/jobs/<job_id>/`. Se o KB já tem um arquivo com o mesmo "
+            "conteúdo (SHA-256), nada é reenviado ao n8n: responde `200` com um job `done` "
+            "(`result.data.status = duplicate`) ou com o job que já está processando esse "
+            "conteúdo."
+        ),
         request_body=KBFileAddSerializer,
         consumes=["multipart/form-data"],
         responses={
             200: openapi.Response(
-                description="OK",
-                schema=openapi.Schema(type=openapi.TYPE_OBJECT, additional_properties=True),
-            )
+                "Conteúdo já indexado/em processamento", KBIngestionJobSerializer
+            ),
+            202: openapi.Response("Job de ingestão criado", KBIngestionJobSerializer),
+            403: openapi.Response("Sem acesso ao KB"),
+            413: openapi.Response("Arquivo maior que KB_UPLOAD_MAX_BYTES"),
         },
     )
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         ser = KBFileAddSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
         upload = ser.validated_data["file"]
         hash_id = ser.validated_data["hash_id"]
 
-        assert_user_kb_access(request.user, hash_id)  # may raise PermissionDenied
+        await sync_to_async(assert_user_kb_access)(
+            request.user, hash_id
+        )  # may raise PermissionDenied
 
         if not settings.N8N_BASE_URL or not settings.N8N_KB_KEY:
             return Response(
@@ -50,43 +59,10 @@ class KBFileAddProxyView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        files = {
-            "file": (
-                upload.name,
-                upload.file,
-                getattr(upload, "content_type", "application/octet-stream"),
-            ),
-        }
-        data = {"hash_id": hash_id}
-
-        # chama n8n
-        url = f"{settings.N8N_BASE_URL}{self.target_path}"
-        timeout = int(getattr(settings, "N8N_TIMEOUT", 30))
-
-        try:
-            upstream = requests.post(
-                url,
-                headers=self._build_headers(),
-                files=files,
-                data=data,
-                timeout=timeout,
-            )
-        except requests.Timeout:
-            return Response(
-                {"detail": "Timeout ao chamar serviço externo."},
-                status=status.HTTP_504_GATEWAY_TIMEOUT,
-            )
-        except requests.RequestException as e:
-            return Response(
-                {"detail": f"Erro ao chamar serviço externo: {str(e)}"},
-                status=status.HTTP_502_BAD_GATEWAY,
-            )
+        job, queued = await sync_to_async(kb_ingestion.create_job)(request.user, hash_id, upload)
 
-        try:
-            return Response(upstream.json(), status=upstream.status_code)
-        except ValueError:
-            return Response(
-                {"raw": upstream.text},
-                status=upstream.status_code,
-                content_type=upstream.headers.get("Content-Type", "application/json"),
-            )
+        return Response(
+            KBIngestionJobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED if queued else status.HTTP_200_OK,
+            headers={"Location": reverse("kb_job_status", kwargs={"job_id": job.id})},
+        )
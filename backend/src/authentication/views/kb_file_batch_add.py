@@ -0,0 +1,77 @@
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.parsers import FormParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from authentication.permissions import assert_user_kb_access
+from authentication.serializers.kb_file_batch_add_serializer import KBFileBatchAddSerializer
+from authentication.serializers.kb_ingestion_job_serializer import KBIngestionJobSerializer
+from authentication.services import kb_ingestion
+from authentication.uploads import StreamingMultiPartParser
+from authentication.views.async_api import AsyncAPIView
+
+
+class KBFileBatchAddProxyView(AsyncAPIView):
+    parser_classes = [StreamingMultiPartParser, FormParser]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=["kb"],
+        operation_id="kb_files_batch_add",
+        summary="Adiciona vários arquivos ao KB (proxy n8n)",
+        description=(
+            "Recebe vários `files` (uploads) e um `hash_id`. O acesso ao KB é verificado "
+            "uma única vez e cada arquivo vira um job de ingestão, enviado ao n8n em "
+            "segundo plano com paralelismo limitado (como em `POST /api/kb/file/add/`). "
+            "Responde com um resultado por arquivo, na ordem do envio: `outcome` = "
+            "`queued`, `duplicate` (conteúdo já indexado ou repetido no lote), "
+            "`in_progress` (mesmo conteúdo já em processamento) ou `error`. Acompanhe cada "
+            "job em `GET /api/kb/jobs/<job_id>/`."
+        ),
+        request_body=KBFileBatchAddSerializer,
+        consumes=["multipart/form-data"],
+        responses={
+            200: openapi.Response("Nenhum arquivo novo para ingerir"),
+            202: openapi.Response("Jobs de ingestão criados"),
+            403: openapi.Response("Sem acesso ao KB"),
+            413: openapi.Response("Arquivo maior que KB_UPLOAD_MAX_BYTES"),
+        },
+    )
+    async def post(self, request, *args, **kwargs):
+        ser = KBFileBatchAddSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        uploads = ser.validated_data["files"]
+        hash_id = ser.validated_data["hash_id"]
+
+        await sync_to_async(assert_user_kb_access)(
+            request.user, hash_id
+        )  # may raise PermissionDenied
+
+        if not settings.N8N_BASE_URL or not settings.N8N_KB_KEY:
+            return Response(
+                {"detail": "Configuração do N8N ausente (N8N_BASE_URL/N8N_KB_KEY)."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        entries = await sync_to_async(kb_ingestion.create_jobs)(request.user, hash_id, uploads)
+
+        results = [
+            {
+                "file": entry["file"],
+                "outcome": entry["outcome"],
+                "job": KBIngestionJobSerializer(entry["job"]).data if entry["job"] else None,
+                "error": entry["error"],
+            }
+            for entry in entries
+        ]
+        summary = Counter(entry["outcome"] for entry in entries)
+        return Response(
+            {"hash_id": hash_id, "count": len(results), "summary": summary, "results": results},
+            status=status.HTTP_202_ACCEPTED if summary["queued"] else status.HTTP_200_OK,
+        )
@@ -0,0 +1,45 @@
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from authentication.models.kb_ingestion_job import KBIngestionJob
+from authentication.permissions import assert_user_kb_access, is_admin_by_role
+from authentication.serializers.kb_ingestion_job_serializer import KBIngestionJobSerializer
+
+
+class KBJobStatusView(APIView):
+    """
+    Status de um job de ingestão criado por `POST /api/kb/file/add/`.
+    Visível para quem enviou o arquivo (ou admins/superusers) enquanto tiver acesso ao KB.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=["kb"],
+        operation_id="kb_job_status",
+        summary="Status do job de ingestão de arquivo",
+        description=(
+            "Retorna `queued`, `running`, `done` ou `failed`, com número de tentativas, "
+            "horários (enfileirado/início/fim) e a resposta do n8n quando finalizado."
+        ),
+        responses={
+            200: openapi.Response("OK", KBIngestionJobSerializer),
+            403: openapi.Response("Sem acesso ao KB"),
+            404: openapi.Response("Job não encontrado"),
+        },
+    )
+    def get(self, request, job_id, *args, **kwargs):
+        user = request.user
+        job = KBIngestionJob.objects.filter(id=job_id).first()
+        is_admin = getattr(user, "is_superuser", False) or is_admin_by_role(user)
+        # Other users' jobs are reported as missing rather than forbidden
+        if job is None or (not is_admin and job.user_id != user.id):
+            return Response({"detail": "Job não encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        assert_user_kb_access(user, job.hash_id)  # may raise PermissionDenied
+
+        return Response(KBIngestionJobSerializer(job).data, status=status.HTTP_200_OK)
@@ -1,19 +1,21 @@
 from typing import Any, Dict
 
-import requests
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
 from authentication.permissions import assert_user_kb_access
 from authentication.serializers.kg_get_serializer import KBGetQuerySerializer
+from authentication.services import n8n_coalesce
+from authentication.views.async_api import AsyncAPIView
 
 
-class KBFileListProxyView(APIView):
+class KBFileListProxyView(AsyncAPIView):
     target_path = "/webhook/webhook/kb/file/list"
     permission_classes = [IsAuthenticated]
 
@@ -36,7 +38,7 @@ class KBFileListProxyView(APIView):
             )
         },
     )
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         ser = KBGetQuerySerializer(data=request.query_params)
         has_query = ser.is_valid()
 
@@ -59,20 +61,20 @@ class KBFileListProxyView(APIView):
             )
 
         # Enforce tenant isolation for the KB
-        assert_user_kb_access(request.user, payload["hash_id"])  # may raise PermissionDenied
+        await sync_to_async(assert_user_kb_access)(
+            request.user, payload["hash_id"]
+        )  # may raise PermissionDenied
 
-        url = f"{settings.N8N_BASE_URL}{self.target_path}"
-        timeout = int(getattr(settings, "N8N_TIMEOUT", 10))
         try:
-            upstream = requests.get(
-                url, headers=self._build_headers(), json=payload, timeout=timeout
+            upstream = await n8n_coalesce.aget(
+                self.target_path, headers=self._build_headers(), json=payload
             )
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return Response(
                 {"detail": "Timeout ao chamar serviço externo."},
                 status=status.HTTP_504_GATEWAY_TIMEOUT,
             )
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             return Response(
                 {"detail": f"Erro ao chamar serviço externo: {str(e)}"},
                 status=status.HTTP_502_BAD_GATEWAY,
@@ -1,28 +1,26 @@
-from typing import Any, Dict, List
+from typing import Dict, List, Optional
 
-import requests
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.utils import timezone
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
-from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
-from authentication.models.kb import KBLink
+from authentication.models.kb import KBCatalog, KBLink
 from authentication.models.projects import Projects
-from authentication.permissions import is_admin_by_role
+from authentication.permissions import assert_user_project_access
+from authentication.services import kb_catalog, n8n_coalesce
+from authentication.views.async_api import AsyncAPIView
 
 
-def _as_bool(value: str) -> bool:
-    return str(value).lower() in {"1", "true", "t", "yes", "y"}
-
-
-class KBListAllProxyView(APIView):
+class KBListAllProxyView(AsyncAPIView):
     """
-    Lista KBs do n8n, mas **só** retorna as que estão vinculadas ao projeto informado.
-    Não realiza sincronização local; retorna apenas a lista filtrada pelo projeto.
+    Lista as KBs vinculadas ao projeto informado, a partir do catálogo local (KBCatalog).
+    O n8n só é consultado quando alguma KB vinculada ainda não está no catálogo.
     """
 
     permission_classes = [IsAuthenticated]
@@ -38,10 +36,11 @@ class KBListAllProxyView(APIView):
     @swagger_auto_schema(
         tags=["kb"],
         operation_id="kb_list_all",
-        summary="Lista KBs do projeto (proxy + filtro local)",
+        summary="Lista KBs do projeto (catálogo local)",
         description=(
-            "Exige `project_id` e retorna apenas KBs vinculadas a esse projeto. "
-            "Retorna apenas KBs vinculadas ao projeto informado."
+            "Exige `project_id` e retorna apenas KBs vinculadas a esse projeto, lidas do "
+            "catálogo local (nome, descrição, file_count, updated_at). O catálogo é "
+            "atualizado pelas rotas de criar/editar/remover KB e pela reconciliação periódica."
         ),
         manual_parameters=[
             openapi.Parameter(
@@ -59,20 +58,59 @@ class KBListAllProxyView(APIView):
             )
         },
     )
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         project_id = request.query_params.get("project_id")
         if not project_id:
             return Response({"detail": "project_id é obrigatório."}, status=400)
 
         try:
-            project = Projects.objects.get(pk=project_id)
+            project = await Projects.objects.aget(pk=project_id)
         except Projects.DoesNotExist:
             return Response({"detail": "Projeto não encontrado."}, status=404)
 
-        if not (request.user and (request.user.is_superuser or is_admin_by_role(request.user))):
-            if project not in request.user.projects.all():
-                raise PermissionDenied("Você não tem acesso a este projeto.")
+        await sync_to_async(assert_user_project_access)(request.user, project)
+
+        linked = [
+            ext_id
+            async for ext_id in KBLink.objects.filter(project=project).values_list(
+                "external_id", flat=True
+            )
+        ]
+        entries = await self._catalog_entries(linked)
+
+        if len(entries) < len(linked):
+            # Some linked KB was never synced (e.g. attached by hash_id): refresh the
+            # catalogue from n8n once, then answer from it again.
+            known = await KBCatalog.objects.filter(external_id__in=linked).acount()
+            if known < len(linked):
+                error = await self._sync_from_upstream()
+                if error is None:
+                    await sync_to_async(kb_catalog.mark_missing)(linked)
+                elif not entries:
+                    return error
+                entries = await self._catalog_entries(linked)
+
+        kbs = [kb_catalog.as_item(e) for e in entries]
+        return Response(
+            {
+                "status": "success",
+                "project_id": str(project.id),
+                "count": len(kbs),
+                "kbs": kbs,
+            },
+            status=200,
+        )
+
+    async def _catalog_entries(self, external_ids: List[str]) -> List[KBCatalog]:
+        return [
+            e
+            async for e in KBCatalog.objects.filter(
+                external_id__in=external_ids, deleted_at__isnull=True
+            ).order_by("name")
+        ]
 
+    async def _sync_from_upstream(self) -> Optional[Response]:
+        """Full listing from n8n into the catalogue; returns an error ``Response`` on failure."""
         if not getattr(settings, "N8N_BASE_URL", None) or not getattr(
             settings, "N8N_KB_KEY", None
         ):
@@ -81,43 +119,19 @@ class KBListAllProxyView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
-        url = f"{settings.N8N_BASE_URL}{self.target_path}"
-        timeout = int(getattr(settings, "N8N_TIMEOUT", 10))
+        requested_at = timezone.now()
         try:
-            upstream = requests.get(url, headers=self._build_headers(), timeout=timeout)
+            upstream = await n8n_coalesce.aget(self.target_path, headers=self._build_headers())
             upstream.raise_for_status()
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return Response({"detail": "Timeout."}, status=504)
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             return Response({"detail": f"Error calling external service: {e}"}, status=502)
 
         try:
-            payload = upstream.json()
+            rows = kb_catalog.rows_from_payload(upstream.json())
         except ValueError:
             return Response({"raw": upstream.text}, status=upstream.status_code)
 
-        rows: List[Dict[str, Any]] = payload.get("kbs") or payload.get("data") or []
-        normalized: List[Dict[str, Any]] = []
-        for r in rows:
-            ext_id = r.get("hash_id") or r.get("id") or r.get("external_id")
-            name = r.get("name") or r.get("kb_name") or ""
-            if not ext_id:
-                continue
-            normalized.append({"external_id": ext_id, "name": name, **r})
-
-        # admins (by role) and superusers see all KBs; other users see only KBs linked to the project
-        # if is_admin_by_role(request.user) or (request.user and request.user.is_superuser):
-        #     filtered = normalized
-        # else:
-        allowed = set(KBLink.objects.filter(project=project).values_list("external_id", flat=True))
-        filtered = [i for i in normalized if i["external_id"] in allowed]
-
-        return Response(
-            {
-                "status": "success",
-                "project_id": str(project.id),
-                "count": len(filtered),
-                "kbs": filtered,
-            },
-            status=200,
-        )
+        await sync_to_async(kb_catalog.sync_rows)(rows, as_of=requested_at)
+        return None
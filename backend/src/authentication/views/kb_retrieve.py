@@ -0,0 +1,96 @@
+import logging
+
+import psycopg2
+from asgiref.sync import sync_to_async
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from authentication.serializers.kb_retrieve_serializer import KBRetrieveSerializer
+from authentication.services import embeddings, kb_retrieval, n8n_db
+from authentication.views.async_api import AsyncAPIView
+
+logger = logging.getLogger(__name__)
+
+
+class KBRetrieveView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    http_method_names = ["post"]
+
+    @swagger_auto_schema(
+        tags=["kb"],
+        operation_id="kb_retrieve",
+        summary="Busca semântica nos KBs (PGVector direto)",
+        description=(
+            "Devolve os `top_k` trechos dos KBs `hash_ids` mais próximos da consulta "
+            "(similaridade de cosseno em `score`), lidos diretamente das coleções PGVector "
+            "do Postgres do n8n, sem executar um workflow. A consulta é `query` (texto, "
+            "convertido em embedding pelo backend) ou `vector` (embedding pronto, do mesmo "
+            "modelo usado na indexação). Com `mode=hybrid`, `query` é obrigatório: a busca "
+            "vetorial e uma busca textual (full text) rodam em paralelo e os resultados são "
+            "combinados por reciprocal-rank fusion (`score` = RRF, `ranks` = posição em cada "
+            "busca); `vector`, se enviado, é o embedding de `query`. O usuário precisa ter "
+            "acesso a todos os KBs."
+        ),
+        request_body=KBRetrieveSerializer,
+        responses={
+            200: openapi.Response("Trechos encontrados"),
+            400: openapi.Response("Requisição inválida (ex.: dimensão do vetor)"),
+            403: openapi.Response("Sem acesso a um dos KBs"),
+            503: openapi.Response("Postgres do n8n ou API de embeddings indisponível"),
+        },
+    )
+    async def post(self, request, *args, **kwargs):
+        ser = KBRetrieveSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        hash_ids = ser.validated_data["hash_ids"]
+        top_k = ser.validated_data.get("top_k") or kb_retrieval.default_top_k()
+        mode = ser.validated_data["mode"]
+        query = ser.validated_data.get("query")
+
+        if not n8n_db.is_configured():
+            return Response(
+                {"detail": "Configuração do Postgres do n8n ausente (N8N_POSTGRES_HOST)."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        # Before embedding: a KB the user cannot read must not cost an embedding call
+        allowed = await sync_to_async(kb_retrieval.authorize)(
+            request.user, hash_ids
+        )  # may raise PermissionDenied
+
+        vector = ser.validated_data.get("vector")
+        if vector is None:
+            try:
+                vector = await sync_to_async(embeddings.embed_one, thread_sensitive=False)(query)
+            except embeddings.EmbeddingError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        try:
+            chunks = await sync_to_async(kb_retrieval.run, thread_sensitive=False)(
+                allowed, vector, top_k, mode=mode, query=query
+            )
+        except psycopg2.DataError as e:
+            return Response(
+                {"detail": f"Vetor de consulta inválido: {e}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except psycopg2.Error as e:
+            logger.warning("KB retrieval failed: %s", e)
+            return Response(
+                {"detail": "Falha ao consultar o Postgres do n8n."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        return Response(
+            {
+                "hash_ids": hash_ids,
+                "top_k": top_k,
+                "mode": mode,
+                "count": len(chunks),
+                "results": [chunk.as_dict() for chunk in chunks],
+            },
+            status=status.HTTP_200_OK,
+        )
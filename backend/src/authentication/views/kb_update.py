@@ -1,22 +1,34 @@
 import logging
 
-import requests
+import httpx
+import psycopg2
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
-from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.parsers import FormParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
 logger = logging.getLogger(__name__)
 from authentication.models.projects import Projects
-from authentication.permissions import assert_user_project_access
+from authentication.permissions import access_context, assert_user_project_access
+from authentication.services import (
+    kb_ann,
+    kb_catalog,
+    kb_chunks,
+    kb_documents,
+    n8n_client,
+    n8n_guard,
+)
+from authentication.services.multipart import MultipartStream
+from authentication.uploads import StreamingMultiPartParser, upload_chunk_size
+from authentication.views.async_api import AsyncAPIView
 
 
-class KBFileUpdateProxyView(APIView):
-    parser_classes = [MultiPartParser, FormParser]
+class KBFileUpdateProxyView(AsyncAPIView):
+    parser_classes = [StreamingMultiPartParser, FormParser]
     target_add = "/webhook/kb/file/add"
     target_del = "/webhook/webhook/kb/file/delete"
     target_list = "/webhook/webhook/kb/file/list"
@@ -25,56 +37,138 @@ class KBFileUpdateProxyView(APIView):
     def _headers(self):
         return {"key": settings.N8N_KB_KEY}
 
+    async def _incremental_replace(self, hash_id, old_file, upload, digest):
+        """Re-embeds only the chunks that changed between ``old_file`` and ``upload``.
+
+        Returns ``None`` when the file does not qualify (not plain text, too large, old
+        file not found in the vector store...) so the caller falls back to a full replace.
+        """
+        if not kb_chunks.supports_incremental(upload.name, upload.size):
+            return None
+        new_text = await sync_to_async(kb_chunks.read_text)(upload)
+        if new_text is None:
+            return None
+        try:
+            stored = await sync_to_async(kb_chunks.load_stored_chunks, thread_sensitive=False)(
+                hash_id, old_file
+            )
+        except psycopg2.Error:
+            logger.exception("Failed to read stored chunks of %s; doing a full replace", old_file)
+            return None
+        if not stored:
+            return None
+
+        chunk_plan = kb_chunks.plan(stored, new_text)
+        add_json = None
+        if chunk_plan.added:
+            try:
+                add_resp = await n8n_client.apost(
+                    kb_chunks.ADD_CHUNKS_PATH,
+                    headers={**self._headers(), "Content-Type": "application/json"},
+                    json=kb_chunks.add_payload(hash_id, upload.name, chunk_plan),
+                )
+                add_json = add_resp.json()
+            except (httpx.HTTPError, ValueError) as e:
+                return Response({"detail": f"Falha no add: {e}"}, status=502)
+            if add_resp.status_code >= 300:
+                return Response(
+                    {"step": "add", "status": add_resp.status_code, "payload": add_json},
+                    status=add_resp.status_code,
+                )
+
+        try:
+            await sync_to_async(kb_chunks.apply_stored_changes, thread_sensitive=False)(
+                old_file, upload.name, chunk_plan
+            )
+        except psycopg2.Error as e:
+            return Response(
+                {
+                    "detail": "Novos trechos adicionados, mas falhou ao atualizar/remover os antigos",
+                    "mode": "incremental",
+                    "chunks": chunk_plan.counts(),
+                    "add": add_json,
+                    "delete_error": str(e),
+                },
+                status=207,
+            )
+
+        await sync_to_async(kb_documents.forget_file)(hash_id, old_file)
+        await sync_to_async(kb_documents.record_indexed)(hash_id, digest, upload.name, upload.size)
+        await sync_to_async(kb_catalog.invalidate_reads)(hash_id)
+        await sync_to_async(kb_ann.schedule)(hash_id)
+        return Response(
+            {
+                "status": "ok",
+                "mode": "incremental",
+                "chunks": chunk_plan.counts(),
+                "added": add_json,
+                "deleted": {"chunks": len(chunk_plan.removed)},
+            },
+            status=200,
+        )
+
     @swagger_auto_schema(
         tags=["kb"],
         operation_id="kb_file_update",
         summary="Troca um arquivo do KB (add novo + delete antigo)",
-        description="Recebe file (novo) e hash_id (identifica o KB). O backend encontra o arquivo antigo, adiciona o novo e remove o antigo.",
+        description="Recebe file (novo) e hash_id (identifica o KB). O backend encontra o arquivo antigo, adiciona o novo e remove o antigo. Se o conteúdo (SHA-256) já está indexado no KB, o novo arquivo não é reenviado ao n8n. Arquivos de texto (.txt/.md) são reindexados por trecho: só os trechos alterados são enviados para embedding, os demais são reaproveitados (resposta traz mode e chunks: reused/added/removed). mode=full força a troca completa.",
         manual_parameters=[
             openapi.Parameter("hash_id", openapi.IN_FORM, type=openapi.TYPE_STRING, required=True),
             openapi.Parameter("file", openapi.IN_FORM, type=openapi.TYPE_FILE, required=True),
             openapi.Parameter(
                 "project_id", openapi.IN_FORM, type=openapi.TYPE_STRING, required=True
             ),
+            openapi.Parameter(
+                "mode",
+                openapi.IN_FORM,
+                type=openapi.TYPE_STRING,
+                enum=["auto", "full"],
+                required=False,
+            ),
         ],
         consumes=["multipart/form-data"],
-        responses={200: openapi.Response(description="OK")},
+        responses={
+            200: openapi.Response(description="OK"),
+            413: openapi.Response("Arquivo maior que KB_UPLOAD_MAX_BYTES"),
+        },
     )
-    def patch(self, request):
+    async def patch(self, request):
         hash_id = request.data.get("hash_id")
         old_file = request.data.get("old_file", None)
         project_id = request.data.get("project_id")
         upload = request.data.get("file")
+        mode = request.data.get("mode") or "auto"
 
         if not all([hash_id, upload, project_id]):
             return Response(
                 {"detail": "hash_id, file, project_id são obrigatórios"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
-        from authentication.models.kb import KBLink
+        if mode not in ("auto", "full"):
+            return Response(
+                {"detail": "mode deve ser 'auto' ou 'full'"}, status=status.HTTP_400_BAD_REQUEST
+            )
 
         # Enforce project access (tenant isolation)
         try:
-            project = Projects.objects.get(pk=project_id)
+            project = await Projects.objects.aget(pk=project_id)
         except Projects.DoesNotExist:
             return Response({"detail": "Projeto não encontrado."}, status=404)
-        assert_user_project_access(request.user, project)
+        await sync_to_async(assert_user_project_access)(request.user, project)
 
-        if not KBLink.objects.filter(project_id=project_id, external_id=hash_id).exists():
+        context = access_context(request.user)  # loaded by the project check above
+        if not await sync_to_async(context.project_has_kb)(project.pk, hash_id):
             return Response({"detail": "KB não pertence ao projeto"}, status=403)
 
         if not old_file:
             try:
-                list_url = f"{settings.N8N_BASE_URL}{self.target_list}"
-                list_resp = requests.get(
-                    list_url,
+                list_resp = await n8n_client.aget(
+                    self.target_list,
                     headers={
                         "key": settings.N8N_KB_KEY,
                         "Content-Type": "application/json",
                     },
                     json={"hash_id": hash_id},
-                    timeout=15,
                 )
                 if list_resp.status_code < 300:
                     try:
@@ -105,53 +199,86 @@ class KBFileUpdateProxyView(APIView):
 
                     if discovered:
                         old_file = discovered
-            except requests.RequestException:
+            except httpx.HTTPError:
                 logger.exception(
                     "Failed to query n8n for existing KB files; proceeding without old_file"
                 )
 
-        try:
-            add_url = f"{settings.N8N_BASE_URL}{self.target_add}"
-            files = {
-                "file": (
-                    upload.name,
-                    upload.file,
-                    getattr(upload, "content_type", "application/octet-stream"),
-                )
-            }
-            add_resp = requests.post(
-                add_url,
-                headers=self._headers(),
-                files=files,
-                data={"hash_id": hash_id},
-                timeout=30,
-            )
-            add_json = add_resp.json()
-            if add_resp.status_code >= 300:
+        digest = await sync_to_async(kb_documents.content_hash)(upload)
+        indexed = await sync_to_async(kb_documents.find_indexed)(hash_id, digest)
+
+        if indexed is None and old_file and mode == "auto":
+            incremental = await self._incremental_replace(hash_id, old_file, upload, digest)
+            if incremental is not None:
+                return incremental
+
+        if indexed is not None:
+            # Same bytes already embedded in this KB: skip the add (no re-embedding)
+            add_json = {"status": "duplicate", "file": indexed.file_name}
+            if old_file == indexed.file_name:
                 return Response(
-                    {"step": "add", "status": add_resp.status_code, "payload": add_json},
-                    status=add_resp.status_code,
+                    {
+                        "status": "ok",
+                        "mode": "full",
+                        "added": add_json,
+                        "deleted": None,
+                        "unchanged": True,
+                    },
+                    status=200,
+                )
+        else:
+            try:
+                body = MultipartStream(
+                    fields={"hash_id": hash_id},
+                    files={
+                        "file": (
+                            upload.name,
+                            upload,
+                            getattr(upload, "content_type", "application/octet-stream"),
+                        )
+                    },
+                    chunk_size=upload_chunk_size(),
+                )
+                add_resp = await n8n_client.apost_multipart(
+                    self.target_add, body, headers=self._headers()
                 )
-        except Exception as e:
-            return Response({"detail": f"Falha no add: {e}"}, status=502)
+                add_json = add_resp.json()
+                if add_resp.status_code >= 300:
+                    return Response(
+                        {"step": "add", "status": add_resp.status_code, "payload": add_json},
+                        status=add_resp.status_code,
+                    )
+            except n8n_guard.UpstreamRejected:
+                raise
+            except Exception as e:
+                return Response({"detail": f"Falha no add: {e}"}, status=502)
+
+            await sync_to_async(kb_documents.record_indexed)(
+                hash_id, digest, upload.name, upload.size
+            )
+            await sync_to_async(kb_catalog.adjust_file_count)(hash_id, 1)
+            await sync_to_async(kb_catalog.invalidate_reads)(hash_id)
+            await sync_to_async(kb_ann.schedule)(hash_id)
 
         del_resp = None
         del_json = None
         if old_file:
             try:
-                del_url = f"{settings.N8N_BASE_URL}{self.target_del}"
-                del_resp = requests.delete(
-                    del_url,
+                del_resp = await n8n_client.adelete(
+                    self.target_del,
                     headers={**self._headers(), "Content-Type": "application/json"},
                     json={"hash_id": hash_id, "file": old_file},
-                    timeout=15,
                 )
                 del_json = (
                     del_resp.json()
                     if del_resp.headers.get("Content-Type", "").startswith("application/json")
                     else {"raw": del_resp.text}
                 )
-                if del_resp.status_code >= 300:
+                if del_resp.status_code < 300:
+                    await sync_to_async(kb_documents.forget_file)(hash_id, old_file)
+                    await sync_to_async(kb_catalog.adjust_file_count)(hash_id, -1)
+                    await sync_to_async(kb_catalog.invalidate_reads)(hash_id)
+                else:
                     return Response(
                         {
                             "detail": "Novo arquivo adicionado, mas não removi o antigo",
@@ -170,4 +297,6 @@ class KBFileUpdateProxyView(APIView):
                     status=207,
                 )
 
-        return Response({"status": "ok", "added": add_json, "deleted": del_json}, status=200)
+        return Response(
+            {"status": "ok", "mode": "full", "added": add_json, "deleted": del_json}, status=200
+        )
@@ -10,13 +10,12 @@ from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter, SearchFilter
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from authentication.debug_auth import FlexibleJWTAuthentication
+from authentication.debug_auth import CachedJWTAuthentication, FlexibleJWTAuthentication
 from authentication.models.agents import Agents
 from authentication.models.projects import Projects
 from authentication.models.user_profile import UserProfile
-from authentication.permissions import IsAdminByRole, is_admin_by_role
+from authentication.permissions import IsAdminByRole, access_context, is_admin_by_role
 from authentication.serializers.bot_serializer import BotN8nSerializer
 from authentication.serializers.default_pagination import DefaultPagination
 from authentication.serializers.project_bots_association_serializer import (
@@ -28,7 +27,7 @@ from authentication.serializers.project_update_serializer import ProjectPartialU
 
 
 class ProjectViewSet(viewsets.ModelViewSet):
-    authentication_classes = [FlexibleJWTAuthentication, JWTAuthentication]
+    authentication_classes = [FlexibleJWTAuthentication, CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     queryset = Projects.objects.select_related("client").prefetch_related("agents").all()
@@ -60,7 +59,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
             return qs  # Administrator sees all projects
 
         # Common users only see projects related to them
-        return qs.filter(users__id=user.id).distinct()
+        return qs.filter(id__in=access_context(user).project_ids)
 
     @swagger_auto_schema(
         operation_summary="Listar projetos",
@@ -340,7 +339,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         url_path="users/attach",
         permission_classes=[IsAuthenticated, IsAdminByRole],  # admin restriction kept
         # Keep both JWT + Flexible to mirror viewset default and avoid auth inconsistency
-        authentication_classes=[FlexibleJWTAuthentication, JWTAuthentication],
+        authentication_classes=[FlexibleJWTAuthentication, CachedJWTAuthentication],
     )
     def attach_users(self, request, pk=None):
         if not is_admin_by_role(request.user):
@@ -450,7 +449,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         methods=["post"],
         url_path="users/detach",
         permission_classes=[IsAuthenticated, IsAdminByRole],
-        authentication_classes=[FlexibleJWTAuthentication, JWTAuthentication],
+        authentication_classes=[FlexibleJWTAuthentication, CachedJWTAuthentication],
     )
     def detach_users(self, request, pk=None):
         if not is_admin_by_role(request.user):
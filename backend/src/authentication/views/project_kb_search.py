@@ -0,0 +1,104 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import get_object_or_404
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from authentication.models.projects import Projects
+from authentication.permissions import assert_user_project_access
+from authentication.serializers.project_kb_search_serializer import ProjectKBSearchSerializer
+from authentication.services import embeddings, kb_federated, kb_retrieval, n8n_db
+from authentication.views.async_api import AsyncAPIView
+
+logger = logging.getLogger(__name__)
+
+
+class ProjectKBSearchView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+    http_method_names = ["post"]
+
+    @swagger_auto_schema(
+        tags=["Projects"],
+        operation_id="project_kb_search",
+        summary="Busca em todos os KBs do projeto",
+        description=(
+            "Busca `query` (ou `vector`) em todos os KBs vinculados ao projeto, em paralelo, "
+            "e devolve os `top_k` melhores trechos do conjunto (mesmos `mode` e campos de "
+            "`POST /api/kb/retrieve/`). KBs que não respondem até `deadline_ms` (padrão "
+            "`KB_FEDERATED_DEADLINE_MS`) ficam de fora: a resposta traz `partial: true` e "
+            "os KBs em `timed_out` ou `failed`. O usuário precisa ter acesso ao projeto."
+        ),
+        request_body=ProjectKBSearchSerializer,
+        responses={
+            200: openapi.Response("Trechos encontrados (possivelmente parciais)"),
+            400: openapi.Response("Requisição inválida"),
+            403: openapi.Response("Sem acesso ao projeto"),
+            404: openapi.Response("Projeto não encontrado"),
+            503: openapi.Response("Postgres do n8n ou API de embeddings indisponível"),
+        },
+    )
+    async def post(self, request, project_id, *args, **kwargs):
+        ser = ProjectKBSearchSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        top_k = ser.validated_data.get("top_k") or kb_retrieval.default_top_k()
+        mode = ser.validated_data["mode"]
+        query = ser.validated_data.get("query")
+
+        hash_ids = await sync_to_async(self._resolve)(request.user, project_id)
+        if not hash_ids:
+            return Response(
+                {
+                    "project_id": str(project_id),
+                    "top_k": top_k,
+                    "mode": mode,
+                    **kb_federated.FederatedResult(results=[], hash_ids=[]).as_dict(),
+                },
+                status=status.HTTP_200_OK,
+            )
+
+        if not n8n_db.is_configured():
+            return Response(
+                {"detail": "Configuração do Postgres do n8n ausente (N8N_POSTGRES_HOST)."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+        vector = ser.validated_data.get("vector")
+        if vector is None:
+            try:
+                vector = await sync_to_async(embeddings.embed_one, thread_sensitive=False)(query)
+            except embeddings.EmbeddingError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        result = await sync_to_async(kb_federated.search, thread_sensitive=False)(
+            hash_ids,
+            vector,
+            top_k,
+            mode=mode,
+            query=query,
+            deadline_ms=ser.validated_data.get("deadline_ms"),
+        )
+        if result.failed and len(result.failed) == len(hash_ids):
+            return Response(
+                {"detail": "Falha ao consultar o Postgres do n8n."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        return Response(
+            {
+                "project_id": str(project_id),
+                "top_k": top_k,
+                "mode": mode,
+                **result.as_dict(),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @staticmethod
+    def _resolve(user, project_id):
+        project = get_object_or_404(Projects, id=project_id)
+        assert_user_project_access(user, project)  # may raise PermissionDenied
+        return kb_federated.project_hash_ids(project)
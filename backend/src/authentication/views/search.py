@@ -1,25 +1,23 @@
-import requests
+import httpx
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import status, viewsets
-from rest_framework.decorators import action
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from authentication.debug_auth import CachedJWTAuthentication
 from authentication.models.chat_sessions import ChatSession
-from authentication.models.agents import Agents
 from authentication.serializers.search_serializer import SearchSerializer
+from authentication.services import chat_mirror, chat_search, n8n_client
+from authentication.views.async_api import AsyncAPIView
 
-import json
 
-class SearchView(viewsets.ModelViewSet):
-    serializer_class = SearchSerializer
-    queryset = ChatSession.objects.all()
+class SearchView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     http_method_names = ["post"]
 
     target_path = "/webhook/get-message/"
@@ -32,14 +30,15 @@ class SearchView(viewsets.ModelViewSet):
 
     @swagger_auto_schema(
         operation_summary="Pesquisa chat history por query",
-        operation_description="Pesquisa no chat por query. Requer autenticação JWT.",
-        request_body=openapi.Schema(
-            type=openapi.TYPE_OBJECT,
-            required=["query"],
-            properties={
-                "query": openapi.Schema(type=openapi.TYPE_STRING, description="Search Term"),
-            },
+        operation_description=(
+            "Pesquisa no chat por query. Requer autenticação JWT. Com o espelho local da "
+            "memória de chat ativo (`sync_chat_messages`), a busca roda no backend (índice "
+            "FULLTEXT), apenas nas sessões do usuário: resultados ordenados por relevância, "
+            "com `snippet` (trechos encontrados em `<mark>`), filtros `agent_id`, "
+            "`date_from`/`date_to` e paginação por `cursor` (envie o `next_cursor` da "
+            "resposta anterior). Senão é repassada ao n8n, sem filtros nem paginação."
         ),
+        request_body=SearchSerializer,
         responses={
             201: openapi.Response("Respostas com sucesso sucesso", SearchSerializer),
             400: openapi.Response("Cliente já existe"),
@@ -48,21 +47,37 @@ class SearchView(viewsets.ModelViewSet):
         security=[{"Bearer": []}],
         tags=["Search"],
     )
-    def create(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         user = request.user
-        user_query = request.data.get("query")
+        ser = SearchSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        user_query = ser.validated_data["query"]
 
-		# Get all user sessions
-        # and list them in sql query friendly format
-        qs = self.get_queryset()
-        qs_filtered = qs.filter(user=user)
-        sessions_qs = ChatSession.objects.filter(user=user)
+        if chat_mirror.enabled():
+            try:
+                page = await sync_to_async(chat_search.search)(
+                    user,
+                    user_query,
+                    agent_id=ser.validated_data.get("agent_id"),
+                    date_from=ser.validated_data.get("date_from"),
+                    date_to=ser.validated_data.get("date_to"),
+                    cursor=ser.validated_data.get("cursor") or None,
+                    limit=ser.validated_data.get("limit"),
+                )
+            except chat_search.InvalidCursor as e:
+                raise ValidationError({"cursor": str(e)})
+            return Response(
+                {"status": "success", "results": page.results, "next_cursor": page.next_cursor},
+                status=status.HTTP_201_CREATED,
+            )
 
-        user_sessions = qs_filtered if len(qs_filtered) > 0 else sessions_qs
+        # Get all user sessions
+        # and list them in sql query friendly format
+        user_sessions = [s async for s in ChatSession.objects.filter(user=user)]
         sessions_ids = [str(obj.session_key) for obj in user_sessions]
         session_agent_dict = {us.session_key: str(us.agent_id) for us in user_sessions}
 
-        search_query = ['%', user_query.replace(',', ' '), '%']
+        search_query = ["%", user_query.replace(",", " "), "%"]
 
         payload_n8n = {
             "session_ids": sessions_ids,
@@ -74,24 +89,25 @@ class SearchView(viewsets.ModelViewSet):
                 {"detail": "Configuração do N8N ausente (N8N_BASE_URL/N8N_KB_KEY)."}, status=500
             )
 
-        url = f"{settings.N8N_BASE_URL}{self.target_path}"
-
         try:
-            upstream = requests.post(
-                url, headers=self._build_headers(), json=payload_n8n, timeout=10
+            upstream = await n8n_client.apost(
+                self.target_path, headers=self._build_headers(), json=payload_n8n
             )
             data = upstream.json()
-        except requests.Timeout:
+        except httpx.TimeoutException:
             return Response({"detail": "Timeout ao chamar serviço externo."}, status=504)
-        
-        except (requests.RequestException, ValueError) as e:
+
+        except (httpx.HTTPError, ValueError) as e:
             return Response({"detail": f"Erro ao chamar serviço externo: {e}"}, status=502)
-        
-        results = [{
-            "session_id": res['session_id'],
-            "message": res['message'].get("content", ""),
-            "author": res['message'].get("type", "human"),
-            "agent_id": str(session_agent_dict.get(res['session_id']))
-        } for res in data['data']]
 
-        return Response({ "status": "success", "results": results }, status=status.HTTP_201_CREATED)
+        results = [
+            {
+                "session_id": res["session_id"],
+                "message": res["message"].get("content", ""),
+                "author": res["message"].get("type", "human"),
+                "agent_id": str(session_agent_dict.get(res["session_id"])),
+            }
+            for res in data["data"]
+        ]
+
+        return Response({"status": "success", "results": results}, status=status.HTTP_201_CREATED)
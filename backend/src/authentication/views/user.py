@@ -7,9 +7,8 @@ from rest_framework.generics import ListAPIView
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from authentication.debug_auth import FlexibleJWTAuthentication
+from authentication.debug_auth import CachedJWTAuthentication, FlexibleJWTAuthentication
 from authentication.models.projects import Projects
 from authentication.models.roles import UserRole
 from authentication.models.user_profile import UserProfile
@@ -21,7 +20,7 @@ from authentication.utils import _split_name
 
 
 class UserViewSet(ListAPIView):
-    authentication_classes = [FlexibleJWTAuthentication, JWTAuthentication]
+    authentication_classes = [FlexibleJWTAuthentication, CachedJWTAuthentication]
     permission_classes = [IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser)
 
@@ -0,0 +1,81 @@
+"""ASGI guard against oversized request bodies.
+
+Django's ASGI handler spools the whole request body (to memory, then to a temporary
+file) before any view or upload handler runs, so the per-view limit of the KB upload
+parser would only kick in after a huge body was already written to disk. This wrapper
+answers ``413`` from the declared ``Content-Length`` without reading the body, or as
+soon as a chunked body crosses the limit. ``path_limits`` raises (or lowers) the
+limit for specific paths, e.g. the multi-file KB upload.
+"""
+
+import json
+from typing import Dict, Optional
+
+
+class BodySizeLimitMiddleware:
+    def __init__(self, app, max_bytes: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        max_bytes = self.path_limits.get(scope.get("path", ""), self.max_bytes)
+        declared = None
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = None
+                break
+
+        if declared is not None:
+            if declared > max_bytes:
+                return await self._reject(send, max_bytes)
+            return await self.app(scope, receive, send)
+
+        received = 0
+        started = rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Django reads the whole body before responding, so the 413 can still
+                    # be sent; the app then sees a disconnect and aborts (RequestAborted)
+                    if not started and not rejected:
+                        rejected = True
+                        await self._reject(send, max_bytes)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if rejected:  # the 413 already answered the request
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        return await self.app(scope, limited_receive, guarded_send)
+
+    async def _reject(self, send, max_bytes: int):
+        body = json.dumps(
+            {"detail": f"Requisição excede o tamanho máximo permitido ({max_bytes} bytes)."}
+        ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -83,6 +83,170 @@ ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "localhost,127.0.0.1,0.0.0.0").split(
 N8N_BASE_URL = os.environ.get("N8N_BASE_URL", "").rstrip("/")
 N8N_KB_KEY = os.environ.get("N8N_KB_KEY", "")
 N8N_TIMEOUT = int(os.environ.get("N8N_TIMEOUT", "15"))
+N8N_CONNECT_TIMEOUT = float(os.environ.get("N8N_CONNECT_TIMEOUT", "5"))
+# Read timeout per webhook path; paths not listed use N8N_TIMEOUT
+N8N_FILE_TIMEOUT = int(os.environ.get("N8N_FILE_TIMEOUT", str(max(N8N_TIMEOUT, 30))))
+N8N_ENDPOINT_TIMEOUTS = {
+    "/webhook/kb/file/add": N8N_FILE_TIMEOUT,
+    "/webhook/kb/chunks/add": N8N_FILE_TIMEOUT,
+}
+# Keep-alive pool shared by every call to N8N_BASE_URL (per process)
+N8N_POOL_CONNECTIONS = int(os.environ.get("N8N_POOL_CONNECTIONS", "4"))
+N8N_POOL_MAXSIZE = int(os.environ.get("N8N_POOL_MAXSIZE", "32"))
+N8N_POOL_BLOCK = env_bool("N8N_POOL_BLOCK", False)
+# Connection cap of the async client used by the ASGI views (per worker process)
+N8N_ASYNC_MAX_CONNECTIONS = int(os.environ.get("N8N_ASYNC_MAX_CONNECTIONS", "200"))
+# Circuit breaker per webhook path (per worker process): open after N consecutive
+# failures (network error/timeout/5xx), fail fast with 503 for RESET_TIMEOUT seconds
+N8N_BREAKER_FAILURE_THRESHOLD = int(os.environ.get("N8N_BREAKER_FAILURE_THRESHOLD", "5"))
+N8N_BREAKER_RESET_TIMEOUT = int(os.environ.get("N8N_BREAKER_RESET_TIMEOUT", "30"))
+# Concurrent calls allowed per webhook path (per worker process); extra calls get 429
+N8N_MAX_IN_FLIGHT = int(os.environ.get("N8N_MAX_IN_FLIGHT", "50"))
+N8N_MAX_IN_FLIGHT_PER_PATH = {
+    "/webhook/kb/file/add": int(os.environ.get("N8N_MAX_IN_FLIGHT_FILE", "8")),
+    "/webhook/kb/chunks/add": int(os.environ.get("N8N_MAX_IN_FLIGHT_FILE", "8")),
+}
+# Identical concurrent n8n reads (kb/get, file/list, list-all) share one upstream call
+# across workers through Redis; successful results are then cached for N8N_COALESCE_TTL
+# seconds (0 = only share calls in flight). KB writes clear the cached reads.
+N8N_COALESCE_ENABLED = env_bool("N8N_COALESCE_ENABLED", True)
+N8N_COALESCE_TTL = float(os.environ.get("N8N_COALESCE_TTL", "3"))
+
+REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
+REDIS_PORT = int(os.environ.get("REDIS_PORT", "6379"))
+REDIS_URL = os.environ.get("REDIS_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}/0")
+# Users resolved by JWT authentication, cached in Redis (services/user_cache.py)
+USER_CACHE_ENABLED = env_bool("USER_CACHE_ENABLED", True)
+USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "300"))
+# Refresh token state (outstanding/blacklisted): "redis" (keys expiring with the token) or
+# "sql" (simplejwt's tables). Run `manage.py migrate_token_store` before switching to redis.
+TOKEN_STORE = os.environ.get("TOKEN_STORE", "redis")
+
+# Background KB ingestion (`python manage.py run_kb_worker`)
+# Uploads wait here until the worker hands them to n8n; must be shared with the worker
+KB_UPLOAD_ROOT = os.environ.get("KB_UPLOAD_ROOT", str(BASE_DIR / "kb_uploads"))
+KB_JOB_QUEUE = os.environ.get("KB_JOB_QUEUE", "kb:ingest:queue")
+KB_JOB_MAX_ATTEMPTS = int(os.environ.get("KB_JOB_MAX_ATTEMPTS", "3"))
+# Seconds before the first retry; doubled on every further attempt
+KB_JOB_RETRY_BACKOFF = int(os.environ.get("KB_JOB_RETRY_BACKOFF", "15"))
+# A job "running" for longer than this is assumed lost (worker killed) and re-queued
+KB_JOB_STALE_AFTER = int(os.environ.get("KB_JOB_STALE_AFTER", str(N8N_FILE_TIMEOUT * 4)))
+KB_WORKER_CONCURRENCY = int(os.environ.get("KB_WORKER_CONCURRENCY", "4"))
+# POST /api/kb/files/batch-add/: files per request, threads storing them, and the
+# largest request body (all files together) accepted under ASGI
+KB_BATCH_MAX_FILES = int(os.environ.get("KB_BATCH_MAX_FILES", "100"))
+KB_BATCH_PARALLELISM = int(os.environ.get("KB_BATCH_PARALLELISM", "4"))
+KB_BATCH_MAX_BYTES = int(os.environ.get("KB_BATCH_MAX_BYTES", str(1024 * 1024 * 1024)))
+# Seconds between reconciliations of the local KB catalogue with kb/list-all (0 disables)
+KB_CATALOG_RECONCILE_INTERVAL = int(os.environ.get("KB_CATALOG_RECONCILE_INTERVAL", "300"))
+# Largest file accepted by the KB upload endpoints; uploads are streamed to disk and
+# on to n8n in KB_UPLOAD_CHUNK_SIZE chunks, never held in memory
+KB_UPLOAD_MAX_BYTES = int(os.environ.get("KB_UPLOAD_MAX_BYTES", str(256 * 1024 * 1024)))
+KB_UPLOAD_CHUNK_SIZE = int(os.environ.get("KB_UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+# Room for the other multipart fields; request bodies above
+# KB_UPLOAD_MAX_BYTES + KB_UPLOAD_BODY_OVERHEAD are refused before being read (asgi.py)
+KB_UPLOAD_BODY_OVERHEAD = int(os.environ.get("KB_UPLOAD_BODY_OVERHEAD", str(1024 * 1024)))
+
+# Direct access to the n8n Postgres (PGVector collections), used where the webhooks
+# are too coarse, e.g. incremental re-indexing of an updated file
+N8N_POSTGRES_HOST = os.environ.get(
+    "N8N_POSTGRES_HOST", os.environ.get("POSTGRES_HOST", "postgres")
+)
+N8N_POSTGRES_PORT = int(
+    os.environ.get("N8N_POSTGRES_PORT", os.environ.get("POSTGRES_PORT", "5432"))
+)
+N8N_POSTGRES_DB = os.environ.get("N8N_POSTGRES_DB", "n8n_enlaight_db")
+N8N_POSTGRES_USER = os.environ.get("N8N_POSTGRES_USER", "n8n")
+N8N_POSTGRES_PASSWORD = os.environ.get("N8N_POSTGRES_PASSWORD", "")
+N8N_POSTGRES_POOL_MAX = int(os.environ.get("N8N_POSTGRES_POOL_MAX", "10"))
+# Seconds to wait for a free pooled connection before failing (503 on the KB search)
+N8N_POSTGRES_POOL_TIMEOUT = float(os.environ.get("N8N_POSTGRES_POOL_TIMEOUT", "10"))
+
+# Must match the Recursive Character Text Splitter of the kb/file/add workflow
+KB_CHUNK_SIZE = int(os.environ.get("KB_CHUNK_SIZE", "1000"))
+KB_CHUNK_OVERLAP = int(os.environ.get("KB_CHUNK_OVERLAP", "50"))
+# Text files up to this size are re-indexed chunk by chunk when replaced
+KB_INCREMENTAL_MAX_BYTES = int(os.environ.get("KB_INCREMENTAL_MAX_BYTES", str(20 * 1024 * 1024)))
+# POST /api/kb/retrieve/: nearest chunks read straight from the PGVector collections
+KB_RETRIEVAL_TOP_K = int(os.environ.get("KB_RETRIEVAL_TOP_K", "5"))
+KB_RETRIEVAL_MAX_TOP_K = int(os.environ.get("KB_RETRIEVAL_MAX_TOP_K", "50"))
+KB_RETRIEVAL_TIMEOUT_MS = int(os.environ.get("KB_RETRIEVAL_TIMEOUT_MS", "5000"))
+# "mode": "hybrid": vector + full-text search fused by reciprocal rank, 1 / (K + rank);
+# each search returns top_k * KB_HYBRID_CANDIDATES chunks to the fusion
+KB_HYBRID_RRF_K = int(os.environ.get("KB_HYBRID_RRF_K", "60"))
+KB_HYBRID_CANDIDATES = int(os.environ.get("KB_HYBRID_CANDIDATES", "4"))
+KB_LEXICAL_MAX_TERMS = int(os.environ.get("KB_LEXICAL_MAX_TERMS", "32"))
+# Threads shared by the hybrid searches of a process (keep below N8N_POSTGRES_POOL_MAX)
+KB_HYBRID_WORKERS = int(os.environ.get("KB_HYBRID_WORKERS", "4"))
+# POST /api/projects/<id>/kb/search/: one query per linked KB on a shared pool (keep it
+# below N8N_POSTGRES_POOL_MAX); KBs slower than the deadline are left out of the answer
+KB_FEDERATED_WORKERS = int(os.environ.get("KB_FEDERATED_WORKERS", "4"))
+KB_FEDERATED_DEADLINE_MS = int(os.environ.get("KB_FEDERATED_DEADLINE_MS", "2000"))
+KB_FEDERATED_MAX_DEADLINE_MS = int(os.environ.get("KB_FEDERATED_MAX_DEADLINE_MS", "10000"))
+# Per-KB pgvector ANN indexes (`python manage.py kb_ann_index`; checked by the KB worker
+# after ingestions every KB_ANN_MAINTAIN_INTERVAL seconds). Smaller collections are scanned
+KB_ANN_ENABLED = env_bool("KB_ANN_ENABLED", True)
+KB_ANN_METHOD = os.environ.get("KB_ANN_METHOD", "hnsw")  # hnsw | ivfflat
+KB_ANN_MIN_ROWS = int(os.environ.get("KB_ANN_MIN_ROWS", "10000"))
+# Vectors in the index: vector | halfvec | bit (per KB: `python manage.py kb_vector_storage`);
+# compact indexes return RERANK x top_k candidates, re-ranked at full precision
+KB_ANN_STORAGE = os.environ.get("KB_ANN_STORAGE", "vector")
+KB_ANN_RERANK_HALFVEC = int(os.environ.get("KB_ANN_RERANK_HALFVEC", "2"))
+KB_ANN_RERANK_BIT = int(os.environ.get("KB_ANN_RERANK_BIT", "10"))
+# IVFFlat lists are sized at build time: rebuilt once the collection grew this much
+KB_ANN_REBUILD_GROWTH = float(os.environ.get("KB_ANN_REBUILD_GROWTH", "2"))
+KB_ANN_MAINTENANCE_WORK_MEM = os.environ.get("KB_ANN_MAINTENANCE_WORK_MEM", "512MB")
+KB_ANN_MAINTAIN_INTERVAL = int(os.environ.get("KB_ANN_MAINTAIN_INTERVAL", "60"))
+
+# Local mirror of the n8n chat memory, searched by POST /api/search/
+# (`python manage.py sync_chat_messages --loop`); False sends searches to n8n again
+CHAT_SEARCH_LOCAL = env_bool("CHAT_SEARCH_LOCAL", True)
+N8N_CHAT_MEMORY_TABLE = os.environ.get("N8N_CHAT_MEMORY_TABLE", "n8n_chat_histories")
+CHAT_MIRROR_SYNC_INTERVAL = float(os.environ.get("CHAT_MIRROR_SYNC_INTERVAL", "5"))
+CHAT_MIRROR_BATCH_SIZE = int(os.environ.get("CHAT_MIRROR_BATCH_SIZE", "1000"))
+# ids below the high-water mark re-read on each run (rows that committed late)
+CHAT_MIRROR_OVERLAP = int(os.environ.get("CHAT_MIRROR_OVERLAP", "200"))
+# Chat search page size (and the most a client may ask for), shortest word the
+# MySQL FULLTEXT index holds (innodb_ft_min_token_size) and snippet length
+CHAT_SEARCH_PAGE_SIZE = int(os.environ.get("CHAT_SEARCH_PAGE_SIZE", "20"))
+CHAT_SEARCH_MAX_PAGE_SIZE = int(os.environ.get("CHAT_SEARCH_MAX_PAGE_SIZE", "100"))
+CHAT_SEARCH_MIN_TOKEN = int(os.environ.get("CHAT_SEARCH_MIN_TOKEN", "3"))
+CHAT_SEARCH_SNIPPET_CHARS = int(os.environ.get("CHAT_SEARCH_SNIPPET_CHARS", "160"))
+
+# Streaming chat proxy (POST /api/agents/<id>/chat/, Server-Sent Events)
+CHAT_STREAM_MAX_PER_USER = int(os.environ.get("CHAT_STREAM_MAX_PER_USER", "3"))
+# Longest a single answer may stream; also the lifetime of a leaked per-user slot
+CHAT_STREAM_MAX_SECONDS = int(os.environ.get("CHAT_STREAM_MAX_SECONDS", "300"))
+# Longest silence from n8n (between two chunks) before giving up
+CHAT_STREAM_READ_TIMEOUT = int(os.environ.get("CHAT_STREAM_READ_TIMEOUT", "120"))
+CHAT_STREAM_HEARTBEAT = int(os.environ.get("CHAT_STREAM_HEARTBEAT", "15"))
+# Answer bytes waiting for a slow client before its stream is cut
+CHAT_STREAM_BUFFER_BYTES = int(os.environ.get("CHAT_STREAM_BUFFER_BYTES", str(1024 * 1024)))
+
+# Answers to the first question of a chat session, reused while the agent's KBs do not
+# change: same normalised question, or an embedding at least CHAT_ANSWER_CACHE_SIMILARITY
+# (cosine) close to a cached one
+CHAT_ANSWER_CACHE_ENABLED = env_bool("CHAT_ANSWER_CACHE_ENABLED", True)
+CHAT_ANSWER_CACHE_SEMANTIC = env_bool("CHAT_ANSWER_CACHE_SEMANTIC", True)
+CHAT_ANSWER_CACHE_TTL = int(os.environ.get("CHAT_ANSWER_CACHE_TTL", "86400"))
+CHAT_ANSWER_CACHE_SIMILARITY = float(os.environ.get("CHAT_ANSWER_CACHE_SIMILARITY", "0.95"))
+# Vectors searched per agent, and agents whose vectors each worker keeps in memory
+# (text-embedding-3-small: 6 KiB per vector)
+CHAT_ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get("CHAT_ANSWER_CACHE_MAX_ENTRIES", "500"))
+CHAT_ANSWER_CACHE_INDEXES = int(os.environ.get("CHAT_ANSWER_CACHE_INDEXES", "32"))
+CHAT_ANSWER_CACHE_INDEX_REFRESH = int(os.environ.get("CHAT_ANSWER_CACHE_INDEX_REFRESH", "60"))
+
+# Embeddings of the questions; same model as the "Embeddings OpenAI" node of the
+# kb/* workflows
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_EMBEDDING_MODEL = os.environ.get("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+OPENAI_EMBEDDING_TIMEOUT = float(os.environ.get("OPENAI_EMBEDDING_TIMEOUT", "10"))
+# Embeddings kept in Redis by SHA-256 of model and text (float16 or float32), least
+# recently used dropped beyond EMBEDDING_CACHE_MAX_ENTRIES
+EMBEDDING_CACHE_ENABLED = env_bool("EMBEDDING_CACHE_ENABLED", True)
+EMBEDDING_CACHE_DTYPE = os.environ.get("EMBEDDING_CACHE_DTYPE", "float16")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "20000"))
 
 # Optional dedicated UI base for opening workflows in the browser
 N8N_UI_BASE_URL = os.environ.get("N8N_UI_BASE_URL", "").rstrip("/")
@@ -122,7 +286,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "authentication.debug_auth.CachedJWTAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
@@ -11,7 +11,11 @@ import { Card, CardContent } from "@/components/ui/card";
 import { Upload, File, Trash2, AlertCircle, Edit } from "lucide-react";
 import { useToast } from "@/hooks/use-toast";
 import { Alert, AlertDescription } from "@/components/ui/alert";
-import { KnowledgeBaseService, KBFile } from "@/services/KnowledgeBaseService";
+import {
+  KnowledgeBaseService,
+  KBFile,
+  KBJobTimeoutError,
+} from "@/services/KnowledgeBaseService";
 
 interface KnowledgeBase {
   hash_id?: string;
@@ -39,6 +43,8 @@ export const ManageFilesModal = ({
   const [editingFile, setEditingFile] = useState<string | null>(null);
   const fileInputRef = useRef<HTMLInputElement>(null);
   const editFileInputRef = useRef<HTMLInputElement>(null);
+  // Cancels the uploads (and job polling) in progress when the modal closes
+  const uploadAbortRef = useRef<AbortController | null>(null);
   const { toast } = useToast();
 
   const getHashId = () => knowledgeBase?.hash_id || knowledgeBase?.external_id || "";
@@ -91,26 +97,51 @@ export const ManageFilesModal = ({
     }
   }, [open, knowledgeBase]);
 
+  useEffect(() => {
+    if (!open) {
+      uploadAbortRef.current?.abort();
+    }
+  }, [open]);
+
+  useEffect(() => () => uploadAbortRef.current?.abort(), []);
+
   const handleFileUpload = async (event: React.ChangeEvent<HTMLInputElement>) => {
     const selectedFiles = event.target.files;
     const hashId = getHashId();
     if (!selectedFiles || !hashId || !projectId) return;
 
     setUploading(true);
+    const controller = new AbortController();
+    uploadAbortRef.current = controller;
 
     // Upload files one by one
     for (let i = 0; i < selectedFiles.length; i++) {
       const file = selectedFiles[i];
+      if (controller.signal.aborted) break;
 
       try {
-        await KnowledgeBaseService.addFile(hashId, projectId, file);
+        const job = await KnowledgeBaseService.addFile(hashId, projectId, file, controller.signal);
+        const duplicateOf = job.result?.data?.status === "duplicate" ? job.result.data.file : null;
 
         toast({
           title: "Success",
-          description: `${file.name} uploaded successfully`,
+          description: duplicateOf
+            ? `${file.name} is already in this knowledge base (as ${duplicateOf})`
+            : `${file.name} uploaded successfully`,
         });
       } catch (error: any) {
-        const errorMsg = error.response?.data?.detail || `Failed to upload ${file.name}`;
+        // Modal closed: the server keeps processing what was already sent
+        if (controller.signal.aborted) break;
+        if (error instanceof KBJobTimeoutError) {
+          toast({
+            title: "Still processing",
+            description: `${file.name} is still being processed (job ${error.job.job_id})`,
+          });
+          continue;
+        }
+        // KBJobFailedError carries the failed ingestion job
+        const errorMsg =
+          error.response?.data?.detail || error.job?.error || `Failed to upload ${file.name}`;
         toast({
           title: "Error",
           description: errorMsg,
@@ -119,6 +150,9 @@ export const ManageFilesModal = ({
       }
     }
 
+    if (uploadAbortRef.current === controller) {
+      uploadAbortRef.current = null;
+    }
     setUploading(false);
     fetchFiles();
 
@@ -17,6 +17,71 @@ export interface KBFile {
   uploaded_at?: string;
 }
 
+export type KBJobStatus = "queued" | "running" | "done" | "failed";
+
+export interface KBIngestionJob {
+  job_id: string;
+  hash_id: string;
+  file: string;
+  content_hash?: string;
+  status: KBJobStatus;
+  attempts: number;
+  queued_at: string;
+  started_at?: string | null;
+  finished_at?: string | null;
+  next_attempt_at?: string | null;
+  wait_ms?: number | null;
+  duration_ms?: number | null;
+  result?: any;
+  error?: string;
+}
+
+export class KBJobFailedError extends Error {
+  job: KBIngestionJob;
+
+  constructor(job: KBIngestionJob) {
+    super(job.error || `Failed to process ${job.file}`);
+    this.job = job;
+  }
+}
+
+// Thrown when an ingestion job is still queued/running after the maximum wait; the
+// job keeps going on the server and can be looked up later by its job_id
+export class KBJobTimeoutError extends Error {
+  job: KBIngestionJob;
+
+  constructor(job: KBIngestionJob) {
+    super(`${job.file} is still processing`);
+    this.job = job;
+  }
+}
+
+const JOB_POLL_INTERVAL_MS = 1500;
+const JOB_MAX_WAIT_MS = 5 * 60 * 1000;
+
+export interface WaitForJobOptions {
+  intervalMs?: number;
+  maxWaitMs?: number;
+  signal?: AbortSignal;
+}
+
+const abortError = () => new DOMException("Aborted", "AbortError");
+
+// setTimeout that rejects as soon as the signal aborts
+const sleep = (ms: number, signal?: AbortSignal) =>
+  new Promise<void>((resolve, reject) => {
+    if (signal?.aborted) return reject(abortError());
+    const onAbort = () => {
+      clearTimeout(timer);
+      reject(abortError());
+    };
+    const timer = setTimeout(() => {
+      signal?.removeEventListener("abort", onAbort);
+      resolve();
+    }, ms);
+    signal?.addEventListener("abort", onAbort, { once: true });
+  });
+
 export const KnowledgeBaseService = {
   // List all KBs for a specific project
   async listAll(projectId: string) {
@@ -52,8 +117,13 @@ export const KnowledgeBaseService = {
     return response.data;
   },
 
-  // Add a file to a KB
-  async addFile(hashId: string, projectId: string, file: File) {
+  // Queue a file for ingestion into a KB (returns the job right away, with status "queued")
+  async queueFile(
+    hashId: string,
+    projectId: string,
+    file: File,
+    signal?: AbortSignal
+  ): Promise<KBIngestionJob> {
     const formData = new FormData();
     formData.append("hash_id", hashId);
     formData.append("project_id", projectId);
@@ -61,10 +131,43 @@ export const KnowledgeBaseService = {
 
     const response = await api.post("/kb/file/add/", formData, {
       headers: { "Content-Type": "multipart/form-data" },
+      signal,
     });
     return response.data;
   },
 
+  // Get the status of an ingestion job
+  async getJob(jobId: string, signal?: AbortSignal): Promise<KBIngestionJob> {
+    const response = await api.get(`/kb/jobs/${jobId}/`, { signal });
+    return response.data;
+  },
+
+  // Poll an ingestion job until it is done. Throws KBJobFailedError if it failed,
+  // KBJobTimeoutError after maxWaitMs and an AbortError when the signal aborts
+  async waitForJob(
+    jobId: string,
+    {
+      intervalMs = JOB_POLL_INTERVAL_MS,
+      maxWaitMs = JOB_MAX_WAIT_MS,
+      signal,
+    }: WaitForJobOptions = {}
+  ): Promise<KBIngestionJob> {
+    const deadline = Date.now() + maxWaitMs;
+    for (;;) {
+      const job = await KnowledgeBaseService.getJob(jobId, signal);
+      if (job.status === "done") return job;
+      if (job.status === "failed") throw new KBJobFailedError(job);
+      if (Date.now() + intervalMs > deadline) throw new KBJobTimeoutError(job);
+      await sleep(intervalMs, signal);
+    }
+  },
+
+  // Add a file to a KB and wait until it has been ingested
+  async addFile(hashId: string, projectId: string, file: File, signal?: AbortSignal) {
+    const job = await KnowledgeBaseService.queueFile(hashId, projectId, file, signal);
+    return KnowledgeBaseService.waitForJob(job.job_id, { signal });
+  },
+
   // Delete a file from a KB
   async deleteFile(hashId: string, fileName: string) {
     const response = await api.delete("/kb/file/delete/", {